@@ -1,9 +1,15 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, g
 from flask_cors import CORS
-import pandas as pd
+import os
 import json
+import hashlib
 import logging
-from normative_system import NormativeSystem
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from normative_system import NormativeSystem, AnalysisPool, AnalysisQueueFull, parse_date, metrics
 
 # Configurazione logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -12,90 +18,326 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Abilita CORS per tutte le rotte
 
-# Istanza del sistema di normative
-system = NormativeSystem(youtube_api_key="YOUR_YOUTUBE_API_KEY")
+# Categorie disponibili (statiche: il payload viene precalcolato)
+CATEGORIES = [
+    {
+        "id": "startup_innovazione",
+        "name": "Start-up e Innovazione",
+        "icon": "🚀",
+        "description": "Incentivi, fondi e requisiti per start-up innovative e progetti tecnologici."
+    },
+    {
+        "id": "fisco_agevolazioni",
+        "name": "Fisco e Agevolazioni",
+        "icon": "💰",
+        "description": "Agevolazioni fiscali, crediti d'imposta e incentivi economici per le imprese."
+    },
+    {
+        "id": "lavoro_contratti",
+        "name": "Lavoro e Contratti",
+        "icon": "👔",
+        "description": "Normative sul lavoro, contratti, assunzioni e formazione professionale."
+    },
+    {
+        "id": "ambiente_sostenibilita",
+        "name": "Ambiente e Sostenibilità",
+        "icon": "🌱",
+        "description": "Incentivi per la sostenibilità, economia circolare e transizione ecologica."
+    },
+    {
+        "id": "importexport_esteri",
+        "name": "Import/Export e Mercati Esteri",
+        "icon": "🌍",
+        "description": "Normative doganali, incentivi all'export e internazionalizzazione."
+    }
+]
 
-# Carica il database all'avvio
-try:
-    system.run_full_pipeline(use_cached=True)
-    logger.info("Database caricato con successo")
-except Exception as e:
-    logger.error(f"Errore durante il caricamento del database: {str(e)}")
+CATEGORIES_BODY = json.dumps({"categories": CATEGORIES}, ensure_ascii=False).encode('utf-8')
+CATEGORIES_ETAG = hashlib.sha1(CATEGORIES_BODY).hexdigest()
+
+# I processi del pool di analisi ("spawn") rieseguono questo modulo come __mp_main__: lì non servono
+# né il sistema né le attività di avvio (snapshot, pipeline, scheduler)
+IS_ANALYSIS_WORKER = __name__ == '__mp_main__'
+
+# Con il reloader di debug il processo principale sorveglia solo i file e riavvia quello che serve
+IS_RELOADER_WATCHER = __name__ == '__main__' and os.environ.get('WERKZEUG_RUN_MAIN') != 'true'
+
+# Aggiornamento periodico (nuove pubblicazioni senza riavvii); 0 lo disattiva
+REFRESH_INTERVAL = int(os.environ.get("NORMATIVE_REFRESH_INTERVAL", "3600"))
+
+
+def create_system():
+    """Istanza del sistema di normative"""
+    return NormativeSystem(
+        youtube_api_key="YOUR_YOUTUBE_API_KEY",
+        category_names={category["id"]: category["name"] for category in CATEGORIES}
+    )
+
+
+def start_services(system):
+    """Attività di avvio del processo che serve le richieste, in un thread: l'import non attende
+    il caricamento e /readyz ne riporta l'avanzamento"""
+    def run():
+        # All'avvio serve l'ultimo snapshot salvato; il pipeline parte solo dopo, in background
+        if system.load_snapshot():
+            logger.info("Database caricato con successo")
+        
+        # L'aggiornamento all'avvio si può disattivare (ad es. nei benchmark) con NORMATIVE_REFRESH_ON_START=0.
+        # Il pipeline gira in un solo processo; gli altri server ricaricano lo snapshot che pubblica
+        refresh_on_start = os.environ.get("NORMATIVE_REFRESH_ON_START", "1") != "0"
+        if refresh_on_start or REFRESH_INTERVAL > 0:
+            system.start_scheduler(REFRESH_INTERVAL, refresh_on_start=refresh_on_start)
+    
+    thread = threading.Thread(target=run, name="avvio-servizi", daemon=True)
+    thread.start()
+    return thread
+
+
+system = None if IS_ANALYSIS_WORKER or IS_RELOADER_WATCHER else create_system()
+if system is not None:
+    start_services(system)
+
+# Pool di processi per /api/analyze (avviato alla prima richiesta)
+ANALYSIS_TIMEOUT = 30
+ANALYSIS_ASYNC_THRESHOLD = 200000
+ANALYSIS_RETRY_AFTER = 5
+# Lunghezza massima accettata: è il limite predefinito di spaCy (nlp.max_length), oltre il quale l'analisi fallisce
+ANALYSIS_MAX_LENGTH = 1000000
+analysis_pool = AnalysisPool(max_workers=2, max_pending=8)
+
+
+class ApiResponseCache:
+    """Cache LRU in memoria delle risposte, legata alla generazione del corpus"""
+    
+    def __init__(self, max_entries=2048):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+    
+    def set(self, key, entry):
+        with self._lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Svuota la cache (le statistiche restano)"""
+        with self._lock:
+            self.entries.clear()
+    
+    def get_stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else None
+            }
+
+
+response_cache = ApiResponseCache()
+
+
+def make_json_response(body, etag):
+    """Risposta JSON con ETag forte; 304 se il client ha già questa versione"""
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+
+def cached_response(view):
+    """Memorizza le risposte 200 per parametri normalizzati e generazione del corpus"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # Parametri normalizzati: ordinati, senza spazi superflui, vuoti ignorati
+        params = tuple(sorted(
+            (name, ' '.join(value.split()))
+            for name, value in request.args.items(multi=True)
+            if value.strip()
+        ))
+        key = (system.generation, request.path, params)
+        
+        entry = response_cache.get(key)
+        if entry is None:
+            response = view(*args, **kwargs)
+            if not isinstance(response, Response) or response.status_code != 200:
+                return response
+            body = response.get_data()
+            entry = (body, hashlib.sha1(body).hexdigest())
+            response_cache.set(key, entry)
+        
+        return make_json_response(*entry)
+    return wrapper
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    metrics.add("http_requests_in_flight", 1, help_text="Richieste HTTP in corso")
+
+
+@app.after_request
+def record_status(response):
+    g.response_status = response.status_code
+    return response
+
+
+@app.teardown_request
+def record_request_metrics(exc=None):
+    """Latenza per rotta (modello della rotta, non il percorso: cardinalità limitata)"""
+    if 'request_start' not in g:
+        return
+    metrics.add("http_requests_in_flight", -1, help_text="Richieste HTTP in corso")
+    route = request.url_rule.rule if request.url_rule else "sconosciuta"
+    status = g.get('response_status', 500)
+    metrics.observe("http_request_seconds", time.perf_counter() - g.request_start,
+                    {'route': route, 'method': request.method, 'status': status},
+                    "Latenza delle richieste HTTP per rotta")
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Metriche in formato Prometheus"""
+    status = system.get_status()
+    metrics.set("ready", int(status["ready"]), help_text="Database pronto a servire richieste")
+    metrics.set("refreshing", int(status["refreshing"]), help_text="Aggiornamento del database in corso")
+    metrics.set("corpus_generation", status["generation"], help_text="Generazione corrente degli indici")
+    if status["snapshot_age_seconds"] is not None:
+        metrics.set("snapshot_age_seconds", status["snapshot_age_seconds"], help_text="Età dello snapshot servito")
+    
+    cache_stats = response_cache.get_stats()
+    for name in ("hits", "misses", "evictions"):
+        metrics.set(f"response_cache_{name}", cache_stats[name], help_text=f"Cache delle risposte: {name}")
+    metrics.set("response_cache_entries", cache_stats["entries"], help_text="Voci nella cache delle risposte")
+    pool_stats = analysis_pool.get_stats()
+    metrics.set("analysis_pending", pool_stats["pending"], help_text="Analisi in coda o in esecuzione")
+    
+    if system.youtube_integrator:
+        youtube_stats = system.youtube_integrator.get_stats()
+        for name in ("hits", "misses", "entries"):
+            metrics.set(f"youtube_cache_{name}", youtube_stats["cache"][name], help_text=f"Cache delle ricerche YouTube: {name}")
+        metrics.set("youtube_api_calls", youtube_stats["api_calls"], help_text="Chiamate all'API di YouTube")
+        metrics.set("youtube_quota_used", youtube_stats["quota_used"], help_text="Unità di quota YouTube usate oggi")
+        metrics.set("youtube_quota_limit", youtube_stats["quota_limit"], help_text="Quota YouTube giornaliera")
+    
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Il processo è attivo"""
+    return jsonify({
+        "status": "ok",
+        **system.get_status(),
+        "response_cache": response_cache.get_stats(),
+        "subscriptions": system.subscriptions.get_stats(),
+        "analysis_pool": analysis_pool.get_stats(),
+        "youtube": system.youtube_integrator.get_stats() if system.youtube_integrator else None
+    })
+
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Il processo è pronto a servire richieste"""
+    status = system.get_status()
+    if not status["ready"]:
+        return jsonify({"status": "loading", **status}), 503
+    
+    return jsonify({"status": "ready", **status})
 
 
 @app.route('/api/categories', methods=['GET'])
 def get_categories():
     """Restituisce le categorie disponibili"""
-    categories = [
-        {
-            "id": "startup_innovazione",
-            "name": "Start-up e Innovazione",
-            "icon": "🚀",
-            "description": "Incentivi, fondi e requisiti per start-up innovative e progetti tecnologici."
-        },
-        {
-            "id": "fisco_agevolazioni",
-            "name": "Fisco e Agevolazioni",
-            "icon": "💰",
-            "description": "Agevolazioni fiscali, crediti d'imposta e incentivi economici per le imprese."
-        },
-        {
-            "id": "lavoro_contratti",
-            "name": "Lavoro e Contratti",
-            "icon": "👔",
-            "description": "Normative sul lavoro, contratti, assunzioni e formazione professionale."
-        },
-        {
-            "id": "ambiente_sostenibilita",
-            "name": "Ambiente e Sostenibilità",
-            "icon": "🌱",
-            "description": "Incentivi per la sostenibilità, economia circolare e transizione ecologica."
-        },
-        {
-            "id": "importexport_esteri",
-            "name": "Import/Export e Mercati Esteri",
-            "icon": "🌍",
-            "description": "Normative doganali, incentivi all'export e internazionalizzazione."
-        }
-    ]
-    
-    return jsonify({"categories": categories})
+    # Payload statico, serializzato una sola volta
+    return make_json_response(CATEGORIES_BODY, CATEGORIES_ETAG)
+
+
+def multi_value_arg(name):
+    """Valori di un parametro ripetuto o separato da virgole (es. category=a&category=b oppure category=a,b)"""
+    values = []
+    for value in request.args.getlist(name):
+        values.extend(item.strip() for item in value.split(',') if item.strip())
+    return values
 
 
 @app.route('/api/search', methods=['GET'])
+@cached_response
 def search_normative():
-    """Cerca normative in base a query e categoria"""
+    """Cerca normative in base a query e filtri a faccette (categorie, fonti, tipi di fonte, intervallo di date)"""
     query = request.args.get('q', '')
-    category = request.args.get('category', None)
+    categories = multi_value_arg('category')
+    sources = multi_value_arg('fonte')
+    source_types = multi_value_arg('tipo_fonte')
+    limit = request.args.get('limit', None, type=int)
+    mode = request.args.get('mode', 'lexical')
+    min_score = request.args.get('min_score', None, type=float)
     
     if not query:
         return jsonify({"error": "Parametro di ricerca mancante"}), 400
     
+    date_from, date_to = request.args.get('from'), request.args.get('to')
+    start = parse_date(date_from) if date_from else None
+    end = parse_date(date_to) if date_to else None
+    if (date_from and start is None) or (date_to and end is None):
+        return jsonify({"error": "Date non valide: usare il formato AAAA-MM-GG"}), 400
+    
+    filters = {
+        'categoria': categories,
+        'fonte': sources,
+        'tipo_fonte': source_types,
+        'data_da': start,
+        'data_a': end
+    }
+    
     try:
-        results = system.search_documents(query, category)
+        search = system.faceted_search(query, filters=filters, top_k=limit, mode=mode, min_score=min_score)
+        results = search["results"]
         
         # Formatta i risultati
         formatted_results = []
         for doc in results:
             formatted_doc = {
-                "id": hash(doc['titolo']),  # Genera un ID univoco
-                "titolo": doc['titolo'],
-                "categoria": doc['categoria'],
-                "fonte": doc['fonte'],
-                "data": doc['data'],
-                "riassunto": doc['riassunto'],
-                "url": doc['url'],
-                "caso_pratico": doc.get('caso_pratico', ''),
-                "video_correlati": doc.get('video_correlati', [])[:2],  # Limita a 2 video
-                "articoli_correlati": doc.get('articoli_correlati', [])[:2]  # Limita a 2 articoli
+                "id": doc.id,
+                "titolo": doc.titolo,
+                "categoria": doc.categoria,
+                "fonte": doc.fonte,
+                "data": doc.data,
+                "riassunto": doc.riassunto,
+                "url": doc.url,
+                "caso_pratico": doc.caso_pratico,
+                "video_correlati": doc.video_correlati[:2],  # Limita a 2 video
+                "articoli_correlati": doc.articoli_correlati[:2]  # Limita a 2 articoli
             }
             formatted_results.append(formatted_doc)
         
         return jsonify({
             "results": formatted_results,
             "count": len(formatted_results),
+            "total": search["total"],
             "query": query,
-            "category": category
+            "category": categories[0] if len(categories) == 1 else categories or None,
+            "facets": search["facets"]
         })
         
     except Exception as e:
@@ -103,31 +345,50 @@ def search_normative():
         return jsonify({"error": "Errore durante la ricerca"}), 500
 
 
-@app.route('/api/document/<int:doc_id>', methods=['GET'])
+@app.route('/api/suggest', methods=['GET'])
+def suggest_normative():
+    """Suggerimenti durante la digitazione (titoli, parole chiave e categorie)"""
+    query = request.args.get('q', '')
+    limit = min(request.args.get('limit', 8, type=int), 20)
+    
+    try:
+        suggestions = [
+            {key: value for key, value in entry.items() if key != 'score'}
+            for entry in system.suggest(query, limit=limit)
+        ]
+        return jsonify({"suggestions": suggestions, "query": query})
+        
+    except Exception as e:
+        logger.error(f"Errore durante il calcolo dei suggerimenti: {str(e)}")
+        return jsonify({"error": "Errore durante il calcolo dei suggerimenti"}), 500
+
+
+@app.route('/api/document/<doc_id>', methods=['GET'])
 def get_document(doc_id):
     """Ottiene i dettagli di un documento specifico"""
     try:
-        # Trova il documento con l'ID specificato
-        for _, doc in system.processed_database.iterrows():
-            if hash(doc['titolo']) == doc_id:
-                # Formatta il documento
-                formatted_doc = {
-                    "id": doc_id,
-                    "titolo": doc['titolo'],
-                    "categoria": doc['categoria'],
-                    "fonte": doc['fonte'],
-                    "data": doc['data'],
-                    "riassunto": doc['riassunto'],
-                    "testo_semplificato": doc['testo_semplificato'],
-                    "caso_pratico": doc.get('caso_pratico', ''),
-                    "url": doc['url'],
-                    "parole_chiave": doc.get('parole_chiave', []),
-                    "video_correlati": doc.get('video_correlati', []),
-                    "articoli_correlati": doc.get('articoli_correlati', [])
-                }
-                return jsonify(formatted_doc)
-        
-        return jsonify({"error": "Documento non trovato"}), 404
+        # Accesso diretto tramite l'indice degli ID
+        doc = system.get_document(doc_id)
+        if doc is None:
+            return jsonify({"error": "Documento non trovato"}), 404
+        
+        # Formatta il documento
+        formatted_doc = {
+            "id": doc_id,
+            "titolo": doc.titolo,
+            "categoria": doc.categoria,
+            "fonte": doc.fonte,
+            "data": doc.data,
+            "riassunto": doc.riassunto,
+            "testo_semplificato": doc.testo_semplificato,
+            "caso_pratico": doc.caso_pratico,
+            "url": doc.url,
+            "fonti": doc.fonti,
+            "parole_chiave": doc.parole_chiave,
+            "video_correlati": doc.video_correlati,
+            "articoli_correlati": doc.articoli_correlati
+        }
+        return jsonify(formatted_doc)
         
     except Exception as e:
         logger.error(f"Errore durante il recupero del documento: {str(e)}")
@@ -135,35 +396,32 @@ def get_document(doc_id):
 
 
 @app.route('/api/latest', methods=['GET'])
+@cached_response
 def get_latest_normative():
     """Ottiene le normative più recenti per categoria"""
     category = request.args.get('category', None)
+    limit = min(request.args.get('limit', 5, type=int), 100)
+    since = request.args.get('since', None)
+    
+    since_date = parse_date(since) if since else None
+    if since and since_date is None:
+        return jsonify({"error": "Parametro 'since' non valido"}), 400
     
     try:
-        if category:
-            # Filtra per categoria
-            filtered_db = system.processed_database[system.processed_database['categoria'] == category]
-        else:
-            filtered_db = system.processed_database
-        
-        # Ordina per data (assumendo che la data sia in formato stringa)
-        # In un'implementazione reale, convertirei prima la data in datetime
-        sorted_db = filtered_db.sort_values(by='data', ascending=False)
-        
-        # Prendi i primi 5 risultati
-        latest = sorted_db.head(5)
+        # Lettura diretta dall'indice ordinato per data
+        latest = system.get_latest(category=category, limit=limit, since=since_date)
         
         # Formatta i risultati
         formatted_results = []
-        for _, doc in latest.iterrows():
+        for doc in latest:
             formatted_doc = {
-                "id": hash(doc['titolo']),
-                "titolo": doc['titolo'],
-                "categoria": doc['categoria'],
-                "fonte": doc['fonte'],
-                "data": doc['data'],
-                "riassunto": doc['riassunto'][:150] + "...",  # Limita lunghezza
-                "url": doc['url']
+                "id": doc.id,
+                "titolo": doc.titolo,
+                "categoria": doc.categoria,
+                "fonte": doc.fonte,
+                "data": doc.data,
+                "riassunto": doc.riassunto[:150] + "...",  # Limita lunghezza
+                "url": doc.url
             }
             formatted_results.append(formatted_doc)
         
@@ -185,6 +443,8 @@ def save_profile():
     
     if not data or not data.get('email'):
         return jsonify({"error": "Dati profilo incompleti"}), 400
+    if not isinstance(data.get('preferenze_notifiche', {}), dict):
+        return jsonify({"error": "Preferenze di notifica non valide"}), 400
     
     try:
         # In un'implementazione reale, salverei il profilo in un database
@@ -197,11 +457,12 @@ def save_profile():
             "settore": data.get('settore', ''),
             "dimensione": data.get('dimensione', ''),
             "interessi": data.get('interessi', []),
+            "parole_chiave": data.get('parole_chiave', []),
             "preferenze_notifiche": data.get('preferenze_notifiche', {})
         }
         
-        # Simula un ID profilo
-        profile_id = hash(profile_data['email'])
+        # Salvataggio e iscrizione alle notifiche per categorie, settore e parole chiave
+        profile_id = system.subscriptions.save_profile(profile_data)
         
         return jsonify({
             "success": True,
@@ -214,6 +475,45 @@ def save_profile():
         return jsonify({"error": "Errore durante il salvataggio del profilo"}), 500
 
 
+@app.route('/api/profile/<profile_id>/digest', methods=['GET', 'DELETE'])
+def profile_digest(profile_id):
+    """Normative nuove in attesa per il profilo (DELETE le segna come lette)"""
+    if request.method == 'DELETE':
+        documents = system.subscriptions.pop_digest(profile_id)
+    else:
+        documents = system.subscriptions.get_digest(profile_id)
+    
+    if documents is None:
+        return jsonify({"error": "Profilo non trovato"}), 404
+    
+    return jsonify({
+        "profile_id": profile_id,
+        "documenti": documents,
+        "count": len(documents)
+    })
+
+
+def complete_analysis(analysis):
+    """Aggiunge all'analisi i documenti correlati presenti nel database"""
+    related = system.search_documents(' '.join(analysis['parole_chiave'][:5]), top_k=3) if system.is_ready() else []
+    return {
+        **analysis,
+        "temi_principali": list(dict.fromkeys(doc.categoria for doc in related)),
+        "documentazione_correlata": [
+            {"id": doc.id, "titolo": doc.titolo, "url": doc.url}
+            for doc in related
+        ]
+    }
+
+
+def queue_full_response():
+    """Coda delle analisi piena: il client deve riprovare più tardi"""
+    response = jsonify({"error": "Servizio di analisi occupato, riprovare più tardi"})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(ANALYSIS_RETRY_AFTER)
+    return response
+
+
 @app.route('/api/analyze', methods=['POST'])
 def analyze_text():
     """Analizza un testo normativo fornito dall'utente"""
@@ -221,33 +521,61 @@ def analyze_text():
     
     if not data or not data.get('text'):
         return jsonify({"error": "Testo da analizzare mancante"}), 400
+    if not isinstance(data['text'], str):
+        return jsonify({"error": "Il testo da analizzare deve essere una stringa"}), 400
+    if len(data['text']) > ANALYSIS_MAX_LENGTH:
+        return jsonify({"error": f"Testo troppo lungo: massimo {ANALYSIS_MAX_LENGTH} caratteri"}), 413
     
     try:
-        # Simula l'analisi del testo tramite AI
         text = data.get('text')
         
-        # In un'implementazione reale, userei il modello AI
-        # Per ora, restituisco un'analisi simulata
-        analysis = {
-            "riassunto": "Riassunto simulato del testo fornito...",
-            "testo_semplificato": "Versione semplificata del testo...",
-            "parole_chiave": ["parola1", "parola2", "parola3"],
-            "temi_principali": ["tema1", "tema2"],
-            "documentazione_correlata": [
-                {"titolo": "Documento correlato 1", "url": "#"},
-                {"titolo": "Documento correlato 2", "url": "#"}
-            ]
-        }
+        # Testi molto lunghi (o su richiesta): job asincrono da interrogare con GET
+        if data.get('async') or len(text) > ANALYSIS_ASYNC_THRESHOLD:
+            job_id = analysis_pool.submit_job(text)
+            response = jsonify({"success": True, "job_id": job_id, "status_url": f"/api/analyze/{job_id}"})
+            response.status_code = 202
+            response.headers['Location'] = f"/api/analyze/{job_id}"
+            return response
+        
+        # L'analisi gira nel pool di processi, non nel thread della richiesta
+        analysis = analysis_pool.analyze(text, timeout=ANALYSIS_TIMEOUT)
         
         return jsonify({
             "success": True,
-            "analysis": analysis
+            "analysis": complete_analysis(analysis)
         })
         
+    except AnalysisQueueFull:
+        return queue_full_response()
+    except FuturesTimeoutError:
+        logger.error("Timeout durante l'analisi del testo")
+        return jsonify({"error": "Tempo massimo di analisi superato"}), 504
     except Exception as e:
         logger.error(f"Errore durante l'analisi del testo: {str(e)}")
         return jsonify({"error": "Errore durante l'analisi del testo"}), 500
 
 
+@app.route('/api/analyze/<job_id>', methods=['GET'])
+def get_analysis_job(job_id):
+    """Stato e risultato di un'analisi asincrona"""
+    status, analysis = analysis_pool.get_job(job_id)
+    
+    if status is None:
+        return jsonify({"error": "Analisi non trovata"}), 404
+    if status == "failed":
+        return jsonify({"error": "Errore durante l'analisi del testo", "status": status}), 500
+    if status == "pending":
+        response = jsonify({"success": True, "status": status})
+        response.status_code = 202
+        response.headers['Retry-After'] = "1"
+        return response
+    
+    return jsonify({
+        "success": True,
+        "status": status,
+        "analysis": complete_analysis(analysis)
+    })
+
+
 if __name__ == '__main__':
     app.run(debug=True)
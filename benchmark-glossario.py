@@ -0,0 +1,92 @@
+import argparse
+import json
+import random
+import re
+import time
+from normative_system import GlossaryRewriter
+
+# Parole usate per generare termini e testi sintetici
+VOCABULARY = [
+    "decreto", "legge", "comma", "articolo", "impresa", "contributo", "fondo", "perduto",
+    "agevolazione", "fiscale", "credito", "imposta", "adempimento", "deroga", "termine",
+    "domanda", "requisito", "beneficiario", "investimento", "spesa", "ammissibile", "regime",
+    "aiuto", "stato", "disposizione", "attuazione", "sensi", "decorrere", "modalità", "procedura"
+]
+
+
+def generate_glossary(size, rng):
+    """Glossario sintetico di termini da 1 a 4 parole"""
+    glossary = {}
+    while len(glossary) < size:
+        term = ' '.join(rng.choice(VOCABULARY) for _ in range(rng.randint(1, 4)))
+        glossary[term] = f"spiegazione {len(glossary)}"
+    return glossary
+
+
+def generate_texts(count, words_per_text, rng):
+    """Testi sintetici composti dalle stesse parole del glossario"""
+    return [
+        ' '.join(rng.choice(VOCABULARY) for _ in range(words_per_text)) + '.'
+        for _ in range(count)
+    ]
+
+
+def naive_rewrite(glossary, text):
+    """Implementazione precedente: un re.sub per ogni termine"""
+    for term, simple in glossary.items():
+        text = re.sub(r'\b' + re.escape(term) + r'\b', simple, text, flags=re.IGNORECASE)
+    return text
+
+
+def measure(func, texts):
+    """Documenti al secondo"""
+    start = time.perf_counter()
+    for text in texts:
+        func(text)
+    elapsed = time.perf_counter() - start
+    return len(texts) / elapsed if elapsed > 0 else float('inf')
+
+
+def run_benchmark(sizes, num_texts, words_per_text, seed):
+    """Confronta la riscrittura a singolo passaggio con quella termine per termine"""
+    rng = random.Random(seed)
+    texts = generate_texts(num_texts, words_per_text, rng)
+    results = []
+
+    for size in sizes:
+        glossary = generate_glossary(size, rng)
+
+        start = time.perf_counter()
+        rewriter = GlossaryRewriter(glossary)
+        compile_time = time.perf_counter() - start
+
+        result = {
+            "terms": size,
+            "compile_ms": round(compile_time * 1000, 2),
+            "single_pass_docs_per_sec": round(measure(rewriter.rewrite, texts), 1),
+            "naive_docs_per_sec": round(measure(lambda text: naive_rewrite(glossary, text), texts), 1)
+        }
+        results.append(result)
+        print(
+            f"{size:>6} termini | compilazione {result['compile_ms']:>8} ms | "
+            f"singolo passaggio {result['single_pass_docs_per_sec']:>10} doc/s | "
+            f"termine per termine {result['naive_docs_per_sec']:>10} doc/s"
+        )
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput della riscrittura con glossario al variare della dimensione")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 3000])
+    parser.add_argument("--texts", type=int, default=200)
+    parser.add_argument("--words", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="File JSON in cui salvare i risultati")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sizes, args.texts, args.words, args.seed)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
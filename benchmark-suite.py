@@ -0,0 +1,377 @@
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import re
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# Il benchmark prepara da solo il corpus: niente aggiornamento automatico all'import dell'API
+os.environ.setdefault("NORMATIVE_REFRESH_ON_START", "0")
+os.environ.setdefault("NORMATIVE_REFRESH_INTERVAL", "0")
+
+import numpy as np
+import pandas as pd
+from normative_system import (
+    NormativeScraper, NormativeSystem, KeywordModel, DuplicateDetector, DocumentStore, StoredDocument,
+    RelatedArticlesMatcher, ArrowDocumentStore, ColumnarSnapshot
+)
+
+API_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "api-normative.py")
+
+# Query usate per la ricerca e per le rotte dell'API
+QUERIES = [
+    "startup innovative", "credito d'imposta", "apprendistato", "economia circolare",
+    "esportazioni dogane", "digitalizzazione PMI", "contributo a fondo perduto",
+    "formazione professionale", "transizione ecologica", "ricerca e sviluppo",
+    "aiuti per assumere giovani", "incentivi investimenti"
+]
+
+
+def peak_rss_mb():
+    """Picco di memoria residente dall'avvio del processo (MB)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux riporta KB, macOS byte
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def current_rss_mb():
+    """Memoria residente attuale del processo (MB), None se non disponibile"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def latency_stats(latencies):
+    """Percentili di latenza in millisecondi"""
+    values = np.asarray(latencies) * 1000
+    return {
+        "requests": len(values),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "max_ms": round(float(values.max()), 3),
+        "throughput_per_sec": round(len(values) / float(values.sum() / 1000), 1) if values.sum() else None
+    }
+
+
+def run_stage(name, func, items, trace_memory=True):
+    """Esegue uno stadio misurando tempo reale, tempo CPU, throughput e memoria dello stadio"""
+    # ru_maxrss è un picco dell'intero processo: per lo stadio servono la variazione
+    # della memoria residente e il picco delle allocazioni (tracemalloc)
+    rss_start = current_rss_mb()
+    if trace_memory:
+        tracemalloc.start()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    result = func()
+    wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+    rss_end = current_rss_mb()
+
+    stats = {
+        "items": items,
+        "wall_seconds": round(wall, 4),
+        "cpu_seconds": round(cpu, 4),
+        "items_per_sec": round(items / wall, 1) if wall > 0 else None,
+        "rss_delta_mb": round(rss_end - rss_start, 1) if rss_start is not None and rss_end is not None else None
+    }
+    if trace_memory:
+        stats["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        tracemalloc.stop()
+
+    memory = f"RSS {stats['rss_delta_mb']:+} MB" if stats["rss_delta_mb"] is not None else "RSS n/d"
+    if trace_memory:
+        memory += f", picco allocazioni {stats['traced_peak_mb']} MB"
+    print(f"  {name:<22} {stats['wall_seconds']:>9.3f} s  {stats['items_per_sec'] or 0:>12.1f} elem/s  {memory}")
+    return result, stats
+
+
+def time_calls(func, args_list):
+    """Latenza di ogni singola chiamata"""
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def to_processed(corpus_df):
+    """Campi elaborati sintetici, senza NLP, per misurare gli stadi di servizio"""
+    processed = corpus_df.copy()
+    processed["riassunto"] = [text.split("\n\n")[1] if "\n\n" in text else text for text in processed["testo"]]
+    processed["testo_semplificato"] = processed["testo"]
+    processed["parole_chiave"] = [re.findall(r"\w+", title.lower())[:10] for title in processed["titolo"]]
+    processed["caso_pratico"] = ""
+    processed["video_correlati"] = [[] for _ in range(len(processed))]
+    processed["articoli_correlati"] = [[] for _ in range(len(processed))]
+    return processed
+
+
+def generate_articles(corpus_df, count, rng):
+    """Articoli di giornale sintetici ricavati dai titoli del corpus, già categorizzati"""
+    rows = corpus_df.sample(n=count, replace=count > len(corpus_df), random_state=rng.randrange(2 ** 32))
+    return [
+        {
+            "titolo": f"Novità: {title}",
+            "url": f"https://news.example.it/{pos}",
+            "descrizione": " ".join(text.split()[:40]),
+            "data_pubblicazione": date,
+            "data_iso": f"{date}T00:00:00",
+            "fonte": "news.example.it",
+            "categoria": category
+        }
+        for pos, (title, text, date, category) in enumerate(zip(rows["titolo"], rows["testo"], rows["data"], rows["categoria"]))
+    ]
+
+
+def document_store_memory(processed):
+    """Memoria del DataFrame elaborato e dell'archivio dei documenti serviti (MB)"""
+    tracemalloc.start()
+    store = DocumentStore(processed)
+    store_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return store, {
+        "dataframe_mb": round(processed.memory_usage(deep=True).sum() / (1024 * 1024), 1),
+        "store_mb": round(store_bytes / (1024 * 1024), 1)
+    }
+
+
+def arrow_store_memory(processed, filename="benchmark_snapshot.arrow"):
+    """Memoria privata (heap Python) dell'archivio servito dallo snapshot mappato; le pagine del file sono condivise"""
+    if not ColumnarSnapshot.save(processed, filename):
+        return None, None
+    table = ColumnarSnapshot.open(filename)
+    tracemalloc.start()
+    store = ArrowDocumentStore(table)
+    store_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return store, round(store_bytes / (1024 * 1024), 1)
+
+
+def read_dataframe_row(processed, pos):
+    """Lettura dei campi serviti da una riga del DataFrame, come faceva l'API"""
+    row = processed.iloc[pos]
+    return {field: row.get(field) for field in StoredDocument.FIELDS}
+
+
+def read_stored_document(store, pos):
+    document = store[pos]
+    return {field: getattr(document, field) for field in StoredDocument.FIELDS}
+
+
+def load_api():
+    """Importa l'API Flask dal file del progetto"""
+    spec = importlib.util.spec_from_file_location("api_normative", API_FILE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def benchmark_size(num_docs, args, api):
+    """Tutti gli stadi e tutte le rotte per un corpus di num_docs documenti"""
+    print(f"\n== {num_docs} documenti ==")
+    rng = random.Random(args.seed)
+    result = {"documents": num_docs, "stages": {}, "queries": {}, "routes": {}}
+    stages = result["stages"]
+
+    # Stadi del pipeline
+    scraper = NormativeScraper()
+    corpus, stages["generate_corpus"] = run_stage(
+        "generate_corpus", lambda: scraper.generate_corpus(num_docs, seed=args.seed), num_docs, args.trace_memory
+    )
+    scraper.database = corpus
+    _, stages["fingerprints_dates"] = run_stage(
+        "fingerprints_dates", lambda: (scraper.assign_fingerprints(), scraper.assign_dates()), num_docs, args.trace_memory
+    )
+
+    detector = DuplicateDetector(filename=None)
+    _, stages["dedup"] = run_stage(
+        "dedup", lambda: detector.merge(corpus, [source["name"] for source in scraper.sources]), num_docs, args.trace_memory
+    )
+
+    system = NormativeSystem()
+    if args.nlp_docs:
+        sample = corpus.head(args.nlp_docs)
+        _, stages["ai_processing"] = run_stage(
+            "ai_processing", lambda: system.ai_processor.process_all_documents(sample), len(sample), args.trace_memory
+        )
+
+    keyword_model = KeywordModel(filename=None)
+    terms = {doc_id: re.findall(r"\w+", text.lower()) for doc_id, text in zip(corpus["id"], corpus["testo"])}
+    _, stages["tfidf_keywords"] = run_stage(
+        "tfidf_keywords", lambda: (keyword_model.update(terms, terms.keys()), keyword_model.top_keywords()),
+        num_docs, args.trace_memory
+    )
+
+    processed = to_processed(corpus)
+    articles = generate_articles(corpus, args.articles, rng)
+    _, stages["related_articles"] = run_stage(
+        "related_articles", lambda: RelatedArticlesMatcher().match(processed, articles), num_docs, args.trace_memory
+    )
+    _, stages["build_indexes"] = run_stage(
+        "build_indexes", lambda: system.build_indexes(processed), num_docs, args.trace_memory
+    )
+
+    # Archivio dei documenti serviti a confronto con le righe del DataFrame
+    store, result["memory"] = document_store_memory(processed)
+    print(f"  memoria corpus         DataFrame {result['memory']['dataframe_mb']} MB, archivio {result['memory']['store_mb']} MB")
+    positions = [(rng.randrange(num_docs),) for _ in range(args.requests)]
+    result["queries"]["row_dataframe"] = latency_stats(time_calls(lambda pos: read_dataframe_row(processed, pos), positions))
+    result["queries"]["row_store"] = latency_stats(time_calls(lambda pos: read_stored_document(store, pos), positions))
+    arrow_store, result["memory"]["arrow_store_private_mb"] = arrow_store_memory(processed)
+    if arrow_store is not None:
+        print(f"  memoria privata        archivio dallo snapshot mappato {result['memory']['arrow_store_private_mb']} MB")
+        result["queries"]["row_arrow_store"] = latency_stats(
+            time_calls(lambda pos: read_stored_document(arrow_store, pos), positions)
+        )
+
+    # Operazioni di lettura, chiamate direttamente
+    doc_ids = list(system.doc_index)
+    queries = [(rng.choice(QUERIES),) for _ in range(args.requests)]
+    categories = [(rng.choice(scraper.SAMPLE_CATEGORIES),) for _ in range(args.requests)]
+    lookups = [(rng.choice(doc_ids),) for _ in range(args.requests)]
+
+    result["queries"]["search_lexical"] = latency_stats(time_calls(lambda q: system.search_documents(q, top_k=20), queries))
+    result["queries"]["search_hybrid"] = latency_stats(
+        time_calls(lambda q: system.search_documents(q, top_k=20, mode="hybrid"), queries)
+    )
+    result["queries"]["search_faceted"] = latency_stats(time_calls(
+        lambda q, c: system.faceted_search(q, filters={'categoria': [c], 'data_da': datetime(2024, 6, 1)}, top_k=20),
+        [(q, c) for (q,), (c,) in zip(queries, categories)]
+    ))
+    result["queries"]["latest"] = latency_stats(time_calls(lambda c: system.get_latest(category=c), categories))
+    result["queries"]["document"] = latency_stats(time_calls(system.get_document, lookups))
+
+    # Rotte dell'API tramite il client di test di Flask
+    api.system.build_indexes(processed)
+    client = api.app.test_client()
+    prefixes = [(query[:rng.randint(2, 6)],) for (query,) in queries]
+    profiles = [
+        ({"email": f"utente{i}@example.com", "interessi": [category], "parole_chiave": [query.split()[0]],
+          "preferenze_notifiche": {"email": True}},)
+        for i, ((query,), (category,)) in enumerate(zip(queries, categories))
+    ]
+    for (profile,) in profiles:
+        api.system.subscriptions.save_profile(profile)
+    profile_ids = [(api.system.subscriptions.profile_id(profile["email"]),) for (profile,) in profiles]
+    api.system.subscriptions.queue_digests(processed.sample(min(num_docs, 200), random_state=args.seed))
+    # Testi diversi a ogni chiamata, per non misurare la cache dei risultati delle analisi
+    texts = [(f"{text[:2000]} {i}",) for i, text in enumerate(processed["testo"].sample(
+        args.analyze_requests, replace=True, random_state=args.seed
+    ))]
+    # Avvio dei processi di analisi fuori dalla misura
+    client.post("/api/analyze", json={"text": "Avvio del pool di analisi"})
+
+    get = lambda url: client.get(url)
+    post = lambda url, body: client.post(url, json=body)
+    routes = {
+        "GET /api/search": (get, [(f"/api/search?q={q}&limit=20",) for (q,) in queries]),
+        "GET /api/search (facette)": (get, [
+            (f"/api/search?q={q}&category={c}&from=2024-06-01&limit=20",) for (q,), (c,) in zip(queries, categories)
+        ]),
+        "GET /api/suggest": (get, [(f"/api/suggest?q={p}",) for (p,) in prefixes]),
+        "GET /api/latest": (get, [(f"/api/latest?category={c}",) for (c,) in categories]),
+        "GET /api/document": (get, [(f"/api/document/{doc_id}",) for (doc_id,) in lookups]),
+        "GET /api/categories": (get, [("/api/categories",)] * args.requests),
+        "POST /api/profile": (post, [("/api/profile", profile) for (profile,) in profiles]),
+        "GET /api/profile/digest": (get, [(f"/api/profile/{profile_id}/digest",) for (profile_id,) in profile_ids]),
+        "POST /api/analyze": (post, [("/api/analyze", {"text": text}) for (text,) in texts])
+    }
+    for route, (call, calls) in routes.items():
+        # Cache delle risposte svuotata prima di ogni chiamata: si misura il lavoro della rotta
+        result["routes"][route] = latency_stats(time_calls(
+            lambda *call_args: (api.response_cache.clear(), call(*call_args)), calls
+        ))
+    # Stesse ricerche servite dalla cache delle risposte, riscaldata prima della misura
+    for (url,) in routes["GET /api/search"][1]:
+        client.get(url)
+    result["routes"]["GET /api/search (cache)"] = latency_stats(time_calls(get, routes["GET /api/search"][1]))
+
+    for group in ("queries", "routes"):
+        for name, stats in result[group].items():
+            print(f"  {name:<22} p50 {stats['p50_ms']:>8.3f} ms  p95 {stats['p95_ms']:>8.3f} ms  p99 {stats['p99_ms']:>8.3f} ms")
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def compare(results, baseline, threshold):
+    """Confronta con un'esecuzione precedente: restituisce le regressioni oltre la soglia"""
+    regressions = []
+    previous = {run["documents"]: run for run in baseline.get("runs", [])}
+
+    for run in results["runs"]:
+        old = previous.get(run["documents"])
+        if not old:
+            continue
+        for name, stats in run["stages"].items():
+            old_stats = old["stages"].get(name)
+            if old_stats and old_stats.get("items_per_sec") and stats.get("items_per_sec"):
+                change = stats["items_per_sec"] / old_stats["items_per_sec"] - 1
+                if change < -threshold:
+                    regressions.append(f"{run['documents']} doc, stadio {name}: throughput {change:+.0%}")
+        for group in ("queries", "routes"):
+            for name, stats in run[group].items():
+                old_stats = old[group].get(name)
+                if old_stats and old_stats["p95_ms"] > 0:
+                    change = stats["p95_ms"] / old_stats["p95_ms"] - 1
+                    if change > threshold:
+                        regressions.append(f"{run['documents']} doc, {name}: p95 {change:+.0%}")
+
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark degli stadi del pipeline e delle rotte dell'API")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--requests", type=int, default=500, help="Richieste per ogni query e rotta")
+    parser.add_argument("--nlp-docs", type=int, default=200, help="Documenti per lo stadio spaCy (0 per saltarlo)")
+    parser.add_argument("--articles", type=int, default=1000, help="Articoli sintetici per lo stadio degli articoli correlati")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--analyze-requests", type=int, default=50, help="Richieste per la rotta di analisi (spaCy)")
+    parser.add_argument("--no-trace-memory", dest="trace_memory", action="store_false",
+                        help="Non misurare il picco di allocazioni con tracemalloc (più veloce)")
+    parser.add_argument("--output", default=None, help="File JSON dei risultati")
+    parser.add_argument("--compare", default=None, help="File JSON di un'esecuzione precedente da confrontare")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Variazione oltre la quale segnalare una regressione")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output or f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    baseline_file = os.path.abspath(args.compare) if args.compare else None
+
+    # I file di stato (cache, snapshot) vengono scritti in una directory temporanea
+    os.chdir(tempfile.mkdtemp(prefix="normative-bench-"))
+    api = load_api()
+
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "seed": args.seed,
+        "runs": [benchmark_size(size, args, api) for size in args.sizes]
+    }
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=4)
+    print(f"\nRisultati salvati in {output}")
+
+    if baseline_file:
+        with open(baseline_file, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSIONE: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("Nessuna regressione rispetto al riferimento")
@@ -1,28 +1,406 @@
 import logging
+import os
 import re
+import json
+import math
+import heapq
+import hashlib
+import contextlib
+import bisect
+import unicodedata
+import zlib
+import sys
+import queue
+from email.utils import parsedate_to_datetime
+from collections import Counter, OrderedDict, deque
 import pandas as pd
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
 from bs4 import BeautifulSoup
-import spacy
+from nltk.tokenize import sent_tokenize
 import numpy as np
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
 
-# Carica il modello italiano di spaCy
+# Formato colonnare per gli snapshot (opzionale)
 try:
-    nlp = spacy.load("it_core_news_lg")  # Modello italiano di dimensioni maggiori
-except:
-    # Fallback al modello più piccolo se quello grande non è disponibile
-    nlp = spacy.load("it_core_news_sm")
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+# Lock tra processi su file (non disponibile su Windows: lì vale solo il lock tra thread)
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+@contextlib.contextmanager
+def file_lock(filename, blocking=True):
+    """Lock esclusivo tra processi; in modalità non bloccante restituisce False se è già preso da altri"""
+    if fcntl is None or not filename:
+        yield True
+        return
+    
+    with open(filename, 'a+') as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+# Caricamento differito del modello italiano di spaCy
+class LazySpacyModel:
+    """Carica il modello spaCy solo al primo utilizzo effettivo"""
+    
+    def __init__(self, model_names=("it_core_news_lg", "it_core_news_sm")):
+        self.model_names = model_names
+        self._model = None
+        self._lock = threading.Lock()
+    
+    @property
+    def is_loaded(self):
+        return self._model is not None
+    
+    def load(self):
+        """Restituisce il modello, caricandolo se necessario"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import spacy
+                    try:
+                        model = spacy.load(self.model_names[0])  # Modello italiano di dimensioni maggiori
+                    except Exception:
+                        # Fallback al modello più piccolo se quello grande non è disponibile
+                        model = spacy.load(self.model_names[-1])
+                    self._model = model
+        return self._model
+    
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+    
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+
+nlp = LazySpacyModel()
 
 # Configurazione logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+
+def parse_date(value):
+    """Converte una data (ISO delle fonti ufficiali o RFC 2822 dei feed RSS) in datetime UTC senza fuso"""
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str) and value.strip():
+        value = value.strip()
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            try:
+                parsed = parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+    else:
+        return None
+    
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+# Metriche in formato Prometheus, condivise da pipeline e API
+class MetricsRegistry:
+    """Contatori, gauge e istogrammi con etichette, esportati in formato testo Prometheus"""
+    
+    DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+    
+    def __init__(self, prefix="normative"):
+        self.prefix = prefix
+        self.metrics = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def register(self, name, kind, help_text, buckets=None):
+        """Registra una metrica (se non esiste già) e ne restituisce il nome completo"""
+        full_name = f"{self.prefix}_{name}"
+        with self._lock:
+            if full_name not in self.metrics:
+                self.metrics[full_name] = {
+                    'kind': kind,
+                    'help': help_text,
+                    'buckets': buckets or self.DEFAULT_BUCKETS,
+                    'values': {}
+                }
+        return full_name
+    
+    @staticmethod
+    def label_key(labels):
+        return tuple(sorted((labels or {}).items()))
+    
+    def inc(self, name, value=1, labels=None, help_text=""):
+        """Incrementa un contatore"""
+        full_name = self.register(name, 'counter', help_text)
+        key = self.label_key(labels)
+        with self._lock:
+            values = self.metrics[full_name]['values']
+            values[key] = values.get(key, 0) + value
+    
+    def set(self, name, value, labels=None, help_text=""):
+        """Imposta il valore di un gauge"""
+        full_name = self.register(name, 'gauge', help_text)
+        with self._lock:
+            self.metrics[full_name]['values'][self.label_key(labels)] = value
+    
+    def add(self, name, value, labels=None, help_text=""):
+        """Somma un valore (anche negativo) a un gauge"""
+        full_name = self.register(name, 'gauge', help_text)
+        key = self.label_key(labels)
+        with self._lock:
+            values = self.metrics[full_name]['values']
+            values[key] = values.get(key, 0) + value
+    
+    def observe(self, name, value, labels=None, help_text="", buckets=None):
+        """Registra un'osservazione in un istogramma"""
+        full_name = self.register(name, 'histogram', help_text, buckets)
+        key = self.label_key(labels)
+        with self._lock:
+            metric = self.metrics[full_name]
+            histogram = metric['values'].get(key)
+            if histogram is None:
+                histogram = metric['values'][key] = {'counts': [0] * len(metric['buckets']), 'sum': 0.0, 'count': 0}
+            pos = bisect.bisect_left(metric['buckets'], value)
+            if pos < len(histogram['counts']):
+                histogram['counts'][pos] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+    
+    @contextlib.contextmanager
+    def stage(self, stage, documents=0):
+        """Misura tempo reale e CPU di uno stadio del pipeline; il blocco può aggiornare documenti e errori"""
+        result = {'documents': documents, 'failures': 0}
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield result
+        except Exception:
+            result['failures'] += 1
+            raise
+        finally:
+            self.record_stage(stage, time.perf_counter() - wall_start, time.process_time() - cpu_start,
+                              result['documents'], result['failures'])
+    
+    def record_stage(self, stage, wall, cpu, documents, failures):
+        """Registra le misure di uno stadio (anche accumulate su più blocchi dal pipeline a flusso)"""
+        labels = {'stage': stage}
+        self.set("pipeline_stage_seconds", wall, labels, "Durata (tempo reale) dell'ultima esecuzione dello stadio")
+        self.set("pipeline_stage_cpu_seconds", cpu, labels, "Tempo CPU dell'ultima esecuzione dello stadio")
+        self.set("pipeline_stage_documents", documents, labels, "Documenti trattati nell'ultima esecuzione dello stadio")
+        self.set("pipeline_stage_documents_per_second", documents / wall if wall > 0 else 0, labels,
+                 "Throughput dell'ultima esecuzione dello stadio")
+        self.inc("pipeline_stage_failures_total", failures, labels, "Errori per stadio del pipeline")
+        logger.info(f"Stadio {stage}: {wall:.2f}s ({cpu:.2f}s CPU), {documents} documenti, {failures} errori")
+    
+    @staticmethod
+    def format_labels(key, extra=()):
+        labels = list(key) + list(extra)
+        if not labels:
+            return ''
+        escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+        return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+    
+    def render(self):
+        """Testo nel formato di esposizione di Prometheus"""
+        lines = []
+        with self._lock:
+            for full_name, metric in self.metrics.items():
+                lines.append(f"# HELP {full_name} {metric['help']}")
+                lines.append(f"# TYPE {full_name} {metric['kind']}")
+                for key, value in metric['values'].items():
+                    if metric['kind'] != 'histogram':
+                        lines.append(f"{full_name}{self.format_labels(key)} {value}")
+                        continue
+                    cumulative = 0
+                    for bucket, count in zip(metric['buckets'], value['counts']):
+                        cumulative += count
+                        lines.append(f"{full_name}_bucket{self.format_labels(key, [('le', bucket)])} {cumulative}")
+                    lines.append(f"{full_name}_bucket{self.format_labels(key, [('le', '+Inf')])} {value['count']}")
+                    lines.append(f"{full_name}_sum{self.format_labels(key)} {value['sum']}")
+                    lines.append(f"{full_name}_count{self.format_labels(key)} {value['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+class HttpFetcher:
+    """Recupero HTTP concorrente con pool di connessioni, retry e GET condizionali"""
+    
+    def __init__(self, max_workers=8, max_per_host=2, timeout=(5, 30), retries=3,
+                 backoff_factor=0.5, cache_file="http_cache.json"):
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.cache_file = cache_file
+        
+        # Sessione condivisa: le connessioni verso lo stesso host vengono riutilizzate
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET'])
+        )
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max_per_host, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        self._host_limits = {}
+        self._lock = threading.Lock()
+        self.cache = {}
+        self.load_cache()
+    
+    def load_cache(self):
+        """Carica validatori (ETag/Last-Modified) e risultati già elaborati"""
+        if self.cache_file and os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self.cache = json.load(f)
+            except Exception as e:
+                logger.error(f"Errore durante il caricamento della cache HTTP: {str(e)}")
+                self.cache = {}
+    
+    def save_cache(self):
+        """Salva la cache HTTP su disco in modo atomico"""
+        if not self.cache_file:
+            return
+        with self._lock:
+            tmp_filename = f"{self.cache_file}.tmp"
+            with open(tmp_filename, 'w', encoding='utf-8') as f:
+                json.dump(self.cache, f, ensure_ascii=False)
+            os.replace(tmp_filename, self.cache_file)
+    
+    def host_limit(self, url):
+        """Semaforo che limita le richieste contemporanee verso lo stesso host"""
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.Semaphore(self.max_per_host)
+            return self._host_limits[host]
+    
+    def fetch(self, url, parse):
+        """Scarica un URL e ne restituisce il contenuto elaborato da parse()"""
+        cached = self.cache.get(url)
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        
+        host = urlparse(url).netloc
+        start = time.perf_counter()
+        with self.host_limit(url):
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            except Exception:
+                metrics.inc("fetch_errors_total", labels={'host': host}, help_text="Errori di rete per host")
+                raise
+            finally:
+                metrics.observe("fetch_seconds", time.perf_counter() - start, {'host': host},
+                                "Latenza delle richieste HTTP per host")
+        metrics.inc("fetch_responses_total", labels={'host': host, 'status': response.status_code},
+                    help_text="Risposte HTTP per host e codice di stato")
+        
+        # Risorsa invariata: si riusa il risultato già elaborato
+        if response.status_code == 304 and cached:
+            logger.info(f"Contenuto invariato (304) per {url}")
+            return cached['parsed']
+        
+        response.raise_for_status()
+        parsed = parse(response.text)
+        
+        if response.headers.get('ETag') or response.headers.get('Last-Modified'):
+            with self._lock:
+                self.cache[url] = {
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified'),
+                    'parsed': parsed
+                }
+        return parsed
+    
+    def map(self, func, items):
+        """Applica func a tutti gli elementi in parallelo, restituendo i risultati nello stesso ordine"""
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(func, item) for item in items]
+            return [future.result() for future in futures]
+
+
 class NormativeScraper:
     """Classe per lo scraping delle normative da fonti ufficiali"""
     
-    def __init__(self):
+    # Modelli per i dati di esempio e per i corpus sintetici
+    SAMPLE_CATEGORIES = [
+        "startup_innovazione", 
+        "fisco_agevolazioni", 
+        "lavoro_contratti", 
+        "ambiente_sostenibilita", 
+        "importexport_esteri"
+    ]
+    
+    SAMPLE_TITLES = {
+        "startup_innovazione": (
+            ["Decreto Legge ", "Incentivi per ", "Piano Nazionale per "],
+            ["startup innovative", "imprese tecnologiche", "digitalizzazione PMI"]
+        ),
+        "fisco_agevolazioni": (
+            ["Decreto Fiscale ", "Agevolazioni ", "Credito d'imposta per "],
+            ["PMI", "investimenti", "ricerca e sviluppo"]
+        ),
+        "lavoro_contratti": (
+            ["Decreto Lavoro ", "Normativa sui ", "Regolamento per "],
+            ["contratti di lavoro", "apprendistato", "formazione professionale"]
+        ),
+        "ambiente_sostenibilita": (
+            ["Decreto Ambiente ", "Incentivi per ", "Normativa sulla "],
+            ["economia circolare", "transizione ecologica", "efficienza energetica"]
+        ),
+        "importexport_esteri": (
+            ["Decreto per ", "Regolamento sulle ", "Normativa per "],
+            ["esportazioni", "dogane", "internazionalizzazione PMI"]
+        )
+    }
+    
+    SAMPLE_ARTICLES = [
+        "Art. {num}\nFinalità e ambito di applicazione\n\nIl presente decreto stabilisce le modalità di attuazione "
+        "degli incentivi previsti per {subject}, con particolare riferimento alle condizioni di accesso, "
+        "ai soggetti beneficiari e alle spese ammissibili.",
+        "Art. {num}\nSoggetti beneficiari\n\nPossono accedere alle agevolazioni le imprese iscritte al registro "
+        "delle imprese con sede legale in Italia, ai sensi dell'articolo 2 del decreto legislativo di riferimento.",
+        "Art. {num}\nSpese ammissibili\n\nSono ammissibili le spese sostenute a decorrere dalla data di "
+        "pubblicazione, nella misura di un contributo a fondo perduto pari al {percent}% dei costi.",
+        "Art. {num}\nProcedura\n\nLa domanda è presentata entro {days} giorni. Il comma 3 disciplina gli "
+        "adempimenti a carico del beneficiario e i casi in deroga.",
+        "Art. {num}\nControlli e revoca\n\nLe amministrazioni competenti verificano il rispetto dei requisiti; "
+        "in caso di irregolarità l'agevolazione fiscale è revocata."
+    ]
+    
+    def __init__(self, fetcher=None):
         self.database = pd.DataFrame()
+        self.fetcher = fetcher or HttpFetcher()
         self.sources = [
             {
                 "name": "Gazzetta Ufficiale",
@@ -51,38 +429,137 @@ class NormativeScraper:
             }
         ]
     
+    def scrape_source(self, source):
+        """Esegue lo scraping di una singola fonte"""
+        start = time.perf_counter()
+        try:
+            logger.info(f"Scraping da {source['name']}...")
+            
+            # Qui andrebbe implementato lo scraping effettivo, tramite self.fetcher.fetch(source['url'], ...)
+            # Per semplicità, generiamo dati di esempio
+            sample_data = self.generate_sample_data(source)
+            
+            logger.info(f"Recuperati {len(sample_data)} documenti da {source['name']}")
+            return sample_data
+            
+        except Exception as e:
+            metrics.inc("source_errors_total", labels={'source': source['name']}, help_text="Errori di scraping per fonte")
+            logger.error(f"Errore durante lo scraping di {source['name']}: {str(e)}")
+            return []
+        finally:
+            metrics.observe("source_fetch_seconds", time.perf_counter() - start, {'source': source['name']},
+                            "Durata dello scraping per fonte")
+    
     def scrape_all_sources(self):
         """Esegue lo scraping di tutte le fonti configurate"""
         all_data = []
         
-        for source in self.sources:
-            try:
-                logger.info(f"Scraping da {source['name']}...")
-                
-                # Qui andrebbe implementato lo scraping effettivo
-                # Per semplicità, generiamo dati di esempio
-                sample_data = self.generate_sample_data(source)
-                all_data.extend(sample_data)
-                
-                logger.info(f"Recuperati {len(sample_data)} documenti da {source['name']}")
-                
-            except Exception as e:
-                logger.error(f"Errore durante lo scraping di {source['name']}: {str(e)}")
+        # Le fonti vengono interrogate in parallelo: il tempo totale è quello della più lenta
+        for sample_data in self.fetcher.map(self.scrape_source, self.sources):
+            all_data.extend(sample_data)
+        self.fetcher.save_cache()
         
         # Converti in DataFrame
         self.database = pd.DataFrame(all_data)
+        self.assign_document_ids()
+        
+        return self.database
+    
+    @staticmethod
+    def compute_document_id(doc):
+        """Calcola un ID stabile derivato dal contenuto del documento"""
+        # A differenza di hash(), sha1 non dipende dal processo né dal riavvio
+        key = "\x1f".join(str(doc.get(field, '')) for field in ('fonte', 'url', 'titolo', 'data', 'testo'))
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    
+    def assign_document_ids(self):
+        """Assegna a ogni documento del database un ID deterministico"""
+        if self.database.empty:
+            return self.database
+        
+        ids = []
+        seen = {}
+        for doc in self.database.to_dict('records'):
+            doc_id = self.compute_document_id(doc)
+            # Documenti identici ricevono un suffisso progressivo, sempre nello stesso ordine
+            if doc_id in seen:
+                seen[doc_id] += 1
+                doc_id = f"{doc_id}-{seen[doc_id]}"
+            else:
+                seen[doc_id] = 0
+            ids.append(doc_id)
+        
+        self.database['id'] = ids
+        return self.database
+    
+    def assign_dates(self):
+        """Converte una volta sola le date di pubblicazione in datetime"""
+        if self.database.empty:
+            return self.database
         
+        self.database['data_dt'] = pd.to_datetime([parse_date(value) for value in self.database['data']])
+        return self.database
+    
+    @staticmethod
+    def compute_fingerprint(doc):
+        """Impronta del contenuto: cambia se cambia il testo o un qualsiasi metadato"""
+        content = {key: value for key, value in doc.items() if key not in ('id', 'impronta', 'data_dt', 'fonti')}
+        serialized = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(serialized.encode('utf-8')).hexdigest()
+    
+    def assign_fingerprints(self):
+        """Calcola l'impronta del contenuto di ogni documento del database"""
+        if self.database.empty:
+            return self.database
+        
+        self.database['impronta'] = [self.compute_fingerprint(doc) for doc in self.database.to_dict('records')]
+        return self.database
+    
+    def generate_corpus(self, num_docs, seed=42):
+        """Genera un corpus sintetico riproducibile, di dimensione arbitraria, dagli stessi modelli dei dati di esempio"""
+        rng = np.random.default_rng(seed)
+        
+        categories = rng.integers(0, len(self.SAMPLE_CATEGORIES), num_docs)
+        sources = rng.integers(0, len(self.sources), num_docs)
+        prefixes = rng.integers(0, 3, num_docs)
+        subjects = rng.integers(0, 3, num_docs)
+        years = np.where(rng.random(num_docs) < 0.3, 2025, 2024)
+        months = rng.integers(1, 13, num_docs)
+        days = rng.integers(1, 29, num_docs)
+        num_articles = rng.integers(2, len(self.SAMPLE_ARTICLES) + 1, num_docs)
+        percents = rng.integers(10, 80, num_docs)
+        deadlines = rng.integers(30, 180, num_docs)
+        
+        documents = []
+        for i in range(num_docs):
+            category = self.SAMPLE_CATEGORIES[categories[i]]
+            source = self.sources[sources[i]]
+            title_prefixes, title_subjects = self.SAMPLE_TITLES[category]
+            subject = title_subjects[subjects[i]]
+            title = f"{title_prefixes[prefixes[i]]}{subject} n. {i + 1}/{years[i]}"
+            
+            articles = [
+                template.format(num=num + 1, subject=subject, percent=percents[i], days=deadlines[i])
+                for num, template in enumerate(self.SAMPLE_ARTICLES[:num_articles[i]])
+            ]
+            
+            documents.append({
+                "titolo": title,
+                "testo": title + "\n\n" + "\n\n".join(articles),
+                "data": f"{years[i]}-{months[i]:02d}-{days[i]:02d}",
+                "categoria": category,
+                "fonte": source["name"],
+                "tipo_fonte": source["type"],
+                "url": f"{source['url']}/{i + 1}"
+            })
+        
+        self.database = pd.DataFrame(documents)
+        self.assign_document_ids()
         return self.database
     
     def generate_sample_data(self, source):
         """Genera dati di esempio per simulare lo scraping"""
-        categories = [
-            "startup_innovazione", 
-            "fisco_agevolazioni", 
-            "lavoro_contratti", 
-            "ambiente_sostenibilita", 
-            "importexport_esteri"
-        ]
+        categories = self.SAMPLE_CATEGORIES
         
         num_docs = np.random.randint(5, 15)  # Genera tra 5 e 15 documenti
         
@@ -91,21 +568,7 @@ class NormativeScraper:
             category = np.random.choice(categories)
             
             # Genera titoli in base alla categoria
-            if category == "startup_innovazione":
-                title_prefixes = ["Decreto Legge ", "Incentivi per ", "Piano Nazionale per "]
-                title_subjects = ["startup innovative", "imprese tecnologiche", "digitalizzazione PMI"]
-            elif category == "fisco_agevolazioni":
-                title_prefixes = ["Decreto Fiscale ", "Agevolazioni ", "Credito d'imposta per "]
-                title_subjects = ["PMI", "investimenti", "ricerca e sviluppo"]
-            elif category == "lavoro_contratti":
-                title_prefixes = ["Decreto Lavoro ", "Normativa sui ", "Regolamento per "]
-                title_subjects = ["contratti di lavoro", "apprendistato", "formazione professionale"]
-            elif category == "ambiente_sostenibilita":
-                title_prefixes = ["Decreto Ambiente ", "Incentivi per ", "Normativa sulla "]
-                title_subjects = ["economia circolare", "transizione ecologica", "efficienza energetica"]
-            else:  # importexport_esteri
-                title_prefixes = ["Decreto per ", "Regolamento sulle ", "Normativa per "]
-                title_subjects = ["esportazioni", "dogane", "internazionalizzazione PMI"]
+            title_prefixes, title_subjects = self.SAMPLE_TITLES[category]
             
             title_prefix = np.random.choice(title_prefixes)
             title_subject = np.random.choice(title_subjects)
@@ -125,4 +588,49 @@ class NormativeScraper:
             Finalità e ambito di applicazione
             
             Il presente decreto stabilisce le modalità di attuazione degli incentivi previsti per {title_subject}, 
-            con particolare riferimento alle condizioni di accesso, ai
\ No newline at end of file
+            con particolare riferimento alle condizioni di accesso, ai soggetti beneficiari e alle spese ammissibili.
+            
+            Art. 2
+            Spese ammissibili
+            
+            Sono ammissibili le spese sostenute a decorrere dalla data di pubblicazione, nella misura di un contributo 
+            a fondo perduto pari al {np.random.randint(10, 80)}% dei costi. La domanda è presentata entro {np.random.randint(30, 180)} giorni.
+            """
+            
+            sample_data.append({
+                "titolo": title,
+                "testo": text,
+                "data": date,
+                "categoria": category,
+                "fonte": source["name"],
+                "tipo_fonte": source["type"],
+                "url": f"{source['url']}/{i + 1}"
+            })
+        
+        return sample_data
+    
+    def save_to_json(self, filename="normative_database.json"):
+        """Salva il database dello scraping in JSON"""
+        tmp_filename = f"{filename}.tmp"
+        self.database.to_json(tmp_filename, orient='records', force_ascii=False, indent=4)
+        os.replace(tmp_filename, filename)
+        logger.info(f"Database salvato in {filename}")
+    
+    def load_from_json(self, filename="normative_database.json"):
+        """Carica il database dello scraping salvato in precedenza"""
+        if not os.path.exists(filename):
+            return False
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                self.database = pd.DataFrame(json.load(f))
+            logger.info(f"Database caricato da {filename}: {len(self.database)} documenti")
+            return True
+        except Exception as e:
+            logger.error(f"Errore durante il caricamento del database: {str(e)}")
+            return False
+
+
+# Classe per l'elaborazione AI dei documenti
+class NormativeAIProcessor:
+    """Estrae parole chiave, riassunti, testi semplificati e casi pratici dai documenti"""
+    
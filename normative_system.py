@@ -0,0 +1,17 @@
+"""Modulo importabile del sistema normativo, composto dai due file sorgente del progetto"""
+import os
+
+# I sorgenti sono divisi in due file: il primo contiene import, scraping e l'inizio di NormativeAIProcessor,
+# il secondo il resto del processore, gli indici e NormativeSystem
+SOURCE_FILES = ("normative-ai-processor.py", "web-scraping-system.py")
+
+_base_dir = os.path.dirname(os.path.abspath(__file__))
+_source = "\n".join(
+    open(os.path.join(_base_dir, name), encoding="utf-8").read() for name in SOURCE_FILES
+)
+
+# Eseguito nel namespace di questo modulo: classi e funzioni risultano definite in "normative_system",
+# quindi restano serializzabili con pickle per i processi di analisi
+exec(compile(_source, os.path.join(_base_dir, SOURCE_FILES[0]), "exec"), globals())
+
+del _source
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+# normative_system si trova nella radice del progetto, anche lanciando pytest da un'altra cartella
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def documents_df():
+    """Piccolo corpus elaborato, con i campi usati dagli indici"""
+    rows = [
+        ("d1", "Credito d'imposta per investimenti in beni strumentali", "fisco_agevolazioni",
+         "Agenzia delle Entrate", "agency", "2024-01-15", ["credito", "imposta", "investimenti"]),
+        ("d2", "Decreto startup innovative e incentivi digitali", "startup_innovazione",
+         "Ministero dello Sviluppo Economico", "ministry", "2024-02-28", ["startup", "incentivi", "digitale"]),
+        ("d3", "Contratti di apprendistato e formazione professionale", "lavoro_contratti",
+         "INPS", "agency", "2024-02-01", ["apprendistato", "formazione"]),
+        ("d4", "Credito d'imposta ricerca e sviluppo", "fisco_agevolazioni",
+         "Gazzetta Ufficiale", "official", "2024-03-10", ["credito", "ricerca", "sviluppo"]),
+        ("d5", "Economia circolare: contributi a fondo perduto", "ambiente_sostenibilita",
+         "Ministero dello Sviluppo Economico", "ministry", None, ["economia", "circolare", "contributi"]),
+    ]
+    documents = pd.DataFrame(rows, columns=["id", "titolo", "categoria", "fonte", "tipo_fonte", "data", "parole_chiave"])
+    documents["data_dt"] = pd.to_datetime(documents["data"])
+    documents["riassunto"] = "Sintesi: " + documents["titolo"]
+    documents["testo_semplificato"] = documents["titolo"] + ". Testo semplificato della normativa."
+    documents["url"] = "https://example.com/" + documents["id"]
+    return documents
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from normative_system import ArrowDocumentStore, ColumnarSnapshot, DocumentStore, StoredDocument
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def processed_df(documents_df):
+    """Corpus elaborato con campi annidati, embedding e date in formati diversi"""
+    processed = documents_df.copy()
+    # Record riutilizzati dall'archivio JSON: la data arriva come stringa
+    processed["data_dt"] = [pd.Timestamp("2024-01-15"), "2024-02-28T00:00:00", "2024-02-01", None, pd.NaT]
+    processed["fonti"] = [[source] for source in processed["fonte"]]
+    processed["video_correlati"] = [[], [{"titolo": "Video", "url": "v1"}], [], [], []]
+    processed["articoli_correlati"] = [[{"titolo": "Articolo", "url": "a1", "rilevanza": 0.5}], [], [], [], []]
+    processed["embedding"] = [np.arange(4, dtype=np.float32) + i for i in range(4)] + [[]]
+    return processed
+
+
+@pytest.mark.parametrize("chunk_size", [None, 2])
+def test_round_trip(tmp_path, processed_df, chunk_size):
+    filename = str(tmp_path / "snapshot.arrow")
+    assert ColumnarSnapshot.save(processed_df, filename, chunk_size=chunk_size)
+    table, loaded, embeddings = ColumnarSnapshot.load(filename)
+
+    assert table.num_rows == len(processed_df)
+    assert list(loaded["id"]) == list(processed_df["id"])
+    assert list(loaded["titolo"]) == list(processed_df["titolo"])
+    assert loaded["parole_chiave"].tolist() == processed_df["parole_chiave"].tolist()
+    assert loaded["video_correlati"].tolist() == processed_df["video_correlati"].tolist()
+    assert loaded["articoli_correlati"][0] == [{"titolo": "Articolo", "url": "a1", "rilevanza": 0.5}]
+    # Date unificate in una colonna timestamp
+    assert str(loaded["data_dt"].dtype) == "datetime64[ns]"
+    assert loaded["data_dt"].tolist()[:3] == [pd.Timestamp("2024-01-15"), pd.Timestamp("2024-02-28"), pd.Timestamp("2024-02-01")]
+    assert loaded["data_dt"].isna().tolist() == [False, False, False, True, True]
+    # Documenti senza vettore: riga a zero
+    assert embeddings.shape == (5, 4)
+    assert embeddings[1].tolist() == [1, 2, 3, 4] and not embeddings[4].any()
+
+
+def test_load_colonne_selezionate(tmp_path, processed_df):
+    filename = str(tmp_path / "snapshot.arrow")
+    ColumnarSnapshot.save(processed_df, filename)
+    _, loaded, embeddings = ColumnarSnapshot.load(filename, columns=("id", "categoria"))
+    assert list(loaded.columns) == ["id", "categoria"]
+    assert embeddings is None
+
+
+def test_snapshot_mancante(tmp_path):
+    assert ColumnarSnapshot.load(str(tmp_path / "assente.arrow")) == (None, None, None)
+
+
+@pytest.mark.parametrize("chunk_size", [None, 2])
+def test_archivio_arrow_come_archivio_in_memoria(tmp_path, processed_df, chunk_size):
+    filename = str(tmp_path / "snapshot.arrow")
+    ColumnarSnapshot.save(processed_df, filename, chunk_size=chunk_size)
+    arrow_store = ArrowDocumentStore(ColumnarSnapshot.open(filename))
+    memory_store = DocumentStore(processed_df)
+
+    assert len(arrow_store) == len(memory_store)
+    for pos in range(len(memory_store)):
+        for field in StoredDocument.FIELDS:
+            assert arrow_store[pos][field] == memory_store[pos][field], field
+    assert arrow_store[-1].id == "d5"
+    assert arrow_store.get("d3").titolo == processed_df["titolo"].iloc[2]
+    assert arrow_store.get("inesistente") is None
+    with pytest.raises(IndexError):
+        arrow_store[len(memory_store)]
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from normative_system import FacetIndex
+
+
+def ids(index, documents_df, bits):
+    return list(documents_df["id"][index.unpack(bits)])
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    ("2024-01-15", "2024-01-15", ["d1"]),
+    ("2024-01-16", "2024-02-28", ["d2", "d3"]),
+    ("2024-02-01", None, ["d2", "d3", "d4"]),
+    (None, "2024-02-01", ["d1", "d3"]),
+    ("2024-02-02", "2024-02-27", []),
+    ("2025-01-01", None, []),
+])
+def test_date_range_estremi_inclusi(documents_df, start, end, expected):
+    index = FacetIndex(documents_df)
+    assert ids(index, documents_df, index.date_range(start, end)) == expected
+
+
+def test_date_range_senza_estremi_esclude_i_documenti_senza_data(documents_df):
+    index = FacetIndex(documents_df)
+    assert ids(index, documents_df, index.date_range()) == ["d1", "d2", "d3", "d4"]
+
+
+def test_date_range_con_orario(documents_df):
+    documents_df["data_dt"] = documents_df["data_dt"] + pd.Timedelta(hours=12)
+    index = FacetIndex(documents_df)
+    # Una data senza orario vale fino a fine giornata; un istante preciso no
+    assert ids(index, documents_df, index.date_range(None, "2024-01-15")) == ["d1"]
+    assert ids(index, documents_df, index.date_range(None, "2024-01-15 11:00")) == []
+
+
+def test_date_range_come_filtro_pandas():
+    rng = np.random.default_rng(7)
+    dates = pd.Timestamp("2023-01-01") + pd.to_timedelta(rng.integers(0, 900, 2000), unit="D")
+    documents_df = pd.DataFrame({
+        "id": [f"d{i}" for i in range(2000)],
+        "categoria": rng.choice(["a", "b", "c"], 2000),
+        "data_dt": dates
+    })
+    documents_df.loc[::37, "data_dt"] = pd.NaT
+    index = FacetIndex(documents_df)
+    for _ in range(50):
+        start, end = sorted(pd.Timestamp("2022-12-01") + pd.to_timedelta(rng.integers(0, 1000, 2), unit="D"))
+        expected = ((documents_df["data_dt"] >= start) & (documents_df["data_dt"] <= end)).to_numpy()
+        assert (index.unpack(index.date_range(start, end)) == expected).all()
+
+
+def test_filter_e_counts(documents_df):
+    index = FacetIndex(documents_df)
+    filters = {"categoria": ["fisco_agevolazioni"], "data_da": pd.Timestamp("2024-02-01")}
+    assert ids(index, documents_df, index.filter(filters)) == ["d4"]
+
+    counts = index.counts(index.all, filters)
+    # Ogni faccetta ignora il proprio filtro: le altre categorie restano selezionabili
+    assert counts["categoria"] == {"fisco_agevolazioni": 1, "startup_innovazione": 1, "lavoro_contratti": 1}
+    assert counts["fonte"] == {"Gazzetta Ufficiale": 1}
+    # I candidati limitano tutti i conteggi
+    candidates = index.from_positions([0, 1])
+    assert index.counts(candidates, {})["categoria"] == {"fisco_agevolazioni": 1, "startup_innovazione": 1}
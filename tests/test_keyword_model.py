@@ -0,0 +1,58 @@
+from normative_system import KeywordModel
+
+
+def make_model(num_keywords=10, filename=None):
+    model = KeywordModel(filename=filename, num_keywords=num_keywords)
+    model.add("a", ["credito", "imposta", "credito", "decreto"])
+    model.add("b", ["startup", "decreto", "incentivi"])
+    model.add("c", ["apprendistato", "decreto"])
+    return model
+
+
+def test_top_keywords_per_tf_idf():
+    keywords = make_model().top_keywords()
+    # "decreto" è in tutti i documenti: pesa meno dei termini specifici
+    assert keywords["a"][0] == "credito"
+    assert keywords["a"][-1] == "decreto"
+    assert keywords["c"] == ["apprendistato", "decreto"]
+    assert set(keywords) == {"a", "b", "c"}
+
+
+def test_top_keywords_limitate_a_num_keywords():
+    keywords = make_model(num_keywords=2).top_keywords()
+    assert keywords["a"] == ["credito", "imposta"]
+    assert all(len(terms) <= 2 for terms in keywords.values())
+
+
+def test_add_sostituisce_e_remove_aggiorna_le_frequenze():
+    model = make_model()
+    decreto = model.vocabulary["decreto"]
+    assert model.doc_freq[decreto] == 3
+    model.add("a", ["credito"])
+    assert model.doc_freq[decreto] == 2
+    model.remove(["b", "inesistente"])
+    assert model.doc_freq[decreto] == 1
+    assert model.top_keywords() == {"a": ["credito"], "c": ["apprendistato", "decreto"]}
+
+
+def test_update_allinea_al_corpus():
+    model = make_model()
+    model.update({"d": ["export", "dogane"], "x": ["ignorato"]}, ["a", "d"])
+    assert set(model.rows) == {"a", "d"}
+    assert model.top_keywords()["d"] == ["export", "dogane"]
+
+
+def test_modello_vuoto():
+    model = KeywordModel(filename=None)
+    assert model.top_keywords() == {}
+    model.add("a", [])
+    assert model.top_keywords() == {"a": []}
+
+
+def test_save_e_load(tmp_path):
+    filename = str(tmp_path / "tfidf.npz")
+    model = make_model(filename=filename)
+    model.save()
+    loaded = KeywordModel(filename=filename)
+    assert loaded.top_keywords() == model.top_keywords()
+    assert loaded.doc_freq.tolist() == model.doc_freq.tolist()
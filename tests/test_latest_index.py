@@ -0,0 +1,53 @@
+import pandas as pd
+
+from normative_system import LatestIndex
+
+
+def test_ordine_per_data_e_documenti_senza_data_in_fondo(documents_df):
+    index = LatestIndex(documents_df)
+    assert index.latest(limit=10) == ["d4", "d2", "d3", "d1", "d5"]
+    assert index.latest(category="fisco_agevolazioni") == ["d4", "d1"]
+    assert index.latest(limit=2) == ["d4", "d2"]
+
+
+def test_since_esclude_i_documenti_precedenti(documents_df):
+    index = LatestIndex(documents_df)
+    assert index.latest(limit=10, since="2024-02-01") == ["d4", "d2", "d3"]
+
+
+def test_add_incrementale_come_ricostruzione(documents_df):
+    index = LatestIndex(documents_df.iloc[:2])
+    # Pochi documenti alla volta: inserimento con bisezione
+    index.add(documents_df.iloc[2:3])
+    index.add(documents_df.iloc[3:])
+    rebuilt = LatestIndex(documents_df)
+    assert index.all == rebuilt.all
+    assert index.by_category == rebuilt.by_category
+
+
+def test_add_sostituisce_la_versione_precedente(documents_df):
+    index = LatestIndex(documents_df)
+    updated = documents_df[documents_df["id"] == "d1"].assign(
+        data_dt=pd.Timestamp("2024-06-01"), categoria="lavoro_contratti"
+    )
+    index.add(updated)
+    assert index.latest(limit=10) == ["d1", "d4", "d2", "d3", "d5"]
+    assert index.latest(category="fisco_agevolazioni") == ["d4"]
+    assert index.latest(category="lavoro_contratti") == ["d1", "d3"]
+    assert len(index.all) == len(documents_df)
+
+
+def test_remove(documents_df):
+    index = LatestIndex(documents_df)
+    index.remove(["d2", "d5", "inesistente"])
+    assert index.latest(limit=10) == ["d4", "d3", "d1"]
+    assert index.latest(category="startup_innovazione") == []
+    assert "d2" not in index.keys
+
+
+def test_copy_indipendente(documents_df):
+    index = LatestIndex(documents_df)
+    published = index.copy()
+    index.remove(["d4"])
+    assert published.latest(limit=1) == ["d4"]
+    assert index.latest(limit=1) == ["d2"]
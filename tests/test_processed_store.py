@@ -0,0 +1,104 @@
+import json
+import os
+
+import pandas as pd
+
+from normative_system import ProcessedStore
+
+
+def chunk(start, stop):
+    """Blocco elaborato come lo produce lo stadio di elaborazione AI"""
+    return pd.DataFrame([
+        {"id": f"d{i}", "impronta": f"fp{i}", "titolo": f"Titolo {i}", "termini": ["decreto", f"termine{i}"]}
+        for i in range(start, stop)
+    ])
+
+
+def test_checkpoint_scrive_il_journal(tmp_path):
+    store = ProcessedStore(str(tmp_path / "archivio.json"))
+    terms = store.checkpoint(chunk(0, 3))
+    assert terms == {f"d{i}": ["decreto", f"termine{i}"] for i in range(3)}
+    assert store.pending_ids == {"d0", "d1", "d2"}
+    # I termini restano nel journal, non nell'archivio
+    assert "termini" not in store.get_records(["fp0"])[0]
+    with open(store.journal_filename, encoding="utf-8") as f:
+        assert len(f.readlines()) == 3
+
+
+def test_ripresa_dal_journal_dopo_interruzione(tmp_path):
+    filename = str(tmp_path / "archivio.json")
+    store = ProcessedStore(filename)
+    store.checkpoint(chunk(0, 2))
+    store.save()
+    store.checkpoint(chunk(2, 4))
+    store.checkpoint(chunk(4, 5))
+
+    # Nuovo processo: l'archivio salvato più i blocchi del journal
+    recovered = ProcessedStore(filename)
+    assert set(recovered.locations) == {f"fp{i}" for i in range(5)}
+    assert recovered.pending_ids == {"d2", "d3", "d4"}
+    assert recovered.recovered_terms["d3"] == ["decreto", "termine3"]
+    assert "d0" not in recovered.recovered_terms
+
+
+def test_riga_incompleta_ignorata(tmp_path):
+    filename = str(tmp_path / "archivio.json")
+    store = ProcessedStore(filename)
+    store.checkpoint(chunk(0, 2))
+    # Interruzione durante la scrittura dell'ultima riga
+    with open(store.journal_filename, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"record": {"id": "d9", "impronta": "fp9"}})[:20])
+
+    recovered = ProcessedStore(filename)
+    assert set(recovered.locations) == {"fp0", "fp1"}
+    assert recovered.pending_ids == {"d0", "d1"}
+
+
+def test_save_chiude_il_journal(tmp_path):
+    filename = str(tmp_path / "archivio.json")
+    store = ProcessedStore(filename)
+    store.checkpoint(chunk(0, 3))
+    store.save()
+    assert not os.path.exists(store.journal_filename)
+    assert store.pending_ids == set() and store.recovered_terms == {}
+
+    reloaded = ProcessedStore(filename)
+    assert set(reloaded.locations) == {"fp0", "fp1", "fp2"}
+    assert reloaded.pending_ids == set()
+    assert [record["titolo"] for record in reloaded.get_records(["fp2", "fp0"])] == ["Titolo 2", "Titolo 0"]
+
+
+def test_split_prune_e_get_records(tmp_path):
+    store = ProcessedStore(str(tmp_path / "archivio.json"))
+    store.checkpoint(chunk(0, 3))
+    cached, new = store.split(pd.DataFrame({"impronta": ["fp0", "fp2", "fp7"]}))
+    assert list(cached["impronta"]) == ["fp0", "fp2"] and list(new["impronta"]) == ["fp7"]
+    store.prune(["fp2", "fp0"])
+    assert [record["id"] for record in store.get_records(["fp2", "fp7", "fp0"])] == ["d2", "d0"]
+
+
+def test_archivio_json_convertito_in_righe(tmp_path):
+    filename = str(tmp_path / "archivio.json")
+    # Formato precedente: un unico array JSON
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump([{"id": f"d{i}", "impronta": f"fp{i}", "titolo": f"Titolo {i}"} for i in range(3)], f)
+
+    store = ProcessedStore(filename)
+    assert len(store) == 3 and "fp1" in store
+    assert store.get_records(["fp1"]) == [{"id": "d1", "impronta": "fp1", "titolo": "Titolo 1"}]
+    with open(filename, encoding="utf-8") as f:
+        assert len(f.readlines()) == 3
+
+
+def test_get_records_da_archivio_e_journal(tmp_path):
+    store = ProcessedStore(str(tmp_path / "archivio.json"))
+    store.checkpoint(chunk(0, 2))
+    store.save()
+    # Documento rielaborato: la versione nel journal sostituisce quella dell'archivio
+    updated = chunk(1, 3)
+    updated["titolo"] = ["Nuovo 1", "Nuovo 2"]
+    store.checkpoint(updated)
+    assert [record["titolo"] for record in store.get_records(["fp0", "fp1", "fp2"])] == ["Titolo 0", "Nuovo 1", "Nuovo 2"]
+    store.save()
+    assert [record["titolo"] for record in ProcessedStore(store.filename).get_records(["fp0", "fp1", "fp2"])] == \
+        ["Titolo 0", "Nuovo 1", "Nuovo 2"]
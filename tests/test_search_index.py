@@ -0,0 +1,43 @@
+from normative_system import SearchIndex
+
+
+def test_tokenize_normalizza_il_testo():
+    assert SearchIndex.tokenize("Credito d'Imposta, 2024") == ["credito", "d", "imposta", "2024"]
+    assert SearchIndex.tokenize(None) == []
+
+
+def test_search_ordina_per_punteggio(documents_df):
+    index = SearchIndex(documents_df)
+    ranked = index.search("credito imposta")
+    positions = [pos for pos, _ in ranked]
+    assert set(positions) == {0, 3}
+    scores = [score for _, score in ranked]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_titolo_pesa_piu_del_testo(documents_df):
+    # "formazione" compare nel titolo di d3 e non altrove
+    index = SearchIndex(documents_df)
+    assert index.search("formazione")[0][0] == 2
+    # "normativa" compare solo nel testo semplificato, con lo stesso peso per tutti
+    scores = dict(index.search("normativa"))
+    assert len(scores) == len(documents_df)
+    assert max(scores.values()) < index.search("formazione")[0][1]
+
+
+def test_filtro_categoria_e_top_k(documents_df):
+    index = SearchIndex(documents_df)
+    assert [pos for pos, _ in index.search("credito startup", category="startup_innovazione")] == [1]
+    assert len(index.search("normativa", top_k=2)) == 2
+
+
+def test_termini_sconosciuti_e_corpus_vuoto(documents_df):
+    assert SearchIndex(documents_df).search("inesistente") == []
+    empty = SearchIndex(documents_df.iloc[0:0])
+    assert empty.num_docs == 0
+    assert empty.search("credito") == []
+
+
+def test_score_coincide_con_search(documents_df):
+    index = SearchIndex(documents_df)
+    assert index.score("credito") == dict(index.search("credito"))
@@ -0,0 +1,32 @@
+import numpy as np
+
+from normative_system import SemanticIndex
+
+
+def make_index(num_docs, dim=4):
+    rng = np.random.default_rng(3)
+    embeddings = rng.random((num_docs, dim), dtype=np.float32)
+    return SemanticIndex(embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True), ["a"] * num_docs)
+
+
+def test_stack_con_documenti_senza_vettore():
+    matrix = SemanticIndex.stack([[], [1.0, 2.0], None, np.array([3.0, 4.0])])
+    assert matrix.shape == (4, 2)
+    assert matrix.tolist() == [[0, 0], [1, 2], [0, 0], [3, 4]]
+    assert SemanticIndex.stack([[], None]).shape == (2, 0)
+
+
+def test_candidates_sopra_la_soglia():
+    index = make_index(5)
+    scores = np.array([0.1, 0.5, 0.3, 0.9, -0.2], dtype=np.float32)
+    assert index.candidates(scores).tolist() == [1, 3]
+    assert index.candidates(scores, min_score=0.0).tolist() == [0, 1, 2, 3]
+
+
+def test_candidates_limitati_ai_punteggi_migliori(monkeypatch):
+    monkeypatch.setattr(SemanticIndex, "MAX_CANDIDATES", 3)
+    index = make_index(10)
+    scores = np.linspace(0.4, 0.95, 10).astype(np.float32)[::-1].copy()
+    # Le posizioni restano in ordine crescente: il ranking avviene dopo i filtri
+    assert index.candidates(scores).tolist() == [0, 1, 2]
+    assert index.candidates(scores[::-1].copy()).tolist() == [7, 8, 9]
@@ -0,0 +1,90 @@
+import os
+
+import pandas as pd
+
+from normative_system import SubscriptionIndex
+
+
+def profile(email, interests=(), keywords=()):
+    return {"email": email, "interessi": list(interests), "parole_chiave": list(keywords), "preferenze_notifiche": {}}
+
+
+def ids(digest):
+    return [entry["id"] for entry in digest]
+
+
+def make_index(tmp_path):
+    index = SubscriptionIndex(str(tmp_path / "profili.jsonl"))
+    fisco = index.save_profile(profile("fisco@example.com", interests=["fisco_agevolazioni"]))
+    credito = index.save_profile(profile("credito@example.com", keywords=["credito d'imposta"]))
+    return index, fisco, credito
+
+
+def test_digest_per_motivo(tmp_path, documents_df):
+    index, fisco, credito = make_index(tmp_path)
+    assert index.queue_digests(documents_df) == 2
+
+    assert ids(index.get_digest(fisco)) == ["d1", "d4"]
+    digest = index.get_digest(credito)
+    assert ids(digest) == ["d1", "d4"]
+    assert digest[0]["motivi"] == ["parola"]
+    assert index.get_digest("sconosciuto") is None
+
+
+def test_pop_digest_svuota_solo_il_profilo(tmp_path, documents_df):
+    index, fisco, credito = make_index(tmp_path)
+    index.queue_digests(documents_df)
+
+    assert ids(index.pop_digest(fisco)) == ["d1", "d4"]
+    assert index.get_digest(fisco) == []
+    assert ids(index.get_digest(credito)) == ["d1", "d4"]
+    index.pop_digest(credito)
+    # Documenti non più citati da alcun digest: rimossi
+    assert index.digest_documents == {}
+
+
+def test_digest_condivisi_tra_istanze(tmp_path, documents_df):
+    index, fisco, credito = make_index(tmp_path)
+    other = SubscriptionIndex(str(tmp_path / "profili.jsonl"))
+
+    index.queue_digests(documents_df)
+    assert ids(other.get_digest(fisco)) == ["d1", "d4"]
+    other.pop_digest(fisco)
+    assert index.get_digest(fisco) == []
+    assert ids(index.get_digest(credito)) == ["d1", "d4"]
+
+
+def test_registro_dei_digest_in_sola_aggiunta(tmp_path, documents_df):
+    index, fisco, credito = make_index(tmp_path)
+    index.queue_digests(documents_df)
+    size = os.path.getsize(index.digests_filename)
+    index.pop_digest(fisco)
+    # La consegna aggiunge una riga, senza riscrivere i digest degli altri profili
+    with open(index.digests_filename, encoding="utf-8") as f:
+        assert f.read()[size:].count("\n") == 1
+
+
+def test_compattazione_e_riavvio(tmp_path, documents_df):
+    index, fisco, credito = make_index(tmp_path)
+    for start in range(0, len(documents_df), 2):
+        index.queue_digests(documents_df.iloc[start:start + 2])
+    index.pop_digest(fisco)
+    index.queue_digests(pd.DataFrame([{**documents_df.iloc[3].to_dict(), "id": "d6"}]))
+
+    index.compact_digests()
+    reloaded = SubscriptionIndex(str(tmp_path / "profili.jsonl"))
+    assert ids(reloaded.get_digest(fisco)) == ["d6"]
+    assert ids(reloaded.get_digest(credito)) == ["d1", "d4", "d6"]
+    assert reloaded.digest_refs == index.digest_refs
+
+
+def test_rimozione_profilo(tmp_path, documents_df):
+    index, fisco, credito = make_index(tmp_path)
+    index.queue_digests(documents_df)
+    assert index.remove_profile(fisco)
+    assert not index.remove_profile(fisco)
+
+    reloaded = SubscriptionIndex(str(tmp_path / "profili.jsonl"))
+    assert reloaded.get_digest(fisco) is None
+    assert fisco not in reloaded.pending
+    assert ids(reloaded.get_digest(credito)) == ["d1", "d4"]
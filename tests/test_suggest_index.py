@@ -0,0 +1,54 @@
+from normative_system import SuggestIndex
+
+
+CATEGORY_NAMES = {"fisco_agevolazioni": "Fisco e Agevolazioni"}
+
+
+def texts(suggestions):
+    return [entry["text"] for entry in suggestions]
+
+
+def test_normalize_toglie_accenti_e_punteggiatura():
+    assert SuggestIndex.normalize("  Sostenibilità:  Economia") == "sostenibilita economia"
+    assert SuggestIndex.normalize(None) == ""
+
+
+def test_prefisso_anche_da_parola_interna(documents_df):
+    index = SuggestIndex(documents_df, CATEGORY_NAMES)
+    assert "Credito d'imposta ricerca e sviluppo" in texts(index.suggest("imp"))
+    assert "Economia circolare: contributi a fondo perduto" in texts(index.suggest("circ"))
+
+
+def test_categorie_prima_di_parole_chiave_e_titoli(documents_df):
+    index = SuggestIndex(documents_df, CATEGORY_NAMES)
+    suggestions = index.suggest("f", limit=20)
+    assert suggestions[0]["tipo"] == "categoria"
+    assert suggestions[0]["text"] == "Fisco e Agevolazioni"
+    assert len(set(texts(suggestions))) == len(suggestions)
+
+
+def test_titoli_piu_recenti_prima(documents_df):
+    index = SuggestIndex(documents_df)
+    titles = [entry for entry in index.suggest("credito", limit=10) if entry["tipo"] == "titolo"]
+    assert [entry["id"] for entry in titles] == ["d4", "d1"]
+
+
+def test_limit_e_prefissi_senza_risultati(documents_df):
+    index = SuggestIndex(documents_df)
+    assert len(index.suggest("c", limit=3)) == 3
+    assert index.suggest("zzz") == []
+    assert index.suggest("") == []
+    assert SuggestIndex(documents_df.iloc[0:0]).suggest("credito") == []
+
+
+def test_risultati_come_scansione_completa(documents_df):
+    # L'estrazione con la sparse table deve dare gli stessi risultati di un ordinamento completo
+    index = SuggestIndex(documents_df)
+    entry_positions = {id(entry): pos for pos, entry in enumerate(index.entries)}
+    for prefix in ("c", "d", "in", "s"):
+        best = {}
+        for key, score, pos in zip(index.keys, index.scores, index.positions):
+            if key.startswith(prefix):
+                best[pos] = max(best.get(pos, 0), score)
+        found = [best[entry_positions[id(entry)]] for entry in index.suggest(prefix, limit=5)]
+        assert found == sorted(best.values(), reverse=True)[:5]
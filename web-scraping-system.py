@@ -1,21 +1,14 @@
-def extract_keywords(self, doc, num_keywords=10):
-        """Estrae parole chiave dal documento"""
-        # Rimuovi stopwords e punteggiatura
-        words = [token.text.lower() for token in doc if not token.is_stop and not token.is_punct and token.is_alpha]
-        
-        # Conta frequenza delle parole
-        word_freq = {}
-        for word in words:
-            if word in word_freq:
-                word_freq[word] += 1
-            else:
-                word_freq[word] = 1
-        
-        # Ordina per frequenza
-        sorted_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)
-        
-        # Prendi le prime N parole
-        return [word for word, freq in sorted_words[:num_keywords]]
+    def extract_keywords(self, terms, num_keywords=10):
+        """Termini più frequenti del documento"""
+        return [word for word, freq in Counter(terms).most_common(num_keywords)]
+    
+    def extract_terms(self, doc):
+        """Termini significativi del documento (gli stessi usati per le parole chiave)"""
+        return [token.text.lower() for token in doc if not token.is_stop and not token.is_punct and token.is_alpha]
+    
+    def compute_terms(self, texts):
+        """Termini di più testi con il solo tokenizer (senza la pipeline completa)"""
+        return [self.extract_terms(doc) for doc in nlp.tokenizer.pipe(text if isinstance(text, str) else '' for text in texts)]
     
     def simplify_text(self, text):
         """Semplifica il testo per renderlo più comprensibile"""
@@ -28,22 +21,15 @@ def extract_keywords(self, doc, num_keywords=10):
         # Ricostruisci il testo
         simplified = ' '.join(important_sentences)
         
-        # Sostituisci termini tecnici con spiegazioni più semplici
-        tech_terms = {
-            'decreto legislativo': 'legge',
-            'comma': 'punto',
-            'ai sensi dell\'articolo': 'secondo la legge',
-            'in deroga': 'come eccezione',
-            'contributo a fondo perduto': 'finanziamento che non deve essere restituito',
-            'agevolazione fiscale': 'sconto sulle tasse',
-            'adempimento': 'obbligo',
-            'a decorrere da': 'a partire da'
-        }
-        
-        for term, simple in tech_terms.items():
-            simplified = re.sub(r'\b' + re.escape(term) + r'\b', simple, simplified, flags=re.IGNORECASE)
-        
-        return simplified
+        # Sostituisci termini tecnici con spiegazioni più semplici (un solo passaggio sul testo)
+        return self.glossary.rewrite(simplified)
+    
+    @property
+    def glossary(self):
+        """Glossario dei termini tecnici, caricato e compilato una sola volta"""
+        if getattr(self, '_glossary', None) is None:
+            self._glossary = GlossaryRewriter.from_file(GLOSSARY_FILE)
+        return self._glossary
     
     def generate_practical_case(self, document):
         """Genera un caso pratico basato sul documento"""
@@ -73,35 +59,340 @@ def extract_keywords(self, doc, num_keywords=10):
         
         return practical_case
     
-    def process_all_documents(self, documents_df):
+    def summarize_text(self, text, keywords, num_sentences=3):
+        """Riassunto estrattivo: le frasi con più parole chiave, nell'ordine originale"""
+        sentences = sent_tokenize(text)
+        keyword_set = set(keywords)
+        
+        scored = []
+        for pos, sentence in enumerate(sentences):
+            words = re.findall(r"\w+", sentence.lower())
+            scored.append((sum(1 for word in words if word in keyword_set), pos))
+        
+        best = sorted(heapq.nlargest(num_sentences, scored, key=lambda x: (x[0], -x[1])), key=lambda x: x[1])
+        return ' '.join(sentences[pos] for _, pos in best)
+    
+    def process_parsed_document(self, document, spacy_doc):
+        """Elabora un documento a partire dal Doc spaCy già calcolato"""
+        processed_doc = dict(document)
+        text = document.get('testo') or ''
+        terms = self.extract_terms(spacy_doc)
+        
+        # Le parole chiave del documento vengono dal modello TF-IDF sull'intero corpus: qui servono solo al riassunto
+        processed_doc['riassunto'] = self.summarize_text(text, self.extract_keywords(terms))
+        processed_doc['testo_semplificato'] = self.simplify_text(text)
+        processed_doc['caso_pratico'] = self.generate_practical_case(processed_doc)
+        processed_doc['embedding'] = self.compute_embedding(spacy_doc)
+        processed_doc['termini'] = terms
+        
+        return processed_doc
+    
+    def compute_embedding(self, spacy_doc):
+        """Vettore normalizzato del documento (media dei vettori delle parole), o None senza vettori"""
+        if not nlp.vocab.vectors_length:
+            return None
+        
+        vector = np.asarray(spacy_doc.vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return (vector / norm).tolist() if norm > 0 else None
+    
+    def get_disabled_components(self, required=()):
+        """Componenti della pipeline spaCy non necessari per lo stadio corrente"""
+        # extract_terms usa solo attributi lessicali (is_stop, is_punct, is_alpha):
+        # basta il tokenizer, tutti i componenti possono essere disattivati
+        return [name for name in nlp.pipe_names if name not in required]
+    
+    def process_all_documents(self, documents_df, batch_size=64, n_process=1, batched=True):
         """Elabora tutti i documenti nel database"""
+        if not batched:
+            return self.process_all_documents_sequential(documents_df)
+        
+        processed_docs = []
+        records = documents_df.to_dict('records')
+        texts = ((doc.get('testo') if isinstance(doc.get('testo'), str) else '', pos) for pos, doc in enumerate(records))
+        
+        # Un solo passaggio nlp.pipe a lotti, con i componenti inutili disattivati
+        with nlp.select_pipes(disable=self.get_disabled_components()):
+            parsed = nlp.pipe(texts, as_tuples=True, batch_size=batch_size, n_process=n_process)
+            for spacy_doc, pos in parsed:
+                # Gli errori restano isolati al singolo documento
+                try:
+                    processed_doc = self.process_parsed_document(records[pos], spacy_doc)
+                    processed_docs.append(processed_doc)
+                    logger.debug(f"Documento elaborato: {processed_doc['titolo']}")
+                except Exception as e:
+                    logger.error(f"Errore durante l'elaborazione del documento: {str(e)}")
+        
+        return pd.DataFrame(processed_docs)
+    
+    def process_all_documents_sequential(self, documents_df):
+        """Elabora tutti i documenti uno alla volta con la pipeline completa"""
         processed_docs = []
         
-        for _, doc in documents_df.iterrows():
+        for doc in documents_df.to_dict('records'):
             try:
-                processed_doc = self.process_document(doc.to_dict())
-                processed_doc['caso_pratico'] = self.generate_practical_case(processed_doc)
+                text = doc.get('testo') if isinstance(doc.get('testo'), str) else ''
+                processed_doc = self.process_parsed_document(doc, nlp(text))
                 processed_docs.append(processed_doc)
-                logger.info(f"Documento elaborato: {processed_doc['titolo']}")
+                logger.debug(f"Documento elaborato: {processed_doc['titolo']}")
             except Exception as e:
                 logger.error(f"Errore durante l'elaborazione del documento: {str(e)}")
         
         return pd.DataFrame(processed_docs)
     
-    def save_processed_docs(self, processed_df, filename="normative_elaborate.json"):
-        """Salva i documenti elaborati in JSON"""
-        processed_df.to_json(filename, orient='records', force_ascii=False, indent=4)
-        logger.info(f"Documenti elaborati salvati in {filename}")
+    def save_processed_docs(self, processed_df, filename="normative_elaborate.json", chunk_size=None):
+        """Salva i documenti elaborati in JSON, un blocco di righe alla volta"""
+        chunk_size = chunk_size or max(len(processed_df), 1)
+        with JsonSnapshotWriter(filename) as writer:
+            for start in range(0, len(processed_df), chunk_size):
+                writer.write(processed_df.iloc[start:start + chunk_size])
+
+
+# File del glossario: termine tecnico -> spiegazione semplice
+GLOSSARY_FILE = "glossario_normativo.json"
+
+
+# Classe per la sostituzione dei termini tecnici
+class GlossaryRewriter:
+    """Riscrive il testo in un solo passaggio con un'unica espressione regolare compilata"""
+    
+    # Usati se il file del glossario non è disponibile
+    DEFAULT_TERMS = {
+        'decreto legislativo': 'legge',
+        'comma': 'punto',
+        'ai sensi dell\'articolo': 'secondo la legge',
+        'in deroga': 'come eccezione',
+        'contributo a fondo perduto': 'finanziamento che non deve essere restituito',
+        'agevolazione fiscale': 'sconto sulle tasse',
+        'adempimento': 'obbligo',
+        'a decorrere da': 'a partire da'
+    }
+    
+    def __init__(self, terms):
+        # Chiavi normalizzate: minuscole, spazi singoli
+        self.terms = {self.normalize(term): simple for term, simple in terms.items() if term.strip()}
+        self.pattern = self.compile(self.terms)
+    
+    @classmethod
+    def from_file(cls, filename):
+        """Carica il glossario da un file JSON ({termine: sostituzione}) o TSV (termine<TAB>sostituzione)"""
+        if not filename or not os.path.exists(filename):
+            return cls(cls.DEFAULT_TERMS)
+        
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                if filename.endswith('.json'):
+                    terms = json.load(f)
+                else:
+                    terms = dict(line.rstrip('\n').split('\t', 1) for line in f if '\t' in line)
+            logger.info(f"Glossario caricato da {filename}: {len(terms)} termini")
+            return cls(terms)
+        except Exception as e:
+            logger.error(f"Errore durante il caricamento del glossario {filename}: {str(e)}")
+            return cls(cls.DEFAULT_TERMS)
+    
+    @staticmethod
+    def normalize(term):
+        return ' '.join(term.lower().split())
+    
+    @classmethod
+    def compile(cls, terms):
+        """Compila tutti i termini in un'unica espressione regolare a forma di trie"""
+        if not terms:
+            return None
+        
+        trie = {}
+        for term in terms:
+            node = trie
+            for char in term:
+                node = node.setdefault(char, {})
+            node[''] = True
+        
+        return re.compile(rf"(?<!\w){cls.trie_to_regex(trie)}(?!\w)", re.IGNORECASE)
+    
+    @classmethod
+    def trie_to_regex(cls, node):
+        """Prefissi comuni fattorizzati: ogni posizione del testo prova al più un ramo per carattere"""
+        branches = [
+            # Gli spazi del termine corrispondono a qualsiasi sequenza di spazi nel testo
+            (r'\s+' if char == ' ' else re.escape(char)) + cls.trie_to_regex(child)
+            for char, child in sorted(node.items()) if char != ''
+        ]
+        if not branches:
+            return ''
+        
+        regex = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # Il termine può finire qui: l'opzionale è greedy, quindi vince la corrispondenza più lunga
+            regex = f"(?:{regex})?"
+        return regex
+    
+    @staticmethod
+    def match_case(original, replacement):
+        """Applica alla sostituzione le maiuscole del testo originale"""
+        if original.isupper() and len(original) > 1:
+            return replacement.upper()
+        if original[:1].isupper():
+            return replacement[:1].upper() + replacement[1:]
+        return replacement
+    
+    def rewrite(self, text):
+        """Sostituisce tutti i termini del glossario in un solo passaggio"""
+        if self.pattern is None or not text:
+            return text
+        return self.pattern.sub(
+            lambda match: self.match_case(match.group(0), self.terms[self.normalize(match.group(0))]),
+            text
+        )
+
+
+# Classe per la cache persistente delle risposte delle API esterne
+class ResponseCache:
+    """Cache su disco con scadenza (TTL) ed eliminazione LRU"""
+    
+    def __init__(self, filename, ttl=7 * 24 * 3600, max_entries=10000):
+        self.filename = filename
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self.load()
+    
+    def load(self):
+        """Carica la cache dal disco, scartando le voci scadute"""
+        if not self.filename or not os.path.exists(self.filename):
+            return
+        
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            now = time.time()
+            # Il file è salvato in ordine LRU (dalla voce meno usata alla più recente)
+            self.entries = OrderedDict(
+                (key, entry) for key, entry in entries if now - entry['time'] < self.ttl
+            )
+        except Exception as e:
+            logger.error(f"Errore durante il caricamento della cache {self.filename}: {str(e)}")
+            self.entries = OrderedDict()
+    
+    def save(self):
+        """Salva la cache su disco in modo atomico"""
+        if not self.filename:
+            return
+        with self._lock:
+            tmp_filename = f"{self.filename}.tmp"
+            with open(tmp_filename, 'w', encoding='utf-8') as f:
+                json.dump(list(self.entries.items()), f, ensure_ascii=False)
+            os.replace(tmp_filename, self.filename)
+    
+    def get(self, key):
+        """Restituisce il valore in cache, o None se assente o scaduto"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or time.time() - entry['time'] >= self.ttl:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry['value']
+    
+    def set(self, key, value):
+        """Inserisce un valore, eliminando le voci usate meno di recente oltre il limite"""
+        with self._lock:
+            self.entries[key] = {'time': time.time(), 'value': value}
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+    
+    def get_stats(self):
+        """Statistiche di utilizzo della cache"""
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
 
 
 # Classe per la ricerca di video YouTube correlati
 class YouTubeIntegrator:
-    def __init__(self, api_key):
+    # Costo in unità di quota di una chiamata search.list
+    SEARCH_COST = 100
+    # La quota dell'API si azzera alla mezzanotte del Pacifico
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+    
+    def __init__(self, api_key, cache_file="youtube_cache.json", cache_ttl=7 * 24 * 3600,
+                 max_workers=4, daily_quota=10000, quota_file="youtube_quota.json"):
         self.api_key = api_key
         self.youtube_search_url = "https://www.googleapis.com/youtube/v3/search"
+        self.session = requests.Session()
+        self.cache = ResponseCache(cache_file, ttl=cache_ttl)
+        self.max_workers = max_workers
+        self.daily_quota = daily_quota
+        # Consumo condiviso tra processi e riavvii tramite file (None: solo in memoria)
+        self.quota_file = quota_file
+        self.quota_used = 0
+        self.quota_day = self.quota_today()
+        self.api_calls = 0
+        self.deduplicated = 0
+        self.errors = 0
+        self._quota_lock = threading.Lock()
     
-    def search_videos(self, query, max_results=5):
-        """Cerca video correlati su YouTube"""
+    @staticmethod
+    def normalize_query(query):
+        """Normalizza la query, così query equivalenti condividono la cache"""
+        return ' '.join(query.lower().split())
+    
+    @classmethod
+    def quota_today(cls):
+        """Giorno di riferimento della quota (ISO, fuso del Pacifico)"""
+        return datetime.now(cls.QUOTA_TIMEZONE).date().isoformat()
+    
+    def load_quota(self):
+        """Legge il consumo registrato da tutti i processi"""
+        if not self.quota_file or not os.path.exists(self.quota_file):
+            return
+        try:
+            with open(self.quota_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            self.quota_day, self.quota_used = state['day'], int(state['used'])
+        except Exception as e:
+            logger.error(f"Errore durante la lettura della quota YouTube: {str(e)}")
+    
+    def save_quota(self):
+        if not self.quota_file:
+            return
+        tmp_filename = f"{self.quota_file}.{os.getpid()}.tmp"
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump({'day': self.quota_day, 'used': self.quota_used}, f)
+        os.replace(tmp_filename, self.quota_file)
+    
+    def reserve_quota(self):
+        """Riserva la quota per una chiamata; False se la quota giornaliera è esaurita"""
+        lock_file = f"{self.quota_file}.lock" if self.quota_file else None
+        with self._quota_lock, file_lock(lock_file):
+            self.load_quota()
+            today = self.quota_today()
+            if today != self.quota_day:
+                self.quota_day = today
+                self.quota_used = 0
+            
+            if self.quota_used + self.SEARCH_COST > self.daily_quota:
+                return False
+            self.quota_used += self.SEARCH_COST
+            self.save_quota()
+            self.api_calls += 1
+            return True
+    
+    def fetch_videos(self, query, max_results):
+        """Chiama l'API di ricerca di YouTube"""
         params = {
             'part': 'snippet',
             'q': query,
@@ -112,58 +403,100 @@ class YouTubeIntegrator:
             'relevanceLanguage': 'it'
         }
         
-        try:
-            response = requests.get(self.youtube_search_url, params=params)
-            response.raise_for_status()
-            
-            results = response.json()
-            
-            videos = []
-            for item in results.get('items', []):
-                video_id = item['id']['videoId']
-                title = item['snippet']['title']
-                description = item['snippet']['description']
-                thumbnail = item['snippet']['thumbnails']['high']['url']
-                
-                videos.append({
-                    'id': video_id,
-                    'title': title,
-                    'description': description,
-                    'thumbnail': thumbnail,
-                    'url': f"https://www.youtube.com/watch?v={video_id}"
-                })
+        response = self.session.get(self.youtube_search_url, params=params, timeout=30)
+        response.raise_for_status()
+        
+        results = response.json()
+        
+        videos = []
+        for item in results.get('items', []):
+            video_id = item['id']['videoId']
+            title = item['snippet']['title']
+            description = item['snippet']['description']
+            thumbnail = item['snippet']['thumbnails']['high']['url']
             
+            videos.append({
+                'id': video_id,
+                'title': title,
+                'description': description,
+                'thumbnail': thumbnail,
+                'url': f"https://www.youtube.com/watch?v={video_id}"
+            })
+        
+        return videos
+    
+    def search_videos(self, query, max_results=5):
+        """Cerca video correlati su YouTube"""
+        query = self.normalize_query(query)
+        cache_key = f"{max_results}:{query}"
+        
+        videos = self.cache.get(cache_key)
+        if videos is not None:
+            return videos
+        
+        if not self.reserve_quota():
+            logger.warning(f"Quota YouTube esaurita, ricerca saltata: {query}")
+            return []
+        
+        try:
+            videos = self.fetch_videos(query, max_results)
+            self.cache.set(cache_key, videos)
             return videos
             
         except Exception as e:
+            self.errors += 1
+            metrics.inc("youtube_errors_total", help_text="Errori delle ricerche su YouTube")
             logger.error(f"Errore durante la ricerca su YouTube: {str(e)}")
             return []
     
     def enrich_documents(self, documents_df):
         """Arricchisce i documenti con video correlati"""
-        for idx, doc in documents_df.iterrows():
-            try:
-                # Crea una query basata sul titolo e categoria
-                query = f"{doc['titolo']} {doc['categoria'].replace('_', ' ')} normativa"
-                
-                # Cerca video correlati
-                videos = self.search_videos(query, max_results=3)
-                
-                # Aggiungi i video al documento
-                documents_df.at[idx, 'video_correlati'] = videos
-                
-                logger.info(f"Aggiunti {len(videos)} video al documento: {doc['titolo']}")
-                
-            except Exception as e:
-                logger.error(f"Errore durante l'integrazione dei video: {str(e)}")
+        # Crea una query basata sul titolo e categoria, una sola volta per query distinta
+        queries = [
+            self.normalize_query(f"{doc['titolo']} {doc['categoria'].replace('_', ' ')} normativa")
+            for doc in documents_df[['titolo', 'categoria']].to_dict('records')
+        ]
+        unique_queries = list(dict.fromkeys(queries))
+        self.deduplicated += len(queries) - len(unique_queries)
+        
+        # Cerca video correlati in parallelo, con un numero limitato di richieste contemporanee
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = dict(zip(unique_queries, executor.map(lambda q: self.search_videos(q, max_results=3), unique_queries)))
+        self.cache.save()
+        
+        # Aggiungi i video ai documenti
+        documents_df['video_correlati'] = [results[query] for query in queries]
+        
+        logger.info(
+            f"Video aggiunti a {len(queries)} documenti con {len(unique_queries)} query distinte "
+            f"(cache: {self.cache.hits} hit, {self.cache.misses} miss; quota usata: {self.quota_used})"
+        )
         
         return documents_df
+    
+    def get_stats(self):
+        """Statistiche su cache, deduplicazione e quota"""
+        # La quota è condivisa tra i processi: il consumo aggiornato è quello registrato su file
+        with self._quota_lock:
+            self.load_quota()
+            quota_used = self.quota_used if self.quota_day == self.quota_today() else 0
+        return {
+            "cache": self.cache.get_stats(),
+            "api_calls": self.api_calls,
+            "deduplicated_queries": self.deduplicated,
+            "errors": self.errors,
+            "quota_used": quota_used,
+            "quota_limit": self.daily_quota
+        }
 
 
 # Classe per l'integrazione di articoli di giornale
 class NewsIntegrator:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, fetcher=None, matcher=None):
         self.api_key = api_key
+        self.fetcher = fetcher or HttpFetcher()
+        self.matcher = matcher or RelatedArticlesMatcher()
+        self.errors = 0
         self.news_sources = [
             'https://www.ilsole24ore.com/rss/economia.xml',
             'https://www.corriere.it/rss/economia.xml',
@@ -171,61 +504,93 @@ class NewsIntegrator:
             'https://www.italiaoggi.it/rss/rss_economia.asp'
         ]
     
+    def parse_feed(self, text, source):
+        """Estrae gli articoli da un feed RSS"""
+        soup = BeautifulSoup(text, 'xml')
+        articles = []
+        
+        # Estrai gli articoli dal feed RSS
+        for item in soup.find_all('item'):
+            title = item.find('title').text if item.find('title') else "Titolo non disponibile"
+            link = item.find('link').text if item.find('link') else None
+            description = item.find('description').text if item.find('description') else "Descrizione non disponibile"
+            pub_date = item.find('pubDate').text if item.find('pubDate') else "Data non disponibile"
+            pub_datetime = parse_date(pub_date)
+            
+            if link:
+                articles.append({
+                    'titolo': title,
+                    'url': link,
+                    'descrizione': description,
+                    'data_pubblicazione': pub_date,
+                    # Data normalizzata (ISO 8601, UTC), ordinabile
+                    'data_iso': pub_datetime.isoformat() if pub_datetime else None,
+                    'fonte': source.split('/')[2]
+                })
+        
+        return articles
+    
+    def fetch_source(self, source):
+        """Recupera gli articoli di un singolo feed"""
+        try:
+            articles = self.fetcher.fetch(source, lambda text: self.parse_feed(text, source))
+            logger.info(f"Recuperati {len(articles)} articoli da {source}")
+            return articles
+            
+        except Exception as e:
+            self.errors += 1
+            metrics.inc("news_errors_total", labels={'source': source}, help_text="Errori di recupero dei feed")
+            logger.error(f"Errore durante il recupero degli articoli da {source}: {str(e)}")
+            return []
+    
     def fetch_news(self):
         """Recupera articoli dai feed RSS"""
         all_articles = []
         
-        for source in self.news_sources:
-            try:
-                response = requests.get(source, timeout=30)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, 'xml')
-                
-                # Estrai gli articoli dal feed RSS
-                items = soup.find_all('item')
-                
-                for item in items:
-                    title = item.find('title').text if item.find('title') else "Titolo non disponibile"
-                    link = item.find('link').text if item.find('link') else None
-                    description = item.find('description').text if item.find('description') else "Descrizione non disponibile"
-                    pub_date = item.find('pubDate').text if item.find('pubDate') else "Data non disponibile"
-                    
-                    if link:
-                        all_articles.append({
-                            'titolo': title,
-                            'url': link,
-                            'descrizione': description,
-                            'data_pubblicazione': pub_date,
-                            'fonte': source.split('/')[2]
-                        })
-                
-                logger.info(f"Recuperati {len(items)} articoli da {source}")
-                
-            except Exception as e:
-                logger.error(f"Errore durante il recupero degli articoli da {source}: {str(e)}")
+        # I feed vengono scaricati in parallelo
+        for articles in self.fetcher.map(self.fetch_source, self.news_sources):
+            all_articles.extend(articles)
+        self.fetcher.save_cache()
         
         return all_articles
     
+    def build_category_matcher(self, categories):
+        """Compila una sola volta i termini di tutte le categorie in un'unica espressione regolare"""
+        term_categories = {}
+        for category in categories:
+            for term in category.split('_'):
+                term_categories.setdefault(term.lower(), []).append(category)
+        
+        # Il lookahead permette di trovare anche termini sovrapposti
+        alternation = '|'.join(re.escape(term) for term in sorted(term_categories, key=len, reverse=True))
+        pattern = re.compile(f"(?=({alternation}))")
+        return pattern, term_categories
+    
     def categorize_articles(self, articles, categories):
         """Categorizza gli articoli in base alle categorie definite"""
+        categories = list(categories)
         categorized_articles = []
+        if not categories:
+            return categorized_articles
+        
+        # Semplice ricerca di termini: non serve la pipeline spaCy
+        pattern, term_categories = self.build_category_matcher(categories)
         
         for article in articles:
-            # Analizza il testo dell'articolo con SpaCy
-            doc = nlp(article['titolo'] + " " + article['descrizione'])
+            text = (article['titolo'] + " " + article['descrizione']).lower()
+            
+            # Calcola un punteggio di rilevanza per ogni categoria
+            scores = {}
+            for term in set(pattern.findall(text)):
+                for category in term_categories[term]:
+                    scores[category] = scores.get(category, 0) + 1
             
-            # Determina la categoria più appropriata
+            # Determina la categoria più appropriata (a parità di punteggio vince la prima)
             best_category = None
             max_score = 0
-            
             for category in categories:
-                # Calcola un punteggio di rilevanza per la categoria
-                category_terms = category.split('_')
-                score = sum(1 for term in category_terms if term.lower() in doc.text.lower())
-                
-                if score > max_score:
-                    max_score = score
+                if scores.get(category, 0) > max_score:
+                    max_score = scores[category]
                     best_category = category
             
             if best_category and max_score > 0:
@@ -234,107 +599,2630 @@ class NewsIntegrator:
         
         return categorized_articles
     
-    def enrich_documents(self, documents_df):
-        """Arricchisce i documenti con articoli correlati"""
-        # Recupera articoli
-        articles = self.fetch_news()
+    def fetch_categorized_articles(self, categories):
+        """Recupera e categorizza gli articoli (una volta per esecuzione, anche se i documenti arrivano a blocchi)"""
+        return self.categorize_articles(self.fetch_news(), categories)
+    
+    def enrich_documents(self, documents_df, categorized_articles=None, idf=None):
+        """Arricchisce i documenti con articoli correlati (idf: pesi calcolati sull'intero corpus)"""
+        # Recupera e categorizza gli articoli, se non già disponibili
+        if categorized_articles is None:
+            categorized_articles = self.fetch_categorized_articles(documents_df['categoria'].unique())
         
-        # Categorizza gli articoli
-        categories = documents_df['categoria'].unique()
-        categorized_articles = self.categorize_articles(articles, categories)
+        # Articoli più simili a ciascun documento, nella stessa categoria e in un intervallo di date vicino
+        documents_df['articoli_correlati'] = self.matcher.match(documents_df, categorized_articles, idf=idf)
         
-        # Associa articoli ai documenti in base alla categoria
-        for idx, doc in documents_df.iterrows():
-            try:
-                # Trova articoli correlati per categoria
-                related_articles = [article for article in categorized_articles if article['categoria'] == doc['categoria']]
+        logger.info(f"Articoli correlati assegnati a {len(documents_df)} documenti ({len(categorized_articles)} articoli categorizzati)")
+        
+        return documents_df
+
+
+# Classe per l'abbinamento tra documenti e articoli correlati
+class RelatedArticlesMatcher:
+    """Vettori TF-IDF (feature hashing) di documenti e articoli e similarità coseno a blocchi"""
+    
+    # Token di almeno tre caratteri: articoli e preposizioni non contano
+    TOKEN_PATTERN = re.compile(r"\w{3,}")
+    
+    def __init__(self, dim=1024, top_k=3, recency_days=365, block_size=1024, min_score=0.05):
+        self.dim = dim
+        self.top_k = top_k
+        self.recency_days = recency_days
+        self.block_size = block_size
+        self.min_score = min_score
+    
+    def term_counts(self, texts):
+        """Occorrenze dei token come array (riga, colonna, segno); ogni token distinto è codificato una sola volta"""
+        token_lists = [self.TOKEN_PATTERN.findall(text.lower()) for text in texts]
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(token_lists))
+        tokens = [token for token_list in token_lists for token in token_list]
+        
+        vocabulary = {token: pos for pos, token in enumerate(dict.fromkeys(tokens))}
+        hashes = np.fromiter((zlib.crc32(token.encode('utf-8')) for token in vocabulary), dtype=np.int64, count=len(vocabulary))
+        token_ids = np.fromiter(map(vocabulary.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+        
+        rows = np.repeat(np.arange(len(texts)), lengths)
+        cols = (hashes % self.dim)[token_ids]
+        signs = np.where(hashes & 0x80000000, 1.0, -1.0).astype(np.float32)[token_ids]
+        return rows, cols, signs
+    
+    def term_matrix(self, texts):
+        """Matrice densa (testi x dim) dei conteggi con segno"""
+        rows, cols, signs = self.term_counts(texts)
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(matrix, (rows, cols), signs)
+        return matrix
+    
+    def document_frequency(self, texts):
+        """Numero di testi in cui compare ogni colonna: sommato sui blocchi, dà l'IDF dell'intero corpus"""
+        return np.count_nonzero(self.term_matrix(texts), axis=0)
+    
+    @staticmethod
+    def inverse_document_frequency(doc_freq, num_texts):
+        return (np.log((1 + num_texts) / (1 + doc_freq)) + 1).astype(np.float32)
+    
+    def vectorize(self, matrices, idf=None):
+        """Pesa le matrici dei conteggi con un IDF comune (calcolato sulle matrici stesse se non indicato)
+        e normalizza le righe (in place)"""
+        if idf is None:
+            idf = self.inverse_document_frequency(sum(np.count_nonzero(matrix, axis=0) for matrix in matrices),
+                                                  sum(len(matrix) for matrix in matrices))
+        for matrix in matrices:
+            matrix *= idf
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms > 0, norms, 1.0)
+        return matrices
+    
+    @staticmethod
+    def document_texts(documents_df):
+        titles = documents_df['titolo'].fillna('').astype(str) if 'titolo' in documents_df else pd.Series('', index=documents_df.index)
+        summaries = documents_df['riassunto'].fillna('').astype(str) if 'riassunto' in documents_df else ''
+        return (titles + ' ' + titles + ' ' + summaries).tolist()
+    
+    @staticmethod
+    def article_texts(articles):
+        return [f"{article['titolo']} {article['titolo']} {article['descrizione']}" for article in articles]
+    
+    @staticmethod
+    def to_days(values):
+        """Date in giorni dall'epoca (NaN se assenti)"""
+        dates = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', utc=True)
+        return ((dates.dt.tz_localize(None) - pd.Timestamp(0)).dt.total_seconds() / 86400).to_numpy(dtype=np.float32)
+    
+    def match(self, documents_df, articles, idf=None):
+        """Lista dei primi articoli correlati per ogni documento, nell'ordine del DataFrame
+        (idf: pesi dell'intero corpus, se i documenti arrivano a blocchi)"""
+        related = [[] for _ in range(len(documents_df))]
+        if not len(documents_df) or not articles:
+            return related
+        
+        doc_texts = self.document_texts(documents_df)
+        doc_vectors, article_vectors = self.vectorize(
+            [self.term_matrix(doc_texts), self.term_matrix(self.article_texts(articles))], idf=idf
+        )
+        
+        dates = documents_df['data_dt'] if 'data_dt' in documents_df else documents_df.get('data', pd.Series(None, index=documents_df.index))
+        doc_days = self.to_days(dates.tolist())
+        article_days = self.to_days([article.get('data_iso') for article in articles])
+        article_categories = np.array([article.get('categoria') for article in articles], dtype=object)
+        doc_categories = documents_df['categoria'].to_numpy(dtype=object)
+        
+        # Per categoria: prodotto matrice-matrice tra un blocco di documenti e gli articoli della categoria
+        for category in pd.unique(doc_categories):
+            doc_positions = np.flatnonzero(doc_categories == category)
+            article_positions = np.flatnonzero(article_categories == category)
+            if not len(article_positions):
+                continue
+            category_vectors = article_vectors[article_positions]
+            category_days = article_days[article_positions]
+            k = min(self.top_k, len(article_positions))
+            
+            for start in range(0, len(doc_positions), self.block_size):
+                block = doc_positions[start:start + self.block_size]
+                scores = doc_vectors[block] @ category_vectors.T
                 
-                # Aggiungi gli articoli al documento
-                documents_df.at[idx, 'articoli_correlati'] = related_articles[:3]  # Limita a 3 articoli per documento
+                # Articoli troppo lontani nel tempo esclusi (date mancanti sempre ammesse)
+                excluded = scores < self.min_score
+                if self.recency_days:
+                    excluded |= np.abs(doc_days[block, None] - category_days[None, :]) > self.recency_days
+                scores[excluded] = -np.inf
                 
-                logger.info(f"Aggiunti {len(related_articles[:3])} articoli al documento: {doc['titolo']}")
+                # Top-k per riga senza ordinare l'intera riga
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k] if k < scores.shape[1] else \
+                    np.broadcast_to(np.arange(scores.shape[1]), (len(block), scores.shape[1]))
+                top_scores = np.take_along_axis(scores, top, axis=1)
+                order = np.argsort(-top_scores, axis=1, kind='stable')
+                top = np.take_along_axis(top, order, axis=1)
+                top_scores = np.take_along_axis(top_scores, order, axis=1)
                 
-            except Exception as e:
-                logger.error(f"Errore durante l'integrazione degli articoli: {str(e)}")
+                valid = np.isfinite(top_scores)
+                top_articles = article_positions[top].tolist()
+                top_scores = np.round(top_scores.astype(np.float64), 4).tolist()
+                for row, doc_pos in enumerate(block.tolist()):
+                    related[doc_pos] = [
+                        dict(articles[article_pos], rilevanza=score)
+                        for article_pos, score, keep in zip(top_articles[row], top_scores[row], valid[row]) if keep
+                    ]
         
-        return documents_df
+        return related
 
 
-# Classe principale per il sistema
-class NormativeSystem:
-    def __init__(self, youtube_api_key=None):
-        self.scraper = NormativeScraper()
-        self.ai_processor = NormativeAIProcessor()
-        self.youtube_integrator = YouTubeIntegrator(youtube_api_key) if youtube_api_key else None
-        self.news_integrator = NewsIntegrator()
-        self.database = None
-        self.processed_database = None
+# Classe per le parole chiave calcolate sull'intero corpus
+class KeywordModel:
+    """Matrice sparsa documenti-termini con pesi TF-IDF, aggiornabile in modo incrementale"""
     
-    def run_full_pipeline(self, use_cached=False):
-        """Esegue l'intero pipeline di elaborazione"""
-        # 1. Scraping
-        if use_cached and self.scraper.load_from_json():
-            logger.info("Utilizzando dati di scraping precedentemente salvati")
-            self.database = self.scraper.database
+    def __init__(self, filename="normative_tfidf.npz", num_keywords=10):
+        self.filename = filename
+        self.num_keywords = num_keywords
+        self.vocabulary = {}
+        self.terms = []
+        self.doc_freq = np.zeros(0, dtype=np.int64)
+        # Righe della matrice: ID documento -> (colonne, conteggi)
+        self.rows = {}
+        self.load()
+    
+    def load(self):
+        """Carica il modello salvato, se presente"""
+        if not self.filename or not os.path.exists(self.filename):
+            return False
+        
+        try:
+            data = np.load(self.filename, allow_pickle=False)
+            self.terms = data['terms'].tolist()
+            self.vocabulary = {term: col for col, term in enumerate(self.terms)}
+            indptr, indices, counts = data['indptr'], data['indices'], data['counts']
+            self.rows = {
+                doc_id: (indices[indptr[pos]:indptr[pos + 1]], counts[indptr[pos]:indptr[pos + 1]])
+                for pos, doc_id in enumerate(data['doc_ids'].tolist())
+            }
+            self.doc_freq = np.bincount(indices, minlength=len(self.terms)).astype(np.int64)
+            return True
+        except Exception as e:
+            logger.error(f"Errore durante il caricamento del modello TF-IDF: {str(e)}")
+            return False
+    
+    def save(self):
+        """Salva il modello in formato NumPy compresso, in modo atomico"""
+        if not self.filename:
+            return
+        doc_ids, indptr, indices, counts = self.to_csr()
+        tmp_filename = f"{self.filename}.tmp.npz"
+        np.savez_compressed(
+            tmp_filename, terms=np.array(self.terms, dtype=str), doc_ids=np.array(doc_ids, dtype=str),
+            indptr=indptr, indices=indices, counts=counts
+        )
+        os.replace(tmp_filename, self.filename)
+    
+    def to_csr(self):
+        """Matrice in formato CSR: (ID documenti, indptr, indici di colonna, conteggi)"""
+        doc_ids = list(self.rows)
+        lengths = np.array([len(self.rows[doc_id][0]) for doc_id in doc_ids], dtype=np.int64)
+        indptr = np.concatenate(([0], np.cumsum(lengths))).astype(np.int64)
+        if doc_ids:
+            indices = np.concatenate([self.rows[doc_id][0] for doc_id in doc_ids]).astype(np.int32)
+            counts = np.concatenate([self.rows[doc_id][1] for doc_id in doc_ids]).astype(np.float32)
         else:
-            logger.info("Avvio scraping delle fonti...")
-            self.database = self.scraper.scrape_all_sources()
-            self.scraper.save_to_json()
+            indices, counts = np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        return doc_ids, indptr, indices, counts
+    
+    def add(self, doc_id, terms):
+        """Aggiunge (o sostituisce) la riga di un documento"""
+        if doc_id in self.rows:
+            self.remove([doc_id])
         
-        # 2. Elaborazione AI
-        logger.info("Avvio elaborazione AI dei documenti...")
-        self.processed_database = self.ai_processor.process_all_documents(self.database)
+        term_counts = {}
+        for term in terms:
+            term_counts[term] = term_counts.get(term, 0) + 1
+        for term in term_counts:
+            if term not in self.vocabulary:
+                self.vocabulary[term] = len(self.terms)
+                self.terms.append(term)
+        if len(self.terms) > len(self.doc_freq):
+            self.doc_freq = np.concatenate((self.doc_freq, np.zeros(len(self.terms) - len(self.doc_freq), dtype=np.int64)))
         
-        # 3. Integrazione YouTube (se configurato)
-        if self.youtube_integrator:
-            logger.info("Integrazione con video YouTube...")
-            self.processed_database = self.youtube_integrator.enrich_documents(self.processed_database)
+        indices = np.fromiter((self.vocabulary[term] for term in term_counts), dtype=np.int32, count=len(term_counts))
+        counts = np.fromiter(term_counts.values(), dtype=np.float32, count=len(term_counts))
+        self.rows[doc_id] = (indices, counts)
+        self.doc_freq[indices] += 1
+    
+    def remove(self, doc_ids):
+        """Rimuove le righe dei documenti indicati"""
+        for doc_id in doc_ids:
+            row = self.rows.pop(doc_id, None)
+            if row is not None:
+                self.doc_freq[row[0]] -= 1
+    
+    def update(self, added_terms, current_ids):
+        """Allinea il modello al corpus: rimuove i documenti scomparsi e aggiunge i nuovi"""
+        current_ids = set(current_ids)
+        self.remove([doc_id for doc_id in self.rows if doc_id not in current_ids])
+        for doc_id, terms in added_terms.items():
+            if doc_id in current_ids and isinstance(terms, list):
+                self.add(doc_id, terms)
+    
+    def top_keywords(self):
+        """Prime N parole chiave per documento, calcolate in un solo passaggio vettorizzato"""
+        doc_ids, indptr, indices, counts = self.to_csr()
+        if not len(indices):
+            return {doc_id: [] for doc_id in doc_ids}
         
-        # 4. Integrazione articoli di giornale
-        logger.info("Integrazione con articoli di giornale...")
-        self.processed_database = self.news_integrator.enrich_documents(self.processed_database)
+        # TF sublineare per IDF smussato
+        num_docs = len(doc_ids)
+        idf = np.log((1 + num_docs) / (1 + self.doc_freq)) + 1
+        weights = (1 + np.log(counts)) * idf[indices]
         
-        # 5. Salvataggio risultati
-        self.ai_processor.save_processed_docs(self.processed_database)
+        # Ordina per riga e, all'interno della riga, per peso decrescente
+        lengths = np.diff(indptr)
+        row_of = np.repeat(np.arange(num_docs), lengths)
+        order = np.lexsort((-weights, row_of))
+        rank = np.arange(len(order)) - indptr[row_of[order]]
+        keep = order[rank < self.num_keywords]
         
-        logger.info("Pipeline completata con successo")
-        return self.processed_database
+        terms = np.array(self.terms, dtype=object)[indices[keep]]
+        boundaries = np.cumsum(np.minimum(lengths, self.num_keywords))[:-1]
+        return {doc_id: row_terms.tolist() for doc_id, row_terms in zip(doc_ids, np.split(terms, boundaries))}
+
+
+# Classe per l'indice di ricerca full-text
+class SearchIndex:
+    """Indice invertito con ranking BM25 sui campi testuali dei documenti"""
     
-    def search_documents(self, query, category=None):
-        """Cerca documenti in base a una query"""
-        if self.processed_database is None:
-            logger.error("Database non disponibile. Eseguire prima run_full_pipeline()")
+    # Pesi dei campi (stessi del vecchio punteggio: titolo > riassunto > testo)
+    FIELD_WEIGHTS = {
+        'titolo': 3.0,
+        'riassunto': 2.0,
+        'testo_semplificato': 1.0
+    }
+    
+    def __init__(self, documents_df, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.num_docs = 0
+        self.categories = []
+        self.postings = {}
+        self.idf = {}
+        self.build(documents_df)
+    
+    @staticmethod
+    def tokenize(text):
+        """Divide il testo in token normalizzati"""
+        if not isinstance(text, str):
             return []
+        return re.findall(r"\w+", text.lower())
+    
+    def build(self, documents_df):
+        """Costruisce le liste di posting con i pesi BM25F precalcolati"""
+        self.num_docs = len(documents_df)
+        self.categories = list(documents_df['categoria']) if self.num_docs else []
         
-        # Filtra per categoria se specificata
-        if category:
-            filtered_db = self.processed_database[self.processed_database['categoria'] == category]
+        # Prima le sole lunghezze dei campi: le frequenze dei termini non restano in memoria per tutti i documenti
+        fields = {
+            field: documents_df[field] if field in documents_df else [''] * self.num_docs
+            for field in self.FIELD_WEIGHTS
+        }
+        field_lengths = {field: [len(self.tokenize(text)) for text in values] for field, values in fields.items()}
+        avg_lengths = {
+            field: (sum(lengths) / len(lengths) if lengths else 0) or 1
+            for field, lengths in field_lengths.items()
+        }
+        
+        # Frequenza pesata per (termine, documento), normalizzata per lunghezza del campo
+        weighted_tf = {}
+        for field, weight in self.FIELD_WEIGHTS.items():
+            avg_length = avg_lengths[field]
+            for doc_pos, text in enumerate(fields[field]):
+                tf = {}
+                for token in self.tokenize(text):
+                    tf[token] = tf.get(token, 0) + 1
+                norm = 1 - self.b + self.b * field_lengths[field][doc_pos] / avg_length
+                for term, freq in tf.items():
+                    doc_weights = weighted_tf.setdefault(term, {})
+                    doc_weights[doc_pos] = doc_weights.get(doc_pos, 0.0) + weight * freq / norm
+        
+        # Il contributo di ogni posting non dipende dalla query: lo calcoliamo una volta sola
+        # (le frequenze di ogni termine sono liberate man mano che la sua lista è pronta)
+        self.postings = {}
+        self.idf = {}
+        for term in list(weighted_tf):
+            doc_weights = weighted_tf.pop(term)
+            df = len(doc_weights)
+            self.idf[term] = math.log(1 + (self.num_docs - df + 0.5) / (df + 0.5))
+            self.postings[term] = [
+                (doc_pos, tf * (self.k1 + 1) / (tf + self.k1))
+                for doc_pos, tf in doc_weights.items()
+            ]
+        
+        logger.info(f"Indice di ricerca costruito: {self.num_docs} documenti, {len(self.postings)} termini")
+    
+    def score(self, query, category=None):
+        """Punteggi BM25 di tutti i documenti che contengono almeno un termine della query"""
+        scores = {}
+        for term in set(self.tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf[term]
+            for doc_pos, impact in postings:
+                # Pre-filtro per categoria direttamente sulle liste di posting
+                if category and self.categories[doc_pos] != category:
+                    continue
+                scores[doc_pos] = scores.get(doc_pos, 0.0) + idf * impact
+        return scores
+    
+    def search(self, query, category=None, top_k=None):
+        """Restituisce le posizioni dei documenti ordinate per punteggio BM25"""
+        scores = self.score(query, category=category)
+        
+        if top_k is not None:
+            ranked = heapq.nlargest(top_k, scores.items(), key=lambda x: x[1])
         else:
-            filtered_db = self.processed_database
+            ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
         
-        # Calcola punteggi di rilevanza
-        results = []
-        for _, doc in filtered_db.iterrows():
-            # Calcola un punteggio semplice basato sulla presenza dei termini della query
-            score = 0
-            query_terms = query.lower().split()
+        return ranked
+
+
+# Classe per la ricerca semantica
+class SemanticIndex:
+    """Matrice contigua degli embedding normalizzati dei documenti"""
+    
+    # Quasi tutti i documenti hanno similarità positiva con qualsiasi query: senza soglia e limite
+    # i candidati sarebbero l'intero corpus
+    MIN_SCORE = 0.3
+    MAX_CANDIDATES = 1000
+    
+    def __init__(self, embeddings, categories):
+        self.embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        self.categories = np.asarray(categories, dtype=object)
+        self._category_masks = {}
+    
+    @staticmethod
+    def vector_dim(values):
+        """Dimensione del primo vettore non vuoto (0 se nessun documento ha un vettore)"""
+        return next((len(value) for value in values if isinstance(value, (list, np.ndarray)) and len(value)), 0)
+    
+    @classmethod
+    def stack(cls, values, dim=None):
+        """Costruisce la matrice degli embedding; i documenti senza vettore restano a zero"""
+        if dim is None:
+            dim = cls.vector_dim(values)
+        matrix = np.zeros((len(values), dim), dtype=np.float32)
+        for pos, value in enumerate(values):
+            if isinstance(value, (list, np.ndarray)) and len(value) == dim:
+                matrix[pos] = value
+        return matrix
+    
+    @property
+    def dim(self):
+        return self.embeddings.shape[1]
+    
+    def category_mask(self, category):
+        """Maschera booleana dei documenti della categoria (calcolata una volta)"""
+        if category not in self._category_masks:
+            self._category_masks[category] = self.categories == category
+        return self._category_masks[category]
+    
+    def embed_query(self, query):
+        """Vettore normalizzato della query (serve solo il tokenizer)"""
+        vector = np.asarray(nlp.make_doc(query).vector, dtype=np.float32)
+        if vector.shape[0] != self.dim:
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+    
+    def score(self, query, lexical=None, alpha=1.0):
+        """Punteggi di tutti i documenti: similarità coseno, eventualmente combinata con i punteggi
+        lessicali (posizioni, valori); None se nessuna parola della query ha un vettore"""
+        query_vector = self.embed_query(query)
+        if query_vector is None:
+            return None
+        
+        # Un solo prodotto matrice-vettore sull'intero corpus
+        scores = alpha * (self.embeddings @ query_vector)
+        
+        # Punteggi lessicali (BM25) normalizzati in [0, 1]
+        if lexical is not None and len(lexical[0]) and alpha < 1.0:
+            positions, values = lexical
+            values = np.asarray(values, dtype=np.float32)
+            scores[np.asarray(positions, dtype=np.int64)] += (1.0 - alpha) * values / values.max()
+        return scores
+    
+    def candidates(self, scores, min_score=None):
+        """Posizioni dei documenti candidati: sopra la soglia e, al più, i MAX_CANDIDATES con il punteggio più alto"""
+        min_score = self.MIN_SCORE if min_score is None else min_score
+        positions = np.flatnonzero(scores > min_score)
+        if len(positions) > self.MAX_CANDIDATES:
+            top = np.argpartition(-scores[positions], self.MAX_CANDIDATES - 1)[:self.MAX_CANDIDATES]
+            positions = np.sort(positions[top])
+        return positions
+
+
+# Classe per i filtri a faccette
+class FacetIndex:
+    """Bitset NumPy compressi (un bit per documento) per ogni valore di categoria, fonte, tipo di fonte e mese"""
+    
+    FIELDS = ('categoria', 'fonte', 'tipo_fonte')
+    # Bit a 1 di ogni byte: i conteggi sono una somma su tabella, senza decomprimere i bitset
+    POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+    
+    def __init__(self, documents_df):
+        self.num_docs = len(documents_df)
+        self.all = self.pack(np.ones(self.num_docs, dtype=bool))
+        self.bitmaps = {}
+        for field in self.FIELDS:
+            values = documents_df[field].to_numpy(dtype=object) if field in documents_df else np.full(self.num_docs, None)
+            self.bitmaps[field] = {
+                value: self.pack(values == value) for value in pd.unique(values) if isinstance(value, str) and value
+            }
+        self.build_dates(documents_df)
+    
+    def pack(self, mask):
+        return np.packbits(np.asarray(mask, dtype=bool))
+    
+    def unpack(self, bits):
+        """Maschera booleana dei documenti del bitset"""
+        return np.unpackbits(bits, count=self.num_docs).astype(bool)
+    
+    def from_positions(self, positions):
+        mask = np.zeros(self.num_docs, dtype=bool)
+        mask[np.asarray(positions, dtype=np.int64)] = True
+        return self.pack(mask)
+    
+    def count(self, bits):
+        return int(self.POPCOUNT[bits].sum(dtype=np.int64))
+    
+    def build_dates(self, documents_df):
+        """Bitset per mese e bitset cumulativi (documenti dei mesi precedenti) per gli intervalli di date"""
+        dates = pd.to_datetime(documents_df['data_dt'], errors='coerce') if 'data_dt' in documents_df else \
+            pd.Series(pd.NaT, index=range(self.num_docs))
+        months = dates.dt.strftime('%Y-%m').to_numpy(dtype=object)
+        self.timestamps = dates.to_numpy(dtype='datetime64[ns]')
+        self.months = sorted(month for month in pd.unique(months) if isinstance(month, str))
+        self.month_positions = {month: np.flatnonzero(months == month) for month in self.months}
+        self.bitmaps['mese'] = {month: self.pack(months == month) for month in self.months}
+        
+        # before[i]: documenti pubblicati prima del mese i (before[-1]: tutti i documenti datati)
+        cumulative = np.zeros(self.num_docs, dtype=bool)
+        self.before = [self.pack(cumulative)]
+        for month in self.months:
+            cumulative[self.month_positions[month]] = True
+            self.before.append(self.pack(cumulative))
+    
+    def date_range(self, start=None, end=None):
+        """Documenti pubblicati tra start ed end inclusi (date senza orario: end vale fino a fine giornata)"""
+        start = pd.Timestamp(start) if start is not None else None
+        end = pd.Timestamp(end) if end is not None else None
+        if end is not None and end == end.normalize():
+            end = end + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+        
+        # Mesi interi con due bitset cumulativi
+        first = bisect.bisect_left(self.months, start.strftime('%Y-%m')) if start is not None else 0
+        last = bisect.bisect_right(self.months, end.strftime('%Y-%m')) if end is not None else len(self.months)
+        if first >= last:
+            return np.zeros_like(self.all)
+        bits = self.before[last] & ~self.before[first]
+        
+        # Mesi di confine: esclusi i giorni fuori dall'intervallo (costo proporzionale a quei due mesi)
+        for bound in (start, end):
+            positions = self.month_positions.get(bound.strftime('%Y-%m')) if bound is not None else None
+            if positions is None:
+                continue
+            timestamps = self.timestamps[positions]
+            outside = np.zeros(len(positions), dtype=bool)
+            if start is not None:
+                outside |= timestamps < start.to_datetime64()
+            if end is not None:
+                outside |= timestamps > end.to_datetime64()
+            if outside.any():
+                bits = bits & ~self.from_positions(positions[outside])
+        return bits
+    
+    def value_bitmap(self, field, values):
+        """Documenti con uno qualsiasi dei valori indicati (OR dei bitset)"""
+        bits = np.zeros_like(self.all)
+        for value in values:
+            bitmap = self.bitmaps[field].get(value)
+            if bitmap is not None:
+                bits = bits | bitmap
+        return bits
+    
+    def filter(self, filters, exclude=None):
+        """AND dei filtri: {campo: [valori]}, più 'data_da' e 'data_a' (exclude: campo ignorato)"""
+        bits = self.all
+        for field in self.FIELDS:
+            values = (filters or {}).get(field)
+            if values and field != exclude:
+                bits = bits & self.value_bitmap(field, values)
+        start, end = (filters or {}).get('data_da'), (filters or {}).get('data_a')
+        if (start is not None or end is not None) and exclude != 'mese':
+            bits = bits & self.date_range(start, end)
+        return bits
+    
+    def counts(self, candidates, filters):
+        """Conteggi per valore di ogni faccetta; ogni faccetta ignora il proprio filtro (selezione multipla)"""
+        counts = {}
+        for field, bitmaps in self.bitmaps.items():
+            base = candidates & self.filter(filters, exclude=field)
+            field_counts = {value: self.count(base & bitmap) for value, bitmap in bitmaps.items()}
+            counts[field] = {value: count for value, count in field_counts.items() if count}
+        return counts
+
+
+# Classe per i suggerimenti durante la digitazione
+class SuggestIndex:
+    """Suggerimenti per prefisso su titoli, parole chiave e categorie, già ordinati per rilevanza"""
+    
+    # Peso di ogni tipo di suggerimento (moltiplica popolarità o recenza, normalizzate in (0, 1])
+    KIND_WEIGHTS = {
+        'categoria': 3.0,
+        'parola_chiave': 2.0,
+        'titolo': 1.0
+    }
+    # Le corrispondenze a metà del testo (una parola successiva alla prima) valgono meno
+    INNER_WORD_FACTOR = 0.5
+    # Lunghezza massima delle chiavi: i prefissi più lunghi vengono troncati
+    MAX_KEY_LENGTH = 64
+    
+    def __init__(self, documents_df, category_names=None):
+        self.entries = []
+        self.keys = []
+        self.positions = np.zeros(0, dtype=np.int32)
+        self.scores = np.zeros(0)
+        self.table = []
+        self.build(documents_df, category_names or {})
+    
+    @staticmethod
+    def normalize(text):
+        """Minuscole, senza accenti, parole separate da un solo spazio (lo spazio finale viene mantenuto)"""
+        if not isinstance(text, str):
+            return ''
+        text = unicodedata.normalize('NFKD', text.lower())
+        text = ''.join(char for char in text if not unicodedata.combining(char))
+        return re.sub(r'[\W_]+', ' ', text).lstrip()
+    
+    def add_entry(self, text, kind, score, **extra):
+        self.entries.append({'text': text, 'tipo': kind, 'score': self.KIND_WEIGHTS[kind] * float(score), **extra})
+    
+    def build(self, documents_df, category_names):
+        """Raccoglie i suggerimenti e costruisce gli array ordinati per la ricerca binaria"""
+        if len(documents_df):
+            # Categorie e parole chiave: popolarità (numero di documenti)
+            category_counts = documents_df['categoria'].value_counts()
+            for category, count in category_counts.items():
+                self.add_entry(category_names.get(category, category), 'categoria',
+                               count / category_counts.max(), id=category)
             
-            for term in query_terms:
-                if term in doc['titolo'].lower():
-                    score += 3  # Maggiore peso per i termini nel titolo
-                if term in doc['riassunto'].lower():
-                    score += 2  # Peso medio per i termini nel riassunto
-                if term in doc['testo_semplificato'].lower():
-                    score += 1  # Peso minore per i termini nel testo
+            if 'parole_chiave' in documents_df:
+                keyword_counts = {}
+                for keywords in documents_df['parole_chiave']:
+                    if isinstance(keywords, (list, tuple, np.ndarray)):
+                        for keyword in set(keywords):
+                            keyword_counts[keyword] = keyword_counts.get(keyword, 0) + 1
+                max_count = max(keyword_counts.values(), default=1)
+                for keyword, count in keyword_counts.items():
+                    self.add_entry(keyword, 'parola_chiave', count / max_count)
             
-            if score > 0:
-                results.append((doc, score))
+            # Titoli: recenza (i documenti senza data in fondo)
+            dates = pd.to_datetime(documents_df['data_dt'], errors='coerce') if 'data_dt' in documents_df else None
+            timestamps = dates.astype('int64').to_numpy(dtype=float) if dates is not None else np.zeros(len(documents_df))
+            valid = dates.notna().to_numpy() if dates is not None else np.zeros(len(documents_df), dtype=bool)
+            if valid.any():
+                low, high = timestamps[valid].min(), timestamps[valid].max()
+                recency = 0.1 + 0.9 * (timestamps - low) / ((high - low) or 1)
+            else:
+                recency = np.full(len(documents_df), 0.1)
+            recency[~valid] = 0.05
+            # Titoli identici: un solo suggerimento, quello del documento più recente
+            seen_titles = set()
+            for pos in np.argsort(-recency, kind='stable'):
+                title = documents_df['titolo'].iat[pos]
+                if not isinstance(title, str) or not title or self.normalize(title) in seen_titles:
+                    continue
+                seen_titles.add(self.normalize(title))
+                self.add_entry(title, 'titolo', recency[pos], id=documents_df['id'].iat[pos],
+                               categoria=documents_df['categoria'].iat[pos])
+        
+        # Una chiave per ogni parola di ogni suggerimento: "credito d'imposta" si trova anche con "imp"
+        keys = []
+        for pos, entry in enumerate(self.entries):
+            normalized = self.normalize(entry['text'])
+            starts = [0] + [match.end() for match in re.finditer(' ', normalized)]
+            for word, start in enumerate(starts):
+                score = entry['score'] * (1 if word == 0 else self.INNER_WORD_FACTOR)
+                keys.append((normalized[start:start + self.MAX_KEY_LENGTH], score, pos))
+        keys.sort()
+        
+        self.keys = [key for key, _, _ in keys]
+        self.scores = np.array([score for _, score, _ in keys], dtype=float)
+        self.positions = np.array([pos for _, _, pos in keys], dtype=np.int32)
+        self.build_table()
+    
+    def build_table(self):
+        """Sparse table per il massimo su intervalli: la chiave col punteggio più alto in O(1)"""
+        self.table = [np.arange(len(self.keys), dtype=np.int32)]
+        width = 1
+        while width * 2 <= len(self.keys):
+            previous = self.table[-1]
+            left, right = previous[:-width], previous[width:]
+            self.table.append(np.where(self.scores[left] >= self.scores[right], left, right))
+            width *= 2
+    
+    def best_in_range(self, lo, hi):
+        """Posizione della chiave con il punteggio più alto in keys[lo:hi]"""
+        level = (hi - lo).bit_length() - 1
+        left, right = int(self.table[level][lo]), int(self.table[level][hi - (1 << level)])
+        return left if self.scores[left] >= self.scores[right] else right
+    
+    def suggest(self, prefix, limit=10):
+        """Suggerimenti che iniziano con il prefisso (anche da una parola interna), per punteggio"""
+        prefix = self.normalize(prefix)[:self.MAX_KEY_LENGTH]
+        if not prefix or not self.keys:
+            return []
+        
+        # Intervallo delle chiavi con il prefisso: due ricerche binarie
+        lo = bisect.bisect_left(self.keys, prefix)
+        hi = bisect.bisect_left(self.keys, prefix + '\uffff', lo)
+        if lo >= hi:
+            return []
+        
+        # Estrazione dei migliori senza scorrere l'intervallo: si divide attorno al massimo
+        results, seen = [], set()
+        best = self.best_in_range(lo, hi)
+        heap = [(-self.scores[best], best, lo, hi)]
+        while heap and len(results) < limit:
+            _, best, lo, hi = heapq.heappop(heap)
+            entry_pos = self.positions[best]
+            if entry_pos not in seen:
+                seen.add(entry_pos)
+                results.append(self.entries[entry_pos])
+            for sub_lo, sub_hi in ((lo, best), (best + 1, hi)):
+                if sub_lo < sub_hi:
+                    sub_best = self.best_in_range(sub_lo, sub_hi)
+                    heapq.heappush(heap, (-self.scores[sub_best], sub_best, sub_lo, sub_hi))
+        return results
+
+
+# Classe per l'indice delle normative più recenti
+class LatestIndex:
+    """Documenti ordinati per data, globalmente e per categoria, aggiornabile in modo incrementale"""
+    
+    # Chiave di ordinamento per i documenti senza data: in fondo alla lista
+    NO_DATE = float('inf')
+    
+    def __init__(self, documents_df=None):
+        self.by_category = {}
+        self.all = []
+        self.keys = {}
+        if documents_df is not None:
+            self.add(documents_df)
+    
+    @classmethod
+    def sort_key(cls, value):
+        """Timestamp negato: la lista ordinata in modo crescente va dal più recente al più vecchio"""
+        if value is None or pd.isna(value):
+            return cls.NO_DATE
+        return -pd.Timestamp(value).timestamp()
+    
+    def add(self, documents_df):
+        """Inserisce i documenti mantenendo l'ordinamento per data"""
+        if documents_df is None or documents_df.empty:
+            return
+        
+        records = documents_df[['id', 'categoria', 'data_dt']].to_dict('records')
+        # Le versioni precedenti vanno tolte prima di aggiungere: la rimozione usa la bisezione su liste ordinate
+        self.remove([doc['id'] for doc in records])
+        # Con molti documenti conviene riordinare una volta sola invece di inserire uno alla volta
+        bulk = len(records) > len(self.all)
+        for doc in records:
+            entry = (self.sort_key(doc['data_dt']), doc['id'])
+            self.keys[doc['id']] = (entry, doc['categoria'])
+            category_list = self.by_category.setdefault(doc['categoria'], [])
+            if bulk:
+                self.all.append(entry)
+                category_list.append(entry)
+            else:
+                bisect.insort(self.all, entry)
+                bisect.insort(category_list, entry)
+        
+        if bulk:
+            self.all.sort()
+            for category_list in self.by_category.values():
+                category_list.sort()
+    
+    def remove(self, doc_ids):
+        """Rimuove i documenti indicati"""
+        for doc_id in doc_ids:
+            if doc_id not in self.keys:
+                continue
+            entry, category = self.keys.pop(doc_id)
+            for entries in (self.all, self.by_category.get(category, [])):
+                pos = bisect.bisect_left(entries, entry)
+                if pos < len(entries) and entries[pos] == entry:
+                    del entries[pos]
+    
+    def latest(self, category=None, limit=5, since=None):
+        """Restituisce gli ID dei documenti più recenti: costo proporzionale a limit"""
+        entries = self.by_category.get(category, []) if category else self.all
+        max_key = self.sort_key(since) if since is not None else self.NO_DATE
+        
+        result = []
+        for key, doc_id in entries:
+            if len(result) >= limit or key > max_key:
+                break
+            result.append(doc_id)
+        return result
+    
+    def copy(self):
+        """Copia indipendente: gli aggiornamenti incrementali non toccano l'indice già pubblicato"""
+        index = LatestIndex()
+        index.all = list(self.all)
+        index.by_category = {category: list(entries) for category, entries in self.by_category.items()}
+        index.keys = dict(self.keys)
+        return index
+
+
+# Classe per lo snapshot colonnare del database elaborato
+class ColumnarSnapshot:
+    """Snapshot in formato Arrow IPC, leggibile tramite memory map"""
+    
+    # Campi annidati salvati come liste native, non come stringhe JSON
+    NESTED_COLUMNS = ('parole_chiave', 'video_correlati', 'articoli_correlati', 'fonti')
+    # Colonne lette per costruire gli indici; gli altri campi restano solo nel file mappato
+    INDEX_COLUMNS = (
+        'id', 'titolo', 'categoria', 'fonte', 'tipo_fonte', 'data', 'data_dt', 'riassunto', 'testo_semplificato',
+        'parole_chiave', 'embedding'
+    )
+    
+    @staticmethod
+    def is_available():
+        return pa is not None
+    
+    @classmethod
+    def to_table(cls, documents_df, dim=None):
+        """Converte il DataFrame in una tabella Arrow (dim: dimensione degli embedding, se già nota)"""
+        columns = {}
+        for column in documents_df.columns:
+            series = documents_df[column]
+            if column == 'embedding':
+                # Vettori a dimensione fissa: rileggibili come matrice NumPy senza copie
+                matrix = SemanticIndex.stack(series.tolist(), dim=dim)
+                if matrix.shape[1]:
+                    columns[column] = pa.FixedSizeListArray.from_arrays(pa.array(matrix.ravel()), matrix.shape[1])
+            elif column in cls.NESTED_COLUMNS:
+                columns[column] = [value if isinstance(value, list) else [] for value in series.tolist()]
+            elif column == 'data_dt':
+                # I record riutilizzati arrivano dall'archivio JSON con la data come stringa: colonna timestamp
+                columns[column] = pa.array(pd.to_datetime(series, errors='coerce', format='mixed'), type=pa.timestamp('ns'))
+            elif series.dtype == object:
+                columns[column] = [value if isinstance(value, str) else None for value in series.tolist()]
+            else:
+                columns[column] = pa.array(series)
+        return pa.table(columns)
+    
+    @classmethod
+    def save(cls, documents_df, filename="normative_elaborate.arrow", chunk_size=None):
+        """Salva lo snapshot in modo atomico, un blocco di righe alla volta; False se pyarrow non è installato"""
+        if not cls.is_available():
+            return False
+        
+        chunk_size = chunk_size or max(len(documents_df), 1)
+        dim = SemanticIndex.vector_dim(documents_df['embedding']) if 'embedding' in documents_df else 0
+        with ColumnarSnapshotWriter(filename, dim=dim) as writer:
+            for start in range(0, max(len(documents_df), 1), chunk_size):
+                writer.write(documents_df.iloc[start:start + chunk_size])
+        return True
+    
+    @classmethod
+    def open(cls, filename="normative_elaborate.arrow"):
+        """Tabella Arrow mappata in memoria (nessuna copia), o None"""
+        if not cls.is_available() or not os.path.exists(filename):
+            return None
         
-        # Ordina per punteggio
-        results.sort(key=lambda x: x[1], reverse=True)
+        # Le pagine del file sono condivise tra i processi tramite la page cache
+        source = pa.memory_map(filename, 'r')
+        return pa.ipc.open_file(source).read_all()
+    
+    @classmethod
+    def load(cls, filename="normative_elaborate.arrow", columns=None):
+        """Mappa lo snapshot in memoria e restituisce (tabella, DataFrame delle colonne richieste, embedding)"""
+        table = cls.open(filename)
+        if table is None:
+            return None, None, None
+        
+        selected = columns
+        columns = {}
+        embeddings = None
+        for name in table.column_names:
+            if selected is not None and name not in selected:
+                continue
+            if name == 'embedding':
+                vectors = table.column(name).combine_chunks()
+                embeddings = vectors.flatten().to_numpy().reshape(len(vectors), vectors.type.list_size)
+            elif name in cls.NESTED_COLUMNS:
+                columns[name] = table.column(name).to_pylist()
+            else:
+                columns[name] = table.column(name).to_pandas()
         
-        # Restituisci i documenti ordinati
-        return [doc for doc, _ in results]
+        return table, pd.DataFrame(columns), embeddings
+
+
+# Classe per la scrittura a blocchi dello snapshot colonnare
+class ColumnarSnapshotWriter:
+    """Scrive lo snapshot Arrow un blocco alla volta: ogni blocco va in un file temporaneo con i propri tipi,
+    la chiusura unifica i tipi e ricompone il file finale in modo atomico"""
+    
+    def __init__(self, filename="normative_elaborate.arrow", dim=None):
+        self.filename = filename
+        # Dimensione degli embedding: presa dal primo blocco che ne contiene, se non indicata
+        self.dim = dim
+        self.parts = []
+        self.schemas = []
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+    
+    def write(self, documents_df):
+        """Converte e salva un blocco di documenti"""
+        if not self.dim and 'embedding' in documents_df:
+            self.dim = SemanticIndex.vector_dim(documents_df['embedding']) or None
+        table = ColumnarSnapshot.to_table(documents_df, dim=self.dim)
+        part = f"{self.filename}.tmp.{len(self.parts)}"
+        self.parts.append(part)
+        with pa.OSFile(part, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        self.schemas.append(table.schema)
+    
+    @staticmethod
+    def conform(table, schema):
+        """Porta un blocco allo schema comune; le colonne assenti sono vuote (a zero per gli embedding)"""
+        columns = []
+        for field in schema:
+            if field.name in table.column_names:
+                columns.append(table.column(field.name).cast(field.type))
+            elif field.name == 'embedding':
+                zeros = pa.array(np.zeros(table.num_rows * field.type.list_size, dtype=np.float32), type=field.type.value_type)
+                columns.append(pa.FixedSizeListArray.from_arrays(zeros, field.type.list_size))
+            else:
+                columns.append(pa.nulls(table.num_rows, field.type))
+        return pa.Table.from_arrays(columns, schema=schema)
+    
+    def close(self):
+        """Ricompone i blocchi nello snapshot finale (un blocco in memoria alla volta)"""
+        # Un blocco può avere solo liste vuote o valori mancanti: i tipi si unificano su tutti i blocchi
+        schema = pa.unify_schemas(self.schemas, promote_options='permissive') if self.schemas else pa.schema([])
+        tmp_filename = f"{self.filename}.tmp"
+        try:
+            # Nessuna compressione: il file deve poter essere mappato in memoria così com'è
+            with pa.OSFile(tmp_filename, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+                for part in self.parts:
+                    with pa.memory_map(part, 'r') as source:
+                        writer.write_table(self.conform(pa.ipc.open_file(source).read_all(), schema))
+            os.replace(tmp_filename, self.filename)
+        finally:
+            self.discard()
+        logger.info(f"Snapshot colonnare salvato in {self.filename}")
+        return True
+    
+    def discard(self):
+        """Rimuove i file temporanei"""
+        for part in self.parts + [f"{self.filename}.tmp"]:
+            if os.path.exists(part):
+                os.remove(part)
+        self.parts = []
+        self.schemas = []
+
+
+# Classe per la scrittura a blocchi dello snapshot JSON
+class JsonSnapshotWriter:
+    """Scrive l'array JSON dei documenti elaborati un blocco alla volta, in un file temporaneo sostituito alla chiusura"""
+    
+    def __init__(self, filename="normative_elaborate.json"):
+        self.filename = filename
+        # Scrittura atomica: chi legge lo snapshot non vede mai un file a metà
+        self.tmp_filename = f"{filename}.tmp"
+        self.file = open(self.tmp_filename, 'w', encoding='utf-8')
+        self.file.write('[')
+        self.empty = True
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+    
+    def write(self, documents_df):
+        """Aggiunge un blocco di documenti all'array"""
+        if not len(documents_df):
+            return
+        # Gli embedding sono salvati solo nello snapshot colonnare
+        columns = [column for column in documents_df.columns if column != 'embedding']
+        rows = documents_df[columns].to_json(orient='records', force_ascii=False, indent=4, date_format='iso')
+        # Ogni blocco è un array JSON: si scrivono solo gli elementi, separati da virgole
+        self.file.write(('' if self.empty else ',') + rows[1:-1])
+        self.empty = False
+    
+    def close(self):
+        self.file.write(']')
+        self.file.close()
+        os.replace(self.tmp_filename, self.filename)
+        logger.info(f"Documenti elaborati salvati in {self.filename}")
+    
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.tmp_filename):
+            os.remove(self.tmp_filename)
+
+
+# Classe per il riconoscimento dei documenti quasi duplicati tra le fonti
+class DuplicateDetector:
+    """Firme MinHash su shingle di parole, con LSH a bande per trovare i candidati in tempo lineare"""
+    
+    # Primo sotto 2^32: le firme stanno in uint32
+    PRIME = 4294967291
+    # Numero dell'atto nel titolo ("n. 45/2024"): atti con numeri diversi non sono mai duplicati
+    ACT_NUMBER_PATTERN = re.compile(r'\bn(?:\.|°|um\.)?\s*(\d+)', re.IGNORECASE)
+    # Candidati confrontati al massimo per bucket (i più recenti): limita il caso peggiore
+    MAX_BUCKET_CANDIDATES = 100
+    
+    def __init__(self, filename="normative_minhash.npz", num_perm=128, bands=16, shingle_size=3,
+                 threshold=0.8, seed=1):
+        self.filename = filename
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        # Permutazioni fisse (seme costante): le firme salvate restano confrontabili tra esecuzioni
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 1 << 31, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, self.PRIME, num_perm, dtype=np.uint64)
+        # ID documento -> firma, e ID documento -> etichetta del gruppo di duplicati
+        self.signatures = {}
+        self.groups = {}
+        self.load()
+    
+    def load(self):
+        """Carica firme e gruppi salvati, se presenti"""
+        if not self.filename or not os.path.exists(self.filename):
+            return False
+        
+        try:
+            data = np.load(self.filename, allow_pickle=False)
+            if data['signatures'].shape[1] != self.num_perm:
+                return False
+            doc_ids = data['doc_ids'].tolist()
+            self.signatures = dict(zip(doc_ids, data['signatures']))
+            self.groups = dict(zip(doc_ids, data['groups'].tolist()))
+            return True
+        except Exception as e:
+            logger.error(f"Errore durante il caricamento delle firme MinHash: {str(e)}")
+            return False
+    
+    def save(self):
+        """Salva firme e gruppi in formato NumPy compresso, in modo atomico"""
+        if not self.filename:
+            return
+        doc_ids = list(self.signatures)
+        signatures = np.array([self.signatures[doc_id] for doc_id in doc_ids], dtype=np.uint32).reshape(-1, self.num_perm)
+        tmp_filename = f"{self.filename}.tmp.npz"
+        np.savez_compressed(
+            tmp_filename, doc_ids=np.array(doc_ids, dtype=str), signatures=signatures,
+            groups=np.array([self.groups.get(doc_id, doc_id) for doc_id in doc_ids], dtype=str)
+        )
+        os.replace(tmp_filename, self.filename)
+    
+    def signature(self, text, hash_cache=None):
+        """Firma MinHash degli shingle di parole del testo (None per i testi vuoti)"""
+        tokens = SearchIndex.tokenize(text)
+        if not tokens:
+            return None
+        
+        # Hash stabili tra processi (crc32, non hash()), calcolati una volta per parola
+        hash_cache = {} if hash_cache is None else hash_cache
+        for token in set(tokens).difference(hash_cache):
+            hash_cache[token] = zlib.crc32(token.encode('utf-8'))
+        token_hashes = np.array([hash_cache[token] for token in tokens], dtype=np.uint64)
+        # Hash di ogni shingle combinando quelli delle sue parole, senza creare le stringhe
+        size = min(self.shingle_size, len(tokens))
+        shingles = np.zeros(len(tokens) - size + 1, dtype=np.uint64)
+        for offset in range(size):
+            shingles = (shingles * np.uint64(1000003) + token_hashes[offset:len(tokens) - size + 1 + offset]) & np.uint64(0xFFFFFFFF)
+        shingles = np.unique(shingles)
+        
+        # Tutte le permutazioni in una sola operazione: (shingle x permutazioni), minimo per colonna
+        return ((shingles[:, None] * self.a + self.b) % np.uint64(self.PRIME)).min(axis=0).astype(np.uint32)
+    
+    @classmethod
+    def act_number(cls, title):
+        match = cls.ACT_NUMBER_PATTERN.search(title) if isinstance(title, str) else None
+        return match.group(1) if match else ''
+    
+    def band_keys(self, signature, act_number=''):
+        """Chiavi LSH: una per banda, separate per numero dell'atto"""
+        return [
+            (act_number, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+    
+    def similarity(self, first, second):
+        """Stima della similarità di Jaccard dalle firme"""
+        return float(np.mean(first == second))
+    
+    def merge(self, documents_df, source_priority=()):
+        """Unisce i quasi duplicati in un documento canonico con l'elenco delle fonti (colonna 'fonti')"""
+        if documents_df.empty:
+            return documents_df
+        
+        documents_df = documents_df.reset_index(drop=True)
+        doc_ids = documents_df['id'].tolist()
+        texts, titles = documents_df['testo'].tolist(), documents_df['titolo'].tolist()
+        fonti, urls = documents_df['fonte'].tolist(), documents_df['url'].tolist()
+        present = set(doc_ids)
+        
+        # Documenti non più presenti: firme e gruppi vengono scartati
+        self.signatures = {doc_id: sig for doc_id, sig in self.signatures.items() if doc_id in present}
+        self.groups = {doc_id: group for doc_id, group in self.groups.items() if doc_id in present}
+        
+        # Gruppi già noti: i confronti tra documenti già visti non vengono ripetuti
+        parent = {}
+        
+        def find(node):
+            root = node
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while node != root:
+                parent[node], node = root, parent[node]
+            return root
+        
+        act_numbers = dict(zip(doc_ids, (self.act_number(title) for title in titles)))
+        buckets = [{} for _ in range(self.bands)]
+        for doc_id, signature in self.signatures.items():
+            parent[doc_id] = self.groups.get(doc_id, doc_id)
+            for band, key in enumerate(self.band_keys(signature, act_numbers[doc_id])):
+                buckets[band].setdefault(key, []).append(doc_id)
+        
+        # Solo i documenti nuovi vengono firmati e confrontati con i candidati dei propri bucket
+        new_docs = [(pos, doc_id) for pos, doc_id in enumerate(doc_ids) if doc_id not in self.signatures]
+        comparisons = 0
+        hash_cache = {}
+        for pos, doc_id in new_docs:
+            signature = self.signature(texts[pos], hash_cache)
+            if signature is None:
+                continue
+            checked = set()
+            for band, key in enumerate(self.band_keys(signature, act_numbers[doc_id])):
+                bucket = buckets[band].setdefault(key, [])
+                for other in bucket[-self.MAX_BUCKET_CANDIDATES:]:
+                    if other in checked:
+                        continue
+                    checked.add(other)
+                    comparisons += 1
+                    if find(other) != find(doc_id) and self.similarity(signature, self.signatures[other]) >= self.threshold:
+                        parent[find(doc_id)] = find(other)
+                bucket.append(doc_id)
+            self.signatures[doc_id] = signature
+        
+        # Documenti raggruppati; il canonico è quello della fonte più autorevole (a parità, il testo più lungo)
+        priority = {name: rank for rank, name in enumerate(source_priority)}
+        members = {}
+        for pos, doc_id in enumerate(doc_ids):
+            group = find(doc_id)
+            self.groups[doc_id] = group
+            members.setdefault(group, []).append(pos)
+        
+        keep, sources = [], []
+        for positions in members.values():
+            positions.sort(key=lambda pos: (priority.get(fonti[pos], len(priority)), -len(texts[pos] or '')))
+            keep.append(positions[0])
+            sources.append([{"fonte": fonti[pos], "url": urls[pos], "id": doc_ids[pos]} for pos in positions])
+        
+        order = np.argsort(keep, kind='stable')
+        merged_df = documents_df.iloc[[keep[i] for i in order]].reset_index(drop=True)
+        merged_df['fonti'] = [sources[i] for i in order]
+        
+        merged = len(documents_df) - len(merged_df)
+        metrics.inc("duplicates_merged_total", merged, help_text="Documenti uniti a un duplicato di un'altra fonte")
+        logger.info(f"Deduplicazione: {len(new_docs)} documenti nuovi, {comparisons} confronti, {merged} duplicati uniti")
+        return merged_df
+
+
+# Classe per l'archivio persistente dei documenti già elaborati
+class ProcessedStore:
+    """Archivio dei documenti elaborati, indicizzato per impronta del contenuto: in memoria restano solo le
+    posizioni dei record nei file (JSON Lines), i record sono letti dal disco un blocco alla volta"""
+    
+    def __init__(self, filename="normative_elaborate_cache.json"):
+        self.filename = filename
+        # Blocchi salvati durante l'esecuzione, prima del salvataggio completo dell'archivio
+        self.journal_filename = f"{filename}.journal"
+        # Impronta -> (file, posizione della riga)
+        self.locations = {}
+        # ID elaborati dopo l'ultimo salvataggio completo (ancora da pubblicare)
+        self.pending_ids = set()
+        # Termini dei documenti ripresi dal journal di un'esecuzione interrotta
+        self.recovered_terms = {}
+        self.load()
+    
+    def __len__(self):
+        return len(self.locations)
+    
+    def __contains__(self, fingerprint):
+        return fingerprint in self.locations
+    
+    @staticmethod
+    def scan(filename):
+        """Righe complete del file con la loro posizione; si ferma alla prima riga scritta a metà"""
+        with open(filename, 'rb') as f:
+            offset = 0
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                yield offset, entry
+                offset += len(line)
+    
+    def migrate(self):
+        """Converte l'archivio dal vecchio formato (un unico array JSON) a una riga per record"""
+        with open(self.filename, 'r', encoding='utf-8') as f:
+            if f.read(1) != '[':
+                return
+            f.seek(0)
+            records = json.load(f)
+        tmp_filename = f"{self.filename}.tmp"
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        os.replace(tmp_filename, self.filename)
+        logger.info(f"Archivio elaborazioni convertito in JSON Lines: {len(records)} documenti")
+    
+    def load(self):
+        """Indicizza l'archivio su disco, se presente, e il journal dell'eventuale esecuzione interrotta"""
+        loaded = False
+        if os.path.exists(self.filename):
+            try:
+                self.migrate()
+                for offset, record in self.scan(self.filename):
+                    self.locations[record['impronta']] = (self.filename, offset)
+                logger.info(f"Archivio elaborazioni caricato: {len(self.locations)} documenti")
+                loaded = True
+            except Exception as e:
+                logger.error(f"Errore durante il caricamento dell'archivio elaborazioni: {str(e)}")
+                self.locations = {}
+        
+        if os.path.exists(self.journal_filename):
+            recovered = 0
+            # Un'eventuale ultima riga scritta a metà viene ignorata: il blocco verrà rielaborato
+            for offset, entry in self.scan(self.journal_filename):
+                record = entry['record']
+                self.locations[record['impronta']] = (self.journal_filename, offset)
+                self.pending_ids.add(record['id'])
+                self.recovered_terms[record['id']] = entry.get('termini')
+                recovered += 1
+            logger.info(f"Ripresa dell'esecuzione interrotta: {recovered} documenti già elaborati")
+            loaded = True
+        return loaded
+    
+    def save(self):
+        """Riscrive l'archivio su disco in modo atomico, un record alla volta; il journal non serve più"""
+        tmp_filename = f"{self.filename}.tmp"
+        locations = {}
+        with open(tmp_filename, 'wb') as f:
+            for fingerprints in self.batches(list(self.locations)):
+                for record in self.get_records(fingerprints):
+                    locations[record['impronta']] = (self.filename, f.tell())
+                    f.write((json.dumps(record, ensure_ascii=False, default=str) + '\n').encode('utf-8'))
+        os.replace(tmp_filename, self.filename)
+        if os.path.exists(self.journal_filename):
+            os.remove(self.journal_filename)
+        self.locations = locations
+        self.pending_ids.clear()
+        self.recovered_terms = {}
+    
+    def checkpoint(self, processed_df):
+        """Aggiunge un blocco elaborato al journal su disco; restituisce i termini per ID"""
+        terms = {}
+        with open(self.journal_filename, 'ab') as f:
+            for record in processed_df.to_dict('records'):
+                # I termini servono solo al modello TF-IDF: restano nel journal, non nell'archivio
+                terms[record['id']] = record.pop('termini', None)
+                self.locations[record['impronta']] = (self.journal_filename, f.tell())
+                self.pending_ids.add(record['id'])
+                entry = {'record': record, 'termini': terms[record['id']]}
+                f.write((json.dumps(entry, ensure_ascii=False, default=str) + '\n').encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        return terms
+    
+    def split(self, documents_df):
+        """Separa i documenti già elaborati da quelli nuovi o modificati"""
+        known = documents_df['impronta'].isin(self.locations.keys())
+        return documents_df[known], documents_df[~known]
+    
+    def prune(self, fingerprints):
+        """Rimuove i documenti non più presenti nelle fonti"""
+        keep = set(fingerprints)
+        self.locations = {fp: location for fp, location in self.locations.items() if fp in keep}
+    
+    @staticmethod
+    def batches(items, size=1000):
+        """Divide una lista in blocchi consecutivi"""
+        return (items[start:start + size] for start in range(0, len(items), size))
+    
+    def get_records(self, fingerprints):
+        """Legge dal disco i documenti elaborati, nell'ordine delle impronte richieste"""
+        records = []
+        files = {}
+        try:
+            for fp in fingerprints:
+                location = self.locations.get(fp)
+                if location is None:
+                    continue
+                filename, offset = location
+                if filename not in files:
+                    files[filename] = open(filename, 'rb')
+                f = files[filename]
+                f.seek(offset)
+                entry = json.loads(f.readline())
+                # Le righe del journal contengono anche i termini
+                records.append(entry['record'] if filename == self.journal_filename else entry)
+        finally:
+            for f in files.values():
+                f.close()
+        return records
+
+
+# Classe per i profili iscritti alle notifiche
+class SubscriptionIndex:
+    """Profili indicizzati al contrario: da categoria, settore e parola chiave agli ID dei profili"""
+    
+    # Termini che segnalano un documento di interesse per ogni settore del profilo
+    SECTOR_TERMS = {
+        'tecnologia': ['tecnologia', 'tecnologiche', 'tecnologici', 'digitale', 'digitalizzazione', 'innovazione', 'startup', 'software'],
+        'manifattura': ['manifattura', 'manifatturiero', 'industria', 'industriale', 'produzione', 'macchinari'],
+        'servizi': ['servizi', 'consulenza', 'professionisti'],
+        'commercio': ['commercio', 'commerciali', 'vendita', 'negozi', 'ecommerce'],
+        'agricoltura': ['agricoltura', 'agricole', 'agricolo', 'agroalimentare', 'rurale'],
+        'edilizia': ['edilizia', 'costruzioni', 'ristrutturazione', 'immobili'],
+        'turismo': ['turismo', 'turistiche', 'ricettive', 'alberghiere', 'ristorazione'],
+        'sanita': ['sanita', 'sanitario', 'sanitarie', 'salute', 'farmaceutico']
+    }
+    # Le parole chiave dei profili possono contenere fino a tre parole ("credito d'imposta")
+    MAX_KEYWORD_WORDS = 3
+    # Documenti conservati per ogni digest in attesa di invio
+    MAX_DIGEST_ITEMS = 50
+    
+    def __init__(self, filename="profili_notifiche.jsonl"):
+        self.filename = filename
+        self.profiles = {}
+        # (tipo, valore) -> ID dei profili iscritti
+        self.postings = {}
+        self.sector_by_term = {
+            self.normalize(term): sector for sector, terms in self.SECTOR_TERMS.items() for term in terms
+        }
+        # Digest in attesa per ogni profilo (ID dei documenti) e documenti citati, con i profili per motivo;
+        # ricostruiti da un secondo registro in sola aggiunta, così sopravvivono ai riavvii e sono gli stessi
+        # in tutti i processi senza riscrivere i digest degli altri profili a ogni lettura o consegna
+        self.digests_filename = f"{filename}.digest.jsonl" if filename else None
+        self.pending = {}
+        self.digest_documents = {}
+        # Numero di digest che citano ogni documento: a zero il documento viene rimosso
+        self.digest_refs = {}
+        # Registri letti fino a (inode, posizione): le righe scritte da altri processi si leggono in coda
+        self.log_state = (None, 0)
+        self.log_entries = 0
+        self.digest_log_state = (None, 0)
+        self.digest_log_entries = 0
+        self._lock = threading.RLock()
+        self.load()
+    
+    @staticmethod
+    def normalize(text):
+        return SuggestIndex.normalize(text).strip()
+    
+    @staticmethod
+    def profile_id(email):
+        """ID stabile del profilo, derivato dall'email"""
+        return hashlib.sha1(email.strip().lower().encode('utf-8')).hexdigest()[:16]
+    
+    def profile_features(self, profile):
+        """Chiavi dell'indice invertito a cui è iscritto il profilo"""
+        interests, keywords = profile.get('interessi') or [], profile.get('parole_chiave') or []
+        features = {
+            ('categoria', category)
+            for category in ([interests] if isinstance(interests, str) else interests) if isinstance(category, str)
+        }
+        sector = self.normalize(profile.get('settore') or '')
+        if sector in self.SECTOR_TERMS:
+            features.add(('settore', sector))
+        for keyword in [keywords] if isinstance(keywords, str) else keywords:
+            keyword = self.normalize(keyword) if isinstance(keyword, str) else ''
+            if keyword and len(keyword.split()) <= self.MAX_KEYWORD_WORDS:
+                features.add(('parola', keyword))
+        return features
+    
+    def document_features(self, document):
+        """Chiavi dell'indice toccate da un documento: categoria, settori e n-grammi di titolo e parole chiave"""
+        texts = [document.get('titolo')]
+        keywords = document.get('parole_chiave')
+        if isinstance(keywords, (list, tuple, np.ndarray)):
+            texts.extend(keywords)
+        
+        terms = set()
+        for text in texts:
+            words = self.normalize(text).split() if isinstance(text, str) else []
+            for size in range(1, self.MAX_KEYWORD_WORDS + 1):
+                for start in range(len(words) - size + 1):
+                    terms.add(' '.join(words[start:start + size]))
+        
+        features = {('categoria', document.get('categoria'))}
+        features.update(('parola', term) for term in terms)
+        features.update(('settore', self.sector_by_term[term]) for term in terms if term in self.sector_by_term)
+        return features
+    
+    def index_profile(self, profile):
+        for feature in self.profile_features(profile):
+            self.postings.setdefault(feature, set()).add(profile['id'])
+    
+    def unindex_profile(self, profile):
+        for feature in self.profile_features(profile):
+            subscribers = self.postings.get(feature)
+            if subscribers is not None:
+                subscribers.discard(profile['id'])
+                if not subscribers:
+                    del self.postings[feature]
+    
+    def load(self):
+        """Ricostruisce profili e indice dal registro su disco (l'ultima scrittura vince) e i digest in attesa"""
+        if not self.filename or not os.path.exists(self.filename):
+            return False
+        
+        try:
+            with self._lock:
+                self.read_log()
+                self.read_digest_log()
+            logger.info(f"Profili caricati: {len(self.profiles)}, digest in attesa: {len(self.pending)}")
+            
+            # Registri con molte versioni superate: vengono riscritti compatti
+            if self.log_entries > 2 * len(self.profiles) + 1000:
+                self.compact()
+            with self.shared_state():
+                self.compact_digests_if_needed()
+            return True
+        except Exception as e:
+            logger.error(f"Errore durante il caricamento dei profili: {str(e)}")
+            return False
+    
+    @staticmethod
+    def read_new_entries(filename, state):
+        """Righe complete aggiunte a un registro dopo lo stato (inode, posizione) già letto; restituisce
+        le righe, il nuovo stato e se il file è stato sostituito (da rileggere da capo)"""
+        stat = os.stat(filename)
+        inode, offset = state
+        replaced = stat.st_ino != inode or stat.st_size < offset
+        if replaced:
+            offset = 0
+        elif stat.st_size == offset:
+            return [], state, False
+        
+        entries = []
+        with open(filename, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                # Una riga senza a capo è ancora in scrittura: verrà letta la volta successiva
+                if not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                if line.strip():
+                    entries.append(json.loads(line))
+        return entries, (stat.st_ino, offset), replaced
+    
+    @staticmethod
+    def append_entry(filename, entry, state):
+        """Aggiunge una riga al registro, già letto fino in fondo; restituisce il nuovo stato"""
+        line = (json.dumps(entry, ensure_ascii=False, default=str) + '\n').encode('utf-8')
+        with open(filename, 'ab') as f:
+            f.write(line)
+        # La riga appena scritta non va riletta
+        return os.stat(filename).st_ino, state[1] + len(line)
+    
+    def apply_log_entry(self, entry):
+        """Applica a profili e indice una riga del registro"""
+        if entry.get('profilo'):
+            profile = entry['profilo']
+            previous = self.profiles.get(profile['id'])
+            if previous is not None:
+                self.unindex_profile(previous)
+            self.profiles[profile['id']] = profile
+            self.index_profile(profile)
+        else:
+            previous = self.profiles.pop(entry.get('rimosso'), None)
+            if previous is not None:
+                self.unindex_profile(previous)
+    
+    def read_log(self):
+        """Applica le righe del registro non ancora lette, comprese quelle scritte da altri processi"""
+        if not self.filename or not os.path.exists(self.filename):
+            return 0
+        
+        entries, self.log_state, replaced = self.read_new_entries(self.filename, self.log_state)
+        if replaced:
+            # Registro nuovo o compattato da un altro processo: si riparte da capo
+            self.profiles, self.postings, self.log_entries = {}, {}, 0
+        for entry in entries:
+            self.apply_log_entry(entry)
+        self.log_entries += len(entries)
+        return len(entries)
+    
+    def write_log(self, entry):
+        """Applica una modifica e la aggiunge al registro: salvare un profilo non riscrive gli altri"""
+        self.apply_log_entry(entry)
+        if not self.filename:
+            return
+        self.log_state = self.append_entry(self.filename, entry, self.log_state)
+        self.log_entries += 1
+    
+    def enqueue(self, profile_id, doc_id):
+        """Aggiunge un documento al digest del profilo, se non c'è già"""
+        digest = self.pending.get(profile_id)
+        if digest is None:
+            digest = self.pending[profile_id] = deque(maxlen=self.MAX_DIGEST_ITEMS)
+        elif doc_id in digest:
+            return False
+        # Digest troppo lunghi: restano i documenti più recenti
+        if len(digest) == digest.maxlen:
+            self.release_documents([digest[0]])
+        digest.append(doc_id)
+        self.digest_refs[doc_id] = self.digest_refs.get(doc_id, 0) + 1
+        return True
+    
+    def apply_digest_entry(self, entry):
+        """Applica ai digest in attesa una riga del registro dei digest"""
+        if 'svuotato' in entry:
+            doc_ids = self.pending.pop(entry['svuotato'], None)
+            if doc_ids:
+                self.release_documents(doc_ids)
+        elif 'in_attesa' in entry:
+            # Riga scritta dalla compattazione: il digest completo di un profilo
+            for doc_id in entry['documenti']:
+                self.enqueue(entry['in_attesa'], doc_id)
+        else:
+            # Documento salvato una volta sola con i profili per motivo; i digest contengono solo l'ID
+            summary = entry['documento']
+            by_reason = {reason: set(ids) for reason, ids in entry['motivi'].items()}
+            self.digest_documents[summary['id']] = (summary, by_reason)
+            if entry.get('accoda', True):
+                for profile_id in set().union(*by_reason.values()):
+                    self.enqueue(profile_id, summary['id'])
+    
+    def read_digest_log(self):
+        """Applica le righe del registro dei digest non ancora lette, comprese quelle di altri processi"""
+        if not self.digests_filename or not os.path.exists(self.digests_filename):
+            return 0
+        
+        entries, self.digest_log_state, replaced = self.read_new_entries(self.digests_filename, self.digest_log_state)
+        if replaced:
+            self.pending, self.digest_documents, self.digest_refs, self.digest_log_entries = {}, {}, {}, 0
+        for entry in entries:
+            self.apply_digest_entry(entry)
+        self.digest_log_entries += len(entries)
+        return len(entries)
+    
+    def write_digest_log(self, entry):
+        """Applica una modifica ai digest e la aggiunge al registro: costo indipendente dal numero di profili"""
+        self.apply_digest_entry(entry)
+        if not self.digests_filename:
+            return
+        self.digest_log_state = self.append_entry(self.digests_filename, entry, self.digest_log_state)
+        self.digest_log_entries += 1
+    
+    @contextlib.contextmanager
+    def shared_state(self):
+        """Accesso esclusivo (tra thread e tra processi) a profili e digest, aggiornati con le righe nuove dei registri"""
+        with self._lock, file_lock(f"{self.filename}.lock" if self.filename else None):
+            self.read_log()
+            self.read_digest_log()
+            yield
+    
+    def compact(self):
+        """Riscrive il registro con la sola versione corrente di ogni profilo, in modo atomico"""
+        if not self.filename:
+            return
+        with self.shared_state():
+            tmp_filename = f"{self.filename}.tmp"
+            with open(tmp_filename, 'w', encoding='utf-8') as f:
+                for profile in self.profiles.values():
+                    f.write(json.dumps({'profilo': profile}, ensure_ascii=False) + '\n')
+            os.replace(tmp_filename, self.filename)
+            stat = os.stat(self.filename)
+            self.log_state = (stat.st_ino, stat.st_size)
+            self.log_entries = len(self.profiles)
+    
+    def compact_digests(self):
+        """Riscrive il registro dei digest con il solo stato corrente, in modo atomico (con shared_state già acquisito)"""
+        if not self.digests_filename:
+            return
+        tmp_filename = f"{self.digests_filename}.tmp"
+        entries = 0
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            for summary, by_reason in self.digest_documents.values():
+                entry = {'documento': summary, 'motivi': {reason: sorted(ids) for reason, ids in by_reason.items()}, 'accoda': False}
+                f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+                entries += 1
+            for profile_id, doc_ids in self.pending.items():
+                f.write(json.dumps({'in_attesa': profile_id, 'documenti': list(doc_ids)}, ensure_ascii=False) + '\n')
+                entries += 1
+        os.replace(tmp_filename, self.digests_filename)
+        stat = os.stat(self.digests_filename)
+        self.digest_log_state = (stat.st_ino, stat.st_size)
+        self.digest_log_entries = entries
+    
+    def compact_digests_if_needed(self):
+        """Compatta il registro dei digest quando le righe superate sono la maggioranza"""
+        if self.digest_log_entries > 2 * (len(self.pending) + len(self.digest_documents)) + 1000:
+            self.compact_digests()
+    
+    def save_profile(self, profile):
+        """Salva (o aggiorna) un profilo e ne aggiorna le iscrizioni; restituisce l'ID"""
+        profile = {**profile, 'id': self.profile_id(profile['email'])}
+        with self.shared_state():
+            self.write_log({'profilo': profile})
+        return profile['id']
+    
+    def remove_profile(self, profile_id):
+        """Elimina un profilo e le sue notifiche in attesa"""
+        with self.shared_state():
+            if profile_id not in self.profiles:
+                return False
+            self.write_log({'rimosso': profile_id})
+            if profile_id in self.pending:
+                self.write_digest_log({'svuotato': profile_id})
+                self.compact_digests_if_needed()
+        return True
+    
+    def match(self, documents_df):
+        """Per ogni documento, i profili interessati divisi per motivo (categoria, settore, parola)"""
+        matches = {}
+        with self._lock:
+            for document in documents_df.to_dict('records'):
+                by_reason = {}
+                for reason, value in self.document_features(document):
+                    subscribers = self.postings.get((reason, value))
+                    if subscribers:
+                        by_reason.setdefault(reason, []).append(subscribers)
+                # Unioni di insiemi: il costo dipende dalle corrispondenze, non dal numero di profili
+                matches[document['id']] = (document, {
+                    reason: set().union(*subscriber_sets) for reason, subscriber_sets in by_reason.items()
+                })
+        return matches
+    
+    def release_documents(self, doc_ids):
+        """Toglie un riferimento ai documenti: quelli non più in alcun digest vengono rimossi"""
+        for doc_id in doc_ids:
+            refs = self.digest_refs.get(doc_id, 0) - 1
+            if refs > 0:
+                self.digest_refs[doc_id] = refs
+            else:
+                self.digest_refs.pop(doc_id, None)
+                self.digest_documents.pop(doc_id, None)
+    
+    def queue_digests(self, documents_df):
+        """Accoda i documenti nuovi nei digest dei profili interessati; restituisce il numero di profili"""
+        notified = set()
+        with self.shared_state():
+            for doc_id, (document, by_reason) in self.match(documents_df).items():
+                subscribers = set().union(*by_reason.values())
+                if not subscribers:
+                    continue
+                summary = {
+                    "id": doc_id,
+                    "titolo": document.get('titolo'),
+                    "categoria": document.get('categoria'),
+                    "data": document.get('data'),
+                    "url": document.get('url')
+                }
+                # Una riga per documento: i processi che la leggono accodano il documento agli stessi profili
+                self.write_digest_log({
+                    'documento': summary, 'motivi': {reason: sorted(ids) for reason, ids in by_reason.items()}
+                })
+                notified |= subscribers
+            self.compact_digests_if_needed()
+        return len(notified)
+    
+    @staticmethod
+    def render_digest(profile_id, doc_ids, documents):
+        """Documenti del digest con i motivi della corrispondenza per il profilo"""
+        digest = []
+        for doc_id in doc_ids:
+            summary, by_reason = documents[doc_id]
+            digest.append({**summary, "motivi": sorted(reason for reason, ids in by_reason.items() if profile_id in ids)})
+        return digest
+    
+    def get_digest(self, profile_id):
+        """Documenti in attesa per un profilo (None se il profilo non esiste)"""
+        with self.shared_state():
+            if profile_id not in self.profiles:
+                return None
+            return self.render_digest(profile_id, self.pending.get(profile_id, ()), self.digest_documents)
+    
+    def pop_digest(self, profile_id):
+        """Documenti in attesa per un profilo, rimossi dalla coda (None se il profilo non esiste)"""
+        with self.shared_state():
+            if profile_id not in self.profiles:
+                return None
+            doc_ids = self.pending.get(profile_id, ())
+            digest = self.render_digest(profile_id, doc_ids, self.digest_documents)
+            if doc_ids:
+                self.write_digest_log({'svuotato': profile_id})
+                self.compact_digests_if_needed()
+            return digest
+    
+    def get_stats(self):
+        return {
+            "profiles": len(self.profiles),
+            "index_keys": len(self.postings),
+            "pending_digests": len(self.pending),
+            "digest_documents": len(self.digest_documents)
+        }
+
+
+# Elaborazione dei testi inviati dagli utenti, eseguita nei processi del pool
+_analysis_processor = None
+
+
+def init_analysis_worker():
+    """Inizializza il processo: il modello spaCy resta caricato per tutte le richieste"""
+    global _analysis_processor
+    nlp.load()
+    _analysis_processor = NormativeAIProcessor()
+
+
+def analyze_text_worker(text):
+    """Analizza un testo normativo (eseguita in un processo del pool)"""
+    processor = _analysis_processor or NormativeAIProcessor()
+    with nlp.select_pipes(disable=processor.get_disabled_components()):
+        spacy_doc = nlp(text)
+    
+    keywords = processor.extract_keywords(processor.extract_terms(spacy_doc))
+    return {
+        "riassunto": processor.summarize_text(text, keywords),
+        "testo_semplificato": processor.simplify_text(text),
+        "parole_chiave": keywords
+    }
+
+
+class AnalysisQueueFull(Exception):
+    """La coda delle analisi ha raggiunto la profondità massima"""
+
+
+# Classe per il pool di analisi dei testi
+class AnalysisPool:
+    """Pool di processi limitato, con coda a profondità massima e cache dei risultati"""
+    
+    def __init__(self, max_workers=2, max_pending=8, cache_size=1000, cache_ttl=24 * 3600):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.cache = ResponseCache(None, ttl=cache_ttl, max_entries=cache_size)
+        self.executor = None
+        self.pending = {}
+        self.jobs = ResponseCache(None, ttl=cache_ttl, max_entries=cache_size)
+        self._lock = threading.RLock()
+    
+    @staticmethod
+    def text_hash(text):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    def get_executor(self):
+        """Avvia i processi al primo utilizzo ("spawn": il server ha già thread attivi)"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_analysis_worker
+            )
+        return self.executor
+    
+    def submit(self, text, job=False):
+        """Accoda l'analisi; restituisce (chiave, future) o solleva AnalysisQueueFull (job: registra l'esito per ID)"""
+        key = self.text_hash(text)
+        with self._lock:
+            # Lo stesso testo già in coda non viene elaborato due volte
+            if key in self.pending:
+                if job:
+                    self.jobs.set(key, ("pending", None))
+                return key, self.pending[key]
+            if len(self.pending) >= self.max_pending:
+                raise AnalysisQueueFull()
+            
+            executor = self.get_executor()
+            try:
+                future = executor.submit(analyze_text_worker, text)
+            except BrokenProcessPool:
+                # Un processo è terminato in modo anomalo (ad es. memoria esaurita): nuovo pool
+                self.reset_executor(executor)
+                executor = self.get_executor()
+                future = executor.submit(analyze_text_worker, text)
+            self.pending[key] = future
+            # Il job viene registrato solo se l'invio è riuscito
+            if job:
+                self.jobs.set(key, ("pending", None))
+        
+        future.add_done_callback(lambda f: self.on_done(key, f, executor))
+        return key, future
+    
+    def reset_executor(self, executor):
+        """Scarta il pool guasto (se è ancora quello corrente); il successivo verrà creato al primo utilizzo"""
+        if self.executor is executor:
+            self.executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+            logger.error("Pool di analisi guasto: verrà ricreato")
+    
+    def on_done(self, key, future, executor=None):
+        # Prima l'esito, poi la rimozione dalla coda: chi interroga il job non vede mai uno stato intermedio
+        if future.cancelled():
+            outcome = ("failed", None)
+        elif future.exception() is not None:
+            outcome = ("failed", None)
+            if isinstance(future.exception(), BrokenProcessPool):
+                with self._lock:
+                    self.reset_executor(executor)
+        else:
+            outcome = ("done", future.result())
+            self.cache.set(key, outcome[1])
+        if self.jobs.get(key) is not None:
+            self.jobs.set(key, outcome)
+        
+        with self._lock:
+            self.pending.pop(key, None)
+    
+    def analyze(self, text, timeout=30):
+        """Analisi sincrona: risultato dalla cache o dal pool, entro il timeout"""
+        cached = self.cache.get(self.text_hash(text))
+        if cached is not None:
+            return cached
+        
+        _, future = self.submit(text)
+        return future.result(timeout=timeout)
+    
+    def submit_job(self, text):
+        """Analisi asincrona: restituisce l'ID del job da interrogare in seguito"""
+        key = self.text_hash(text)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.jobs.set(key, ("done", cached))
+            return key
+        self.submit(text, job=True)
+        return key
+    
+    def get_job(self, job_id):
+        """Stato di un job: (stato, risultato)"""
+        result = self.cache.get(job_id)
+        if result is not None:
+            return "done", result
+        
+        outcome = self.jobs.get(job_id)
+        if outcome is None:
+            return None, None
+        if outcome[0] != "pending":
+            return outcome
+        
+        with self._lock:
+            if job_id in self.pending:
+                return "pending", None
+        
+        # Completato nel frattempo: l'esito è già registrato (o il risultato è in cache)
+        result = self.cache.get(job_id)
+        if result is not None:
+            return "done", result
+        outcome = self.jobs.get(job_id)
+        return outcome if outcome[0] != "pending" else ("failed", None)
+    
+    def get_stats(self):
+        return {
+            "workers": self.max_workers,
+            "pending": len(self.pending),
+            "max_pending": self.max_pending,
+            "cache": self.cache.get_stats()
+        }
+    
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Classe per un documento servito dall'API
+class StoredDocument:
+    """Documento in sola lettura con attributi a slot: nessun oggetto pandas sul percorso delle richieste"""
+    
+    # Campi serviti dall'API (il testo integrale resta negli archivi su disco)
+    FIELDS = (
+        'id', 'titolo', 'categoria', 'fonte', 'tipo_fonte', 'data', 'url', 'riassunto', 'testo_semplificato',
+        'caso_pratico', 'parole_chiave', 'video_correlati', 'articoli_correlati', 'fonti'
+    )
+    __slots__ = FIELDS
+    
+    def __init__(self, *values):
+        for name, value in zip(self.FIELDS, values):
+            object.__setattr__(self, name, value)
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("I documenti pubblicati sono in sola lettura")
+    
+    # Accesso per chiave, come per i record dei DataFrame
+    def __getitem__(self, name):
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name)
+    
+    def get(self, name, default=None):
+        return getattr(self, name, default)
+
+
+# Classe per l'archivio in memoria dei documenti serviti
+class DocumentStore:
+    """Documenti del corpus servito, costruiti una volta dal DataFrame e poi solo letti"""
+    
+    # Valori ripetuti su molti documenti: una sola copia della stringa
+    INTERNED_FIELDS = ('categoria', 'fonte', 'tipo_fonte')
+    # Campi lista, conservati come tuple immutabili
+    LIST_FIELDS = ('parole_chiave', 'video_correlati', 'articoli_correlati', 'fonti')
+    
+    def __init__(self, documents_df=None):
+        self.documents = ()
+        self.positions = {}
+        if documents_df is not None:
+            self.build(documents_df)
+    
+    @classmethod
+    def normalize(cls, field, value):
+        """Valore Python di un campo, normalizzato (stringa vuota o tupla al posto dei valori mancanti)"""
+        if field in cls.LIST_FIELDS:
+            return tuple(value) if isinstance(value, (list, tuple, np.ndarray)) else ()
+        if field in cls.INTERNED_FIELDS:
+            return sys.intern(value) if isinstance(value, str) else ''
+        if isinstance(value, str):
+            return value
+        return '' if value is None or pd.isna(value) else str(value)
+    
+    def column(self, documents_df, field):
+        """Valori normalizzati di un campo"""
+        values = documents_df[field].tolist() if field in documents_df else [None] * len(documents_df)
+        return [self.normalize(field, value) for value in values]
+    
+    def build(self, documents_df):
+        columns = [self.column(documents_df, field) for field in StoredDocument.FIELDS]
+        self.documents = tuple(StoredDocument(*values) for values in zip(*columns))
+        self.positions = {document.id: pos for pos, document in enumerate(self.documents)}
+    
+    def __len__(self):
+        return len(self.documents)
+    
+    def __getitem__(self, pos):
+        return self.documents[pos]
+    
+    def get(self, doc_id):
+        """Documento con l'ID indicato, o None"""
+        pos = self.positions.get(doc_id)
+        return self.documents[pos] if pos is not None else None
+
+
+# Classe per i documenti serviti direttamente dallo snapshot colonnare
+class ArrowDocumentStore:
+    """Documenti letti su richiesta dalle colonne Arrow mappate in memoria: le pagine restano condivise tra i processi"""
+    
+    def __init__(self, table):
+        # Tabella mappata: i campi non vengono copiati nella memoria privata del processo
+        self.table = table
+        # Lo snapshot è scritto a blocchi: i blocchi restano separati (unirli li copierebbe in memoria)
+        self.columns = {
+            field: table.column(field).chunks for field in StoredDocument.FIELDS if field in table.column_names
+        }
+        # Posizione iniziale di ogni blocco (uguale per tutte le colonne)
+        self.offsets = np.cumsum([0] + [len(chunk) for chunk in self.columns.get('id', [])])[:-1].tolist()
+        # Solo gli ID sono materializzati, per la ricerca per ID
+        ids = table.column('id').to_pylist() if 'id' in self.columns else []
+        self.positions = {doc_id: pos for pos, doc_id in enumerate(ids)}
+    
+    def __len__(self):
+        return self.table.num_rows
+    
+    def __getitem__(self, pos):
+        if pos < 0:
+            pos += len(self)
+        if not 0 <= pos < len(self):
+            raise IndexError(pos)
+        
+        chunk = bisect.bisect_right(self.offsets, pos) - 1
+        pos -= self.offsets[chunk]
+        # Stessa normalizzazione dell'archivio in memoria, campo per campo
+        return StoredDocument(*(
+            DocumentStore.normalize(field, self.columns[field][chunk][pos].as_py() if field in self.columns else None)
+            for field in StoredDocument.FIELDS
+        ))
+    
+    def get(self, doc_id):
+        """Documento con l'ID indicato, o None"""
+        pos = self.positions.get(doc_id)
+        return self[pos] if pos is not None else None
+
+
+# Classe per una generazione del corpus servito
+class ServedCorpus:
+    """Documenti serviti e indici derivati: dopo la pubblicazione non vengono più modificati"""
+    
+    def __init__(self, store=None, search_index=None, latest_index=None, semantic_index=None,
+                 suggest_index=None, facet_index=None, generation=0, table=None, snapshot_time=None):
+        self.store = store
+        self.search_index = search_index
+        self.facet_index = facet_index
+        self.latest_index = latest_index
+        self.semantic_index = semantic_index
+        self.suggest_index = suggest_index
+        self.generation = generation
+        # Tabella Arrow da cui provengono i documenti (mantiene valida la memory map)
+        self.table = table
+        self.snapshot_time = snapshot_time
+    
+    @property
+    def doc_index(self):
+        return self.store.positions if self.store is not None else {}
+    
+    def is_ready(self):
+        return self.store is not None and self.search_index is not None
+
+
+# Classe per l'esecuzione a flusso del pipeline
+class StreamingPipeline:
+    """Stadi in thread separati collegati da code limitate: in memoria restano pochi blocchi alla volta"""
+    
+    DONE = object()
+    
+    def __init__(self, stages, queue_size=2):
+        # Lista di (nome, funzione(blocco, stadio) -> blocco o None per scartarlo)
+        self.stages = stages
+        self.queue_size = queue_size
+        self.error = None
+        # Gli stadi con indice inferiore si fermano (a monte di un errore, o tutti se il consumatore esce)
+        self.cutoff = 0
+        self.totals = {name: {'documents': 0, 'failures': 0, 'wall': 0.0, 'cpu': 0.0} for name, _ in stages}
+    
+    def put(self, target, item, index):
+        while index >= self.cutoff:
+            try:
+                target.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def get(self, source, index):
+        while index >= self.cutoff:
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return self.DONE
+    
+    def fail(self, index, error):
+        """Ferma gli stadi a monte; quelli a valle completano i blocchi già ricevuti"""
+        if self.error is None:
+            self.error = error
+        self.cutoff = max(self.cutoff, index)
+    
+    def feed(self, chunks, target):
+        try:
+            for chunk in chunks:
+                if not self.put(target, chunk, 0):
+                    return
+        except Exception as e:
+            self.fail(0, e)
+        self.put(target, self.DONE, 0)
+    
+    def work(self, index, name, func, source, target):
+        totals = self.totals[name]
+        while True:
+            chunk = self.get(source, index)
+            if chunk is self.DONE:
+                break
+            
+            wall_start, cpu_start = time.perf_counter(), time.thread_time()
+            try:
+                totals['documents'] += len(chunk)
+                result = func(chunk, totals)
+            except Exception as e:
+                totals['failures'] += len(chunk)
+                logger.error(f"Errore nello stadio {name}: {str(e)}")
+                self.fail(index, e)
+                break
+            finally:
+                totals['wall'] += time.perf_counter() - wall_start
+                totals['cpu'] += time.thread_time() - cpu_start
+            
+            if result is not None and len(result) and not self.put(target, result, index):
+                break
+        self.put(target, self.DONE, index)
+    
+    def run(self, chunks):
+        """Esegue tutti i blocchi e restituisce i risultati dell'ultimo stadio; rilancia il primo errore"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads = [threading.Thread(target=self.feed, args=(chunks, queues[0]), name="pipeline-feed", daemon=True)]
+        for index, ((name, func), source, target) in enumerate(zip(self.stages, queues, queues[1:]), start=1):
+            threads.append(threading.Thread(
+                target=self.work, args=(index, name, func, source, target), name=f"pipeline-{name}", daemon=True
+            ))
+        for thread in threads:
+            thread.start()
+        
+        results = []
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is self.DONE:
+                    break
+                results.append(item)
+        finally:
+            self.cutoff = len(self.stages) + 1
+            for thread in threads:
+                thread.join()
+            for name, totals in self.totals.items():
+                metrics.record_stage(name, totals['wall'], totals['cpu'], totals['documents'], totals['failures'])
+        
+        if self.error is not None:
+            raise self.error
+        return results
+
+
+# Classe principale per il sistema
+class NormativeSystem:
+    def __init__(self, youtube_api_key=None, nlp_batch_size=64, nlp_processes=1,
+                 processed_store_file="normative_elaborate_cache.json",
+                 snapshot_file="normative_elaborate.arrow", category_names=None,
+                 subscriptions_file="profili_notifiche.jsonl", chunk_size=500, queue_size=2):
+        self.fetcher = HttpFetcher()
+        self.scraper = NormativeScraper(fetcher=self.fetcher)
+        self.ai_processor = NormativeAIProcessor()
+        self.youtube_integrator = YouTubeIntegrator(youtube_api_key) if youtube_api_key else None
+        self.news_integrator = NewsIntegrator(fetcher=self.fetcher)
+        self.processed_store = ProcessedStore(processed_store_file)
+        self.deduplicator = DuplicateDetector()
+        self.keyword_model = KeywordModel()
+        self.subscriptions = SubscriptionIndex(subscriptions_file)
+        self.database = None
+        # Corpus servito: sostituito in blocco con un solo assegnamento, mai modificato sul posto
+        self.corpus = ServedCorpus()
+        self.nlp_batch_size = nlp_batch_size
+        self.nlp_processes = nlp_processes
+        # Documenti per blocco e blocchi in attesa tra due stadi: limitano la memoria del pipeline
+        self.chunk_size = chunk_size
+        self.queue_size = queue_size
+        # Nomi leggibili delle categorie, usati nei suggerimenti
+        self.category_names = category_names or {}
+        
+        # Stato di caricamento, esposto dagli endpoint di health check
+        self.snapshot_file = snapshot_file
+        self.refreshing = False
+        # Avanzamento del caricamento dello snapshot in corso (None: nessun caricamento)
+        self.loading = None
+        self.last_error = None
+        self.last_refresh = None
+        self.refresh_interval = None
+        self._refresh_lock = threading.Lock()
+        # Un solo processo (quello che tiene il lock su file) esegue il pipeline e scrive
+        # cache e snapshot; gli altri ricaricano lo snapshot pubblicato quando cambia
+        self.refresher_lock_file = f"{snapshot_file}.refresh.lock"
+        self._refresher_lock = None
+        self._refresher_guard = threading.Lock()
+        self._scheduler = None
+        self._scheduler_stop = threading.Event()
+    
+    # Accesso in sola lettura alla generazione corrente
+    @property
+    def documents(self):
+        """Archivio dei documenti serviti della generazione corrente"""
+        return self.corpus.store
+    
+    @property
+    def doc_index(self):
+        return self.corpus.doc_index
+    
+    @property
+    def generation(self):
+        """Incrementata a ogni pubblicazione di un nuovo corpus (usata per invalidare le cache)"""
+        return self.corpus.generation
+    
+    @property
+    def snapshot_time(self):
+        return self.corpus.snapshot_time
+    
+    def run_full_pipeline(self, use_cached=False, incremental=True):
+        """Esegue l'intero pipeline di elaborazione; restituisce le colonne indicizzate del corpus servito"""
+        pipeline_start = time.perf_counter()
+        
+        # 1. Scraping
+        with metrics.stage("scraping") as stage:
+            if use_cached and self.scraper.load_from_json():
+                logger.info("Utilizzando dati di scraping precedentemente salvati")
+                self.database = self.scraper.assign_document_ids()
+            else:
+                logger.info("Avvio scraping delle fonti...")
+                self.database = self.scraper.scrape_all_sources()
+                self.scraper.save_to_json()
+            stage['documents'] = len(self.database)
+        
+        # Solo i documenti nuovi o modificati passano per le fasi successive
+        self.database = self.scraper.assign_fingerprints()
+        self.database = self.scraper.assign_dates()
+        
+        # Quasi duplicati tra fonti diverse: elaborati una sola volta, come documento canonico con tutte le fonti
+        with metrics.stage("dedup", documents=len(self.database)):
+            self.database = self.deduplicator.merge(self.database, [source['name'] for source in self.scraper.sources])
+            self.deduplicator.save()
+        sources_by_id = dict(zip(self.database['id'], self.database['fonti'])) if len(self.database) else {}
+        if incremental:
+            cached_docs, new_docs = self.processed_store.split(self.database)
+        else:
+            cached_docs, new_docs = self.database.iloc[0:0], self.database
+        logger.info(f"Documenti da elaborare: {len(new_docs)} (riutilizzati: {len(cached_docs)})")
+        
+        metrics.set("documents_reused", len(cached_docs), help_text="Documenti riutilizzati dall'ultima esecuzione")
+        
+        # Articoli recuperati una sola volta per esecuzione, poi abbinati all'intero corpus
+        with metrics.stage("news_fetch") as stage:
+            errors = self.news_integrator.errors
+            articles = self.news_integrator.fetch_categorized_articles(self.database['categoria'].unique()) \
+                if len(self.database) else []
+            stage['documents'] = len(articles)
+            stage['failures'] = self.news_integrator.errors - errors
+        
+        # Documenti elaborati da un'esecuzione interrotta: ripresi dal journal, con i loro termini
+        if self.processed_store.recovered_terms:
+            self.keyword_model.update(self.processed_store.recovered_terms, self.database['id'])
+            self.processed_store.recovered_terms = {}
+        
+        if len(new_docs):
+            # 2-3. Elaborazione AI e video, salvataggio: a blocchi, con un checkpoint per blocco
+            logger.info(f"Avvio elaborazione a blocchi di {self.chunk_size} documenti...")
+            self.process_in_chunks(new_docs)
+        
+        # Da qui i documenti elaborati sono letti dall'archivio un blocco alla volta: in memoria restano
+        # solo ID, impronte e fonti del corpus, oltre ai blocchi in lavorazione
+        previous_ids = set(self.corpus.doc_index)
+        new_ids = set(self.processed_store.pending_ids)
+        fingerprints = list(self.database['impronta']) if len(self.database) else []
+        self.processed_store.prune(fingerprints)
+        # Lo scraping non serve più: testi e campi dei documenti sono nell'archivio
+        del cached_docs, new_docs
+        self.database = None
+        self.scraper.database = pd.DataFrame()
+        
+        # Primo passaggio: termini mancanti dal modello TF-IDF e frequenze dei token per gli articoli correlati
+        matcher = self.news_integrator.matcher
+        served_ids = []
+        doc_freq = np.zeros(matcher.dim, dtype=np.int64)
+        recomputed = 0
+        for batch in self.processed_store.batches(fingerprints, self.chunk_size):
+            records = self.processed_store.get_records(batch)
+            served_ids.extend(record['id'] for record in records)
+            # Documenti riutilizzati senza riga nel modello (file assente o non aggiornato): termini ricalcolati dal testo
+            missing = [record for record in records if record['id'] not in self.keyword_model.rows]
+            if missing:
+                missing_terms = self.ai_processor.compute_terms(record.get('testo') for record in missing)
+                for record, terms in zip(missing, missing_terms):
+                    self.keyword_model.add(record['id'], terms)
+                recomputed += len(missing)
+            doc_freq += matcher.document_frequency(matcher.document_texts(pd.DataFrame(records, columns=['titolo', 'riassunto'])))
+        if recomputed:
+            logger.info(f"Termini ricalcolati per {recomputed} documenti assenti dal modello TF-IDF")
+        
+        # Parole chiave TF-IDF sull'intero corpus (i termini comuni a tutti i documenti pesano poco)
+        self.keyword_model.update({}, served_ids)
+        keywords = self.keyword_model.top_keywords()
+        self.keyword_model.save()
+        # IDF degli articoli correlati sull'intero corpus: l'abbinamento a blocchi dà gli stessi risultati
+        idf = matcher.inverse_document_frequency(
+            doc_freq + matcher.document_frequency(matcher.article_texts(articles)), len(served_ids) + len(articles)
+        ) if articles else None
+        
+        self.processed_store.save()
+        removed_ids = previous_ids - set(served_ids)
+        # Documenti serviti per la prima volta, per le notifiche (non al primo caricamento: sarebbero tutti nuovi)
+        fresh_ids = set(served_ids) - previous_ids if previous_ids else set()
+        fresh_chunks = []
+        # Senza pyarrow non c'è uno snapshot mappabile da cui ricostruire gli indici: i blocchi restano in memoria
+        kept_chunks = [] if not ColumnarSnapshot.is_available() else None
+        
+        # Secondo passaggio: 4. articoli correlati per tutti i documenti serviti, non solo per i nuovi (gli articoli
+        # cambiano a ogni esecuzione), e 5. salvataggio degli snapshot, un blocco alla volta
+        def chunks():
+            for batch in self.processed_store.batches(fingerprints, self.chunk_size):
+                records = self.processed_store.get_records(batch)
+                for record in records:
+                    record['parole_chiave'] = keywords.get(record['id'], [])
+                    # Le fonti unite cambiano senza cambiare il contenuto: sempre quelle dell'ultimo scraping
+                    record['fonti'] = sources_by_id.get(record['id'], [])
+                if records:
+                    yield pd.DataFrame(records)
+        
+        def related_articles(chunk, stage):
+            # Date dei record (stringhe nell'archivio JSON) in un unico tipo
+            if 'data_dt' in chunk:
+                chunk['data_dt'] = pd.to_datetime(chunk['data_dt'], errors='coerce', format='mixed')
+            return self.news_integrator.enrich_documents(chunk, categorized_articles=articles, idf=idf)
+        
+        with contextlib.ExitStack() as stack:
+            json_writer = stack.enter_context(JsonSnapshotWriter())
+            arrow_writer = stack.enter_context(ColumnarSnapshotWriter(self.snapshot_file)) \
+                if ColumnarSnapshot.is_available() else None
+            
+            # Scritture atomiche alla chiusura: la memory map del corpus corrente resta valida
+            def save(chunk, stage):
+                json_writer.write(chunk)
+                if arrow_writer is not None:
+                    arrow_writer.write(chunk)
+                else:
+                    kept_chunks.append(chunk)
+                if fresh_ids:
+                    fresh = chunk[chunk['id'].isin(fresh_ids)]
+                    if len(fresh):
+                        fresh_chunks.append(fresh.drop(columns=['embedding', 'testo'], errors='ignore'))
+                return chunk['id'].tolist()
+            
+            StreamingPipeline([('related_articles', related_articles), ('save', save)],
+                              queue_size=self.queue_size).run(chunks())
+        
+        # 6. Costruzione degli indici di ricerca e pubblicazione della nuova generazione
+        if kept_chunks is None:
+            table, processed_database, embeddings = ColumnarSnapshot.load(self.snapshot_file, columns=ColumnarSnapshot.INDEX_COLUMNS)
+        else:
+            table, embeddings = None, None
+            processed_database = pd.concat(kept_chunks, ignore_index=True) if kept_chunks else pd.DataFrame()
+            del kept_chunks[:]
+        with metrics.stage("indexing", documents=len(processed_database)):
+            corpus = self.build_indexes(processed_database, added_df=pd.DataFrame({'id': sorted(new_ids)}),
+                                        removed_ids=removed_ids, embeddings=embeddings, table=table,
+                                        snapshot_time=time.time())
+        
+        # 7. Notifiche: i documenti serviti per la prima volta vanno nei digest dei profili interessati (anche quelli
+        # elaborati da un'esecuzione interrotta)
+        if fresh_chunks:
+            fresh_docs = pd.concat(fresh_chunks, ignore_index=True)
+            with metrics.stage("notifications", documents=len(fresh_docs)):
+                notified = self.subscriptions.queue_digests(fresh_docs)
+            logger.info(f"Documenti nuovi: {len(fresh_docs)}, profili da notificare: {notified}")
+        
+        metrics.set("pipeline_last_run_seconds", time.perf_counter() - pipeline_start,
+                    help_text="Durata dell'ultima esecuzione completa del pipeline")
+        metrics.set("pipeline_last_success_timestamp", corpus.snapshot_time,
+                    help_text="Istante dell'ultima esecuzione riuscita del pipeline")
+        logger.info(f"Pipeline completata con successo in {time.perf_counter() - pipeline_start:.2f}s")
+        return processed_database
+    
+    def process_in_chunks(self, new_docs):
+        """Elabora i documenti nuovi a blocchi, in un pipeline a flusso; ogni blocco completato è salvato nel journal"""
+        def ai_processing(chunk, stage):
+            processed = self.ai_processor.process_all_documents(
+                chunk, batch_size=self.nlp_batch_size, n_process=self.nlp_processes
+            )
+            stage['failures'] += len(chunk) - len(processed)
+            return processed
+        
+        def youtube(chunk, stage):
+            errors = self.youtube_integrator.errors
+            chunk = self.youtube_integrator.enrich_documents(chunk)
+            stage['failures'] += self.youtube_integrator.errors - errors
+            return chunk
+        
+        def checkpoint(chunk, stage):
+            for doc_id, terms in self.processed_store.checkpoint(chunk).items():
+                if isinstance(terms, list):
+                    self.keyword_model.add(doc_id, terms)
+            return chunk['id'].tolist()
+        
+        stages = [('ai_processing', ai_processing)]
+        if self.youtube_integrator:
+            stages.append(('youtube', youtube))
+        stages.append(('checkpoint', checkpoint))
+        
+        chunks = (new_docs.iloc[start:start + self.chunk_size] for start in range(0, len(new_docs), self.chunk_size))
+        pipeline = StreamingPipeline(stages, queue_size=self.queue_size)
+        completed = pipeline.run(chunks)
+        logger.info(f"Elaborati {sum(len(ids) for ids in completed)} documenti in {len(completed)} blocchi")
+        return completed
+    
+    def load_snapshot(self, filename="normative_elaborate.json"):
+        """Carica l'ultimo snapshot elaborato salvato, senza rieseguire il pipeline"""
+        self.loading = {"phase": "reading_snapshot", "documents": None, "started": time.time()}
+        try:
+            # Preferisce lo snapshot colonnare, mappato in memoria
+            table, documents_df, embeddings = ColumnarSnapshot.load(self.snapshot_file, columns=ColumnarSnapshot.INDEX_COLUMNS)
+            if documents_df is not None:
+                filename = self.snapshot_file
+            elif os.path.exists(filename):
+                with open(filename, 'r', encoding='utf-8') as f:
+                    documents_df = pd.DataFrame(json.load(f))
+                embeddings = None
+            else:
+                logger.info(f"Nessuno snapshot disponibile in {filename}")
+                return False
+            
+            self.loading = {**self.loading, "phase": "building_indexes", "documents": len(documents_df)}
+            corpus = self.build_indexes(documents_df, embeddings=embeddings, table=table,
+                                        snapshot_time=os.path.getmtime(filename))
+            logger.info(f"Snapshot caricato da {filename}: {len(corpus.store)} documenti")
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Errore durante il caricamento dello snapshot: {str(e)}")
+            return False
+        finally:
+            self.loading = None
+    
+    @property
+    def is_refresher(self):
+        return self._refresher_lock is not None
+    
+    def become_refresher(self):
+        """Prova a diventare il processo che aggiorna il corpus; il lock resta preso fino all'uscita"""
+        with self._refresher_guard:
+            if self._refresher_lock is not None:
+                return True
+            
+            stack = contextlib.ExitStack()
+            if not stack.enter_context(file_lock(self.refresher_lock_file, blocking=False)):
+                stack.close()
+                return False
+            self._refresher_lock = stack
+        
+        logger.info(f"Processo {os.getpid()} incaricato dell'aggiornamento del corpus")
+        return True
+    
+    def published_snapshot_time(self, filename="normative_elaborate.json"):
+        """Data di modifica dello snapshot pubblicato (colonnare o JSON), None se manca"""
+        for name in (self.snapshot_file, filename):
+            if os.path.exists(name):
+                return os.path.getmtime(name)
+        return None
+    
+    def reload_if_changed(self):
+        """Ricarica lo snapshot se un altro processo ne ha pubblicato uno più recente"""
+        published = self.published_snapshot_time()
+        if published is None or published <= (self.corpus.snapshot_time or 0):
+            return False
+        logger.info("Nuovo snapshot pubblicato da un altro processo: ricaricamento")
+        return self.load_snapshot()
+    
+    def refresh(self, use_cached=True):
+        """Aggiorna il database eseguendo il pipeline (una sola esecuzione alla volta)"""
+        if not self.become_refresher():
+            logger.info("Aggiornamento affidato a un altro processo")
+            return False
+        
+        if not self._refresh_lock.acquire(blocking=False):
+            logger.info("Aggiornamento già in corso")
+            return False
+        
+        self.refreshing = True
+        try:
+            self.run_full_pipeline(use_cached=use_cached)
+            self.last_error = None
+            self.last_refresh = time.time()
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            metrics.inc("pipeline_failures_total", help_text="Esecuzioni del pipeline terminate con errore")
+            logger.error(f"Errore durante l'aggiornamento del database: {str(e)}")
+            return False
+        finally:
+            self.refreshing = False
+            self._refresh_lock.release()
+    
+    def start_scheduler(self, interval, use_cached=False, refresh_on_start=False, poll_interval=60):
+        """Aggiornamento in background: il processo incaricato riesegue il pipeline ogni interval
+        secondi (0: solo all'avvio se richiesto), gli altri ricaricano lo snapshot pubblicato"""
+        if self._scheduler is not None and self._scheduler.is_alive():
+            return self._scheduler
+        
+        self.refresh_interval = interval or None
+        self._scheduler_stop.clear()
+        
+        def run():
+            # All'avvio il pipeline riusa la cache dei documenti già elaborati
+            startup = refresh_on_start
+            next_refresh = time.monotonic() if startup else time.monotonic() + interval
+            while True:
+                if self.become_refresher():
+                    if (interval > 0 or startup) and time.monotonic() >= next_refresh:
+                        logger.info("Aggiornamento programmato del corpus")
+                        self.refresh(use_cached=use_cached or startup)
+                        startup = False
+                        next_refresh = time.monotonic() + interval
+                    wait = max(next_refresh - time.monotonic(), 0) if interval > 0 else poll_interval
+                else:
+                    # Se il processo incaricato termina, il lock si libera e un altro subentra
+                    self.reload_if_changed()
+                    wait = poll_interval
+                # wait() restituisce True solo quando viene richiesto l'arresto
+                if self._scheduler_stop.wait(wait):
+                    return
+        
+        self._scheduler = threading.Thread(target=run, name="normative-refresh", daemon=True)
+        self._scheduler.start()
+        if interval > 0:
+            logger.info(f"Aggiornamento programmato ogni {interval} secondi")
+        return self._scheduler
+    
+    def stop_scheduler(self):
+        """Ferma l'aggiornamento programmato (un'esecuzione in corso viene completata)"""
+        self._scheduler_stop.set()
+        self.refresh_interval = None
+    
+    def is_ready(self):
+        """Indica se c'è un database pronto per servire le richieste"""
+        return self.corpus.is_ready()
+    
+    def get_status(self):
+        """Stato di caricamento del sistema"""
+        corpus = self.corpus
+        loading = self.loading
+        return {
+            "ready": corpus.is_ready(),
+            "refreshing": self.refreshing,
+            "loading": {
+                "phase": loading["phase"],
+                "documents": loading["documents"],
+                "elapsed_seconds": round(time.time() - loading["started"], 1)
+            } if loading else None,
+            "documents": len(corpus.store) if corpus.store is not None else 0,
+            "generation": corpus.generation,
+            "snapshot_age_seconds": round(time.time() - corpus.snapshot_time, 1) if corpus.snapshot_time else None,
+            "refresh_interval_seconds": self.refresh_interval,
+            "refresher": self.is_refresher,
+            "last_refresh_age_seconds": round(time.time() - self.last_refresh, 1) if self.last_refresh else None,
+            "nlp_loaded": nlp.is_loaded,
+            "last_error": self.last_error
+        }
+    
+    def build_indexes(self, documents_df, added_df=None, removed_ids=(), embeddings=None, table=None, snapshot_time=None):
+        """Costruisce a parte gli indici derivati e pubblica la nuova generazione del corpus"""
+        current = self.corpus
+        documents_df = documents_df.reset_index(drop=True)
+        
+        # Embedding in una matrice contigua, fuori dal DataFrame
+        if embeddings is None and 'embedding' in documents_df:
+            embeddings = SemanticIndex.stack(documents_df['embedding'].tolist())
+        documents_df = documents_df.drop(columns=['embedding'], errors='ignore')
+        if embeddings is not None and embeddings.shape[1]:
+            semantic_index = SemanticIndex(embeddings, documents_df['categoria'])
+        else:
+            semantic_index = None
+        
+        # Le date possono arrivare come stringhe dagli snapshot JSON: la conversione avviene qui una sola volta
+        if 'data_dt' not in documents_df:
+            documents_df['data_dt'] = [parse_date(value) for value in documents_df['data']]
+        documents_df['data_dt'] = pd.to_datetime(documents_df['data_dt'], errors='coerce')
+        
+        search_index = SearchIndex(documents_df)
+        suggest_index = SuggestIndex(documents_df, self.category_names)
+        facet_index = FacetIndex(documents_df)
+        
+        # Indice delle normative più recenti: aggiornato con le sole differenze quando possibile,
+        # su una copia, perché quello corrente è ancora in uso
+        if current.latest_index is None or added_df is None:
+            latest_index = LatestIndex(documents_df)
+        else:
+            latest_index = current.latest_index.copy()
+            # Differenze calcolate rispetto all'indice pubblicato: dopo un'esecuzione interrotta i documenti
+            # elaborati allora sono riutilizzati dall'archivio, ma non sono mai entrati nell'indice
+            served_ids = set(documents_df['id'])
+            latest_index.remove(set(removed_ids) | (latest_index.keys.keys() - served_ids))
+            # I documenti rielaborati restano nell'indice ma possono aver cambiato categoria o data
+            added_ids = (served_ids - latest_index.keys.keys()) | set(added_df['id'] if len(added_df) else ())
+            if added_ids:
+                latest_index.add(documents_df[documents_df['id'].isin(added_ids)])
+        
+        # Documenti serviti (con la tabella ID -> posizione): il DataFrame non resta in memoria; con lo snapshot
+        # colonnare i campi sono letti dalla memory map, condivisa tra i processi, invece di essere copiati
+        store = ArrowDocumentStore(table) if table is not None else DocumentStore(documents_df)
+        
+        corpus = ServedCorpus(
+            store=store, search_index=search_index, latest_index=latest_index, semantic_index=semantic_index,
+            suggest_index=suggest_index, facet_index=facet_index, generation=current.generation + 1, table=table,
+            snapshot_time=snapshot_time or time.time()
+        )
+        
+        # Pubblicazione: un solo assegnamento; le richieste in corso completano sulla generazione precedente
+        self.corpus = corpus
+        metrics.set("documents", len(documents_df), help_text="Documenti nel corpus servito")
+        logger.info(f"Pubblicata la generazione {corpus.generation} del corpus ({len(documents_df)} documenti)")
+        return corpus
+    
+    # Le letture acquisiscono il corpus una sola volta: ogni chiamata vede una generazione coerente
+    def get_latest(self, category=None, limit=5, since=None):
+        """Restituisce le normative più recenti, opzionalmente per categoria e successive a una data"""
+        corpus = self.corpus
+        if corpus.latest_index is None:
+            return []
+        
+        doc_ids = corpus.latest_index.latest(category=category, limit=limit, since=since)
+        return [corpus.store.get(doc_id) for doc_id in doc_ids]
+    
+    def get_document(self, doc_id):
+        """Restituisce il documento con l'ID specificato, o None se non esiste"""
+        store = self.corpus.store
+        return store.get(doc_id) if store is not None else None
+    
+    def suggest(self, prefix, limit=10):
+        """Suggerimenti per la ricerca durante la digitazione"""
+        corpus = self.corpus
+        if corpus.suggest_index is None:
+            return []
+        return corpus.suggest_index.suggest(prefix, limit=limit)
+    
+    def search_documents(self, query, category=None, top_k=None, mode='lexical', alpha=0.7, filters=None, min_score=None):
+        """Cerca documenti in base a una query"""
+        if category:
+            filters = {**(filters or {}), 'categoria': [category]}
+        return self.faceted_search(query, filters=filters, top_k=top_k, mode=mode, alpha=alpha, facets=False,
+                                   min_score=min_score)['results']
+    
+    def faceted_search(self, query, filters=None, top_k=None, mode='lexical', alpha=0.7, facets=True, min_score=None):
+        """Ricerca con filtri a faccette: risultati ordinati, numero di corrispondenze e conteggi per faccetta
+        (min_score: soglia dei punteggi semantici, None per quella predefinita)"""
+        corpus = self.corpus
+        if not corpus.is_ready():
+            logger.error("Database non disponibile. Eseguire prima run_full_pipeline()")
+            return {"results": [], "total": 0, "facets": {}}
+        
+        # Filtri combinati con AND sui bitset, senza toccare i documenti
+        facet_index = corpus.facet_index
+        mask = facet_index.unpack(facet_index.filter(filters)) if filters and any(filters.values()) else None
+        
+        # Documenti che contengono almeno un termine della query, poi filtrati in blocco
+        scores = corpus.search_index.score(query)
+        positions = np.fromiter(scores.keys(), dtype=np.int64, count=len(scores))
+        values = np.fromiter(scores.values(), dtype=np.float64, count=len(scores))
+        
+        # Similarità con gli embedding precalcolati, combinata con BM25 in modalità ibrida; in modalità
+        # semantica i punteggi BM25 servono solo se nessuna parola della query ha un vettore
+        semantic = None
+        if mode in ('semantic', 'hybrid') and corpus.semantic_index is not None:
+            semantic = corpus.semantic_index.score(query, lexical=(positions, values),
+                                                   alpha=alpha if mode == 'hybrid' else 1.0)
+        if semantic is not None:
+            # Candidati: i documenti sopra la soglia, in numero limitato; ranking, totale e faccette usano lo stesso insieme
+            positions = corpus.semantic_index.candidates(semantic, min_score)
+            values = semantic[positions]
+        
+        if mask is not None:
+            keep = mask[positions]
+            matched_positions, matched_values = positions[keep], values[keep]
+        else:
+            matched_positions, matched_values = positions, values
+        
+        # Top-k parziale sui soli documenti filtrati
+        limit = top_k if top_k is not None or semantic is None else 20
+        k = len(matched_values) if limit is None else min(limit, len(matched_values))
+        top = np.argpartition(-matched_values, k - 1)[:k] if 0 < k < len(matched_values) else np.arange(k)
+        top = top[np.argsort(-matched_values[top], kind='stable')]
+        
+        result = {
+            "results": [corpus.store[doc_pos] for doc_pos in matched_positions[top].tolist()],
+            "total": len(matched_positions),
+            "facets": {}
+        }
+        if facets:
+            # Conteggi sui candidati prima dei filtri: ogni faccetta ignora il proprio filtro
+            result["facets"] = facet_index.counts(facet_index.from_positions(positions), filters)
+        return result
 
 
 # Esempio di utilizzo